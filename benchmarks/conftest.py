@@ -0,0 +1,113 @@
+"""
+Benchmarks of creating and verifying tokens, and of the full request path
+through each of the protected endpoint decorators. These are not part of the
+test suite; run them with pytest-benchmark, saving the results as json so
+they can be compared between runs:
+
+    $ pytest benchmarks --benchmark-json=benchmarks.json
+    $ pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+"""
+
+import asyncio
+
+import pytest
+from quart import Quart, jsonify
+
+pytest.importorskip("pytest_benchmark")
+
+from quart_jwt_extended import (  # noqa: E402
+    JWTManager,
+    jwt_required,
+    fresh_jwt_required,
+    jwt_optional,
+    jwt_refresh_token_required,
+)
+
+ALGORITHMS = ["HS256", "RS256", "ES256", "EdDSA"]
+
+# Number of custom claims put in the tokens
+CLAIM_SIZES = [0, 10, 100]
+
+
+@pytest.fixture(scope="session")
+def keys():
+    pytest.importorskip("cryptography")
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+    def pem_pair(private_key):
+        private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        public_pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        return private_pem.decode(), public_pem.decode()
+
+    return {
+        "RS": pem_pair(rsa.generate_private_key(65537, 2048)),
+        "ES": pem_pair(ec.generate_private_key(ec.SECP256R1())),
+        "Ed": pem_pair(ed25519.Ed25519PrivateKey.generate()),
+    }
+
+
+@pytest.fixture(scope="session")
+def benchmark_loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def make_app(keys, algorithm="HS256", location="headers", blacklist=False):
+    app = Quart(__name__)
+    app.config["JWT_ALGORITHM"] = algorithm
+    app.config["JWT_TOKEN_LOCATION"] = [location]
+    app.config["JWT_COOKIE_CSRF_PROTECT"] = False
+    app.config["JWT_BLACKLIST_ENABLED"] = blacklist
+    if algorithm.startswith("HS"):
+        app.config["JWT_SECRET_KEY"] = "benchmark-secret"
+    else:
+        private_key, public_key = keys[algorithm[:2]]
+        app.config["JWT_PRIVATE_KEY"] = private_key
+        app.config["JWT_PUBLIC_KEY"] = public_key
+    jwt = JWTManager(app)
+
+    revoked = set()
+
+    @jwt.token_in_blacklist_loader
+    def check_if_token_in_blacklist(decoded_token):
+        return decoded_token["jti"] in revoked
+
+    @app.route("/required", methods=["GET", "POST"])
+    @jwt_required
+    async def required():
+        return jsonify(foo="bar")
+
+    @app.route("/fresh", methods=["GET", "POST"])
+    @fresh_jwt_required
+    async def fresh():
+        return jsonify(foo="bar")
+
+    @app.route("/optional", methods=["GET", "POST"])
+    @jwt_optional
+    async def optional():
+        return jsonify(foo="bar")
+
+    @app.route("/refresh", methods=["GET", "POST"])
+    @jwt_refresh_token_required
+    async def refresh():
+        return jsonify(foo="bar")
+
+    return app
+
+
+def user_claims(size):
+    return {"claim_{}".format(i): "value_{}".format(i) for i in range(size)}
+
+
+@pytest.fixture
+def run(benchmark_loop):
+    return benchmark_loop.run_until_complete
@@ -0,0 +1,286 @@
+"""
+Drives the reference app in ``benchmarks/loadtest_app.py`` with many
+concurrent clients and reports the throughput and latency percentiles of
+one scenario:
+
+* ``protected``: requests to a ``jwt_required`` endpoint with a valid token
+* ``login``: a login storm, creating an access and refresh token per request
+* ``refresh``: a refresh storm against a ``jwt_refresh_token_required``
+  endpoint
+* ``invalid``: a flood of tokens with forged signatures
+
+By default the app is started under hypercorn on a local port, with as many
+workers as asked for, so that results can be compared per core:
+
+    $ python -m benchmarks.loadtest protected --concurrency 64 --workers 1
+    $ python -m benchmarks.loadtest invalid --duration 30 --json results.json
+
+Pass ``--url`` to drive an app that is already running instead.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+SCENARIOS = {
+    "protected": ("GET", "/protected", "access", 200),
+    "login": ("POST", "/login", None, 200),
+    "refresh": ("POST", "/refresh", "refresh", 200),
+    "invalid": ("GET", "/protected", "forged", 422),
+}
+
+LOGIN_BODY = json.dumps({"username": "test", "password": "test"}).encode()
+
+
+class Connection(object):
+    """
+    A minimal keep-alive HTTP/1.1 client, so that the load generator itself
+    adds as little overhead as possible and has no dependencies.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, headers=None, body=b""):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        lines = [
+            "{} {} HTTP/1.1".format(method, path),
+            "Host: {}:{}".format(self.host, self.port),
+            "Content-Length: {}".format(len(body)),
+        ]
+        for name, value in (headers or {}).items():
+            lines.append("{}: {}".format(name, value))
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by the server")
+        status = int(status_line.split()[1])
+        length = 0
+        close = False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                close = True
+        data = await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def login(host, port):
+    connection = Connection(host, port)
+    headers = {"Content-Type": "application/json"}
+    status, data = await connection.request("POST", "/login", headers, LOGIN_BODY)
+    connection.close()
+    if status != 200:
+        raise RuntimeError("Could not log in to the app ({})".format(status))
+    return json.loads(data)
+
+
+async def client(host, port, scenario, tokens, deadline, latencies, errors):
+    method, path, token_type, expected_status = SCENARIOS[scenario]
+    headers = {}
+    body = b""
+    if token_type == "access":
+        headers["Authorization"] = "Bearer " + tokens["access_token"]
+    elif token_type == "refresh":
+        headers["Authorization"] = "Bearer " + tokens["refresh_token"]
+    elif token_type == "forged":
+        headers["Authorization"] = "Bearer " + tokens["access_token"][:-8] + "AAAAAAAA"
+    else:
+        headers["Content-Type"] = "application/json"
+        body = LOGIN_BODY
+
+    connection = Connection(host, port)
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            status, _ = await connection.request(method, path, headers, body)
+        except (ConnectionError, asyncio.IncompleteReadError, OSError):
+            connection.close()
+            errors.append("connection")
+            continue
+        latencies.append(time.perf_counter() - start)
+        if status != expected_status:
+            errors.append(status)
+    connection.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def run(host, port, scenario, concurrency, duration):
+    tokens = await login(host, port)
+    latencies = []
+    errors = []
+    start = time.monotonic()
+    deadline = start + duration
+    await asyncio.gather(
+        *[
+            client(host, port, scenario, tokens, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ]
+    )
+    elapsed = time.monotonic() - start
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "duration": elapsed,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "p999_ms": percentile(latencies, 0.999) * 1000,
+    }
+
+
+def write_keys(algorithm, directory):
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+    if algorithm.startswith(("RS", "PS")):
+        private_key = rsa.generate_private_key(65537, 2048)
+    elif algorithm == "EdDSA":
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    private_path = os.path.join(directory, "private.pem")
+    public_path = os.path.join(directory, "public.pem")
+    with open(private_path, "wb") as f:
+        f.write(
+            private_key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            )
+        )
+    with open(public_path, "wb") as f:
+        f.write(
+            private_key.public_key().public_bytes(
+                serialization.Encoding.PEM,
+                serialization.PublicFormat.SubjectPublicKeyInfo,
+            )
+        )
+    return private_path, public_path
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, workers, algorithm, blacklist, key_directory):
+    env = dict(os.environ, LOADTEST_JWT_ALGORITHM=algorithm)
+    if blacklist:
+        env["LOADTEST_BLACKLIST"] = "1"
+    if not algorithm.startswith("HS"):
+        private_path, public_path = write_keys(algorithm, key_directory)
+        env["LOADTEST_PRIVATE_KEY"] = private_path
+        env["LOADTEST_PUBLIC_KEY"] = public_path
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "hypercorn",
+            "--bind",
+            "127.0.0.1:{}".format(port),
+            "--workers",
+            str(workers),
+            "benchmarks.loadtest_app:app",
+        ],
+        cwd=root,
+        env=env,
+    )
+
+    # Wait for the server to start accepting connections
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("hypercorn exited while starting up")
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("hypercorn did not start listening in time")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10, help="seconds")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--algorithm", default="HS256")
+    parser.add_argument("--blacklist", action="store_true")
+    parser.add_argument("--url", help="drive an already running app instead")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    server = None
+    with tempfile.TemporaryDirectory() as key_directory:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            host, port = "127.0.0.1", free_port()
+            server = start_server(
+                port, args.workers, args.algorithm, args.blacklist, key_directory
+            )
+        try:
+            results = asyncio.run(
+                run(host, port, args.scenario, args.concurrency, args.duration)
+            )
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    results.update(workers=args.workers, algorithm=args.algorithm)
+    for key, value in results.items():
+        if isinstance(value, float):
+            value = "{:.3f}".format(value)
+        print("{:<20} {}".format(key, value))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if results["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+The reference app driven by ``benchmarks/loadtest.py``. It is the app from
+``examples/simple.py`` with the blacklisting and refresh endpoints of
+``examples/blacklist.py``. Run it on its own with:
+
+    $ hypercorn benchmarks.loadtest_app:app
+"""
+import os
+
+from quart import Quart, request
+
+from quart_jwt_extended import (
+    JWTManager,
+    jwt_required,
+    jwt_refresh_token_required,
+    create_access_token,
+    create_refresh_token,
+    get_jwt_identity,
+    get_raw_jwt,
+)
+
+app = Quart(__name__)
+app.config["JWT_SECRET_KEY"] = "super-secret"
+app.config["JWT_ALGORITHM"] = os.environ.get("LOADTEST_JWT_ALGORITHM", "HS256")
+app.config["JWT_BLACKLIST_ENABLED"] = os.environ.get("LOADTEST_BLACKLIST") == "1"
+app.config["JWT_BLACKLIST_TOKEN_CHECKS"] = ["access", "refresh"]
+if "LOADTEST_PRIVATE_KEY" in os.environ:
+    with open(os.environ["LOADTEST_PRIVATE_KEY"]) as f:
+        app.config["JWT_PRIVATE_KEY"] = f.read()
+    with open(os.environ["LOADTEST_PUBLIC_KEY"]) as f:
+        app.config["JWT_PUBLIC_KEY"] = f.read()
+jwt = JWTManager(app)
+
+blacklist = set()
+
+
+@jwt.token_in_blacklist_loader
+def check_if_token_in_blacklist(decrypted_token):
+    return decrypted_token["jti"] in blacklist
+
+
+@app.route("/login", methods=["POST"])
+async def login():
+    data = await request.get_json()
+    if data.get("username") != "test" or data.get("password") != "test":
+        return {"msg": "Bad username or password"}, 401
+
+    ret = {
+        "access_token": create_access_token(identity="test"),
+        "refresh_token": create_refresh_token(identity="test"),
+    }
+    return ret, 200
+
+
+@app.route("/refresh", methods=["POST"])
+@jwt_refresh_token_required
+async def refresh():
+    return {"access_token": create_access_token(identity=get_jwt_identity())}, 200
+
+
+@app.route("/logout", methods=["DELETE"])
+@jwt_required
+async def logout():
+    blacklist.add(get_raw_jwt()["jti"])
+    return {"msg": "Successfully logged out"}, 200
+
+
+@app.route("/protected", methods=["GET"])
+@jwt_required
+async def protected():
+    return {"logged_in_as": get_jwt_identity()}, 200
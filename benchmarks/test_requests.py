@@ -0,0 +1,75 @@
+import pytest
+
+from quart_jwt_extended import create_access_token, create_refresh_token
+from benchmarks.conftest import ALGORITHMS, CLAIM_SIZES, make_app, user_claims
+
+
+async def make_tokens(app, claim_size=0):
+    async with app.test_request_context("/"):
+        claims = user_claims(claim_size)
+        access_token = create_access_token("username", fresh=True, user_claims=claims)
+        refresh_token = create_refresh_token("username")
+    return access_token, refresh_token
+
+
+def bench_request(benchmark, run, app, path, **kwargs):
+    test_client = app.test_client()
+
+    def request():
+        return run(test_client.get(path, **kwargs))
+
+    response = benchmark(request)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize(
+    "path,token_type",
+    [
+        ("/required", "access"),
+        ("/fresh", "access"),
+        ("/optional", "access"),
+        ("/optional", None),
+        ("/refresh", "refresh"),
+    ],
+)
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_decorators(benchmark, run, keys, algorithm, path, token_type):
+    app = make_app(keys, algorithm)
+    access_token, refresh_token = run(make_tokens(app))
+    headers = {}
+    if token_type is not None:
+        token = access_token if token_type == "access" else refresh_token
+        headers["Authorization"] = "Bearer {}".format(token)
+    bench_request(benchmark, run, app, path, headers=headers)
+
+
+@pytest.mark.parametrize("location", ["headers", "cookies", "query_string", "json"])
+def test_token_locations(benchmark, run, keys, location):
+    app = make_app(keys, location=location)
+    access_token, _ = run(make_tokens(app))
+
+    if location == "headers":
+        kwargs = {"headers": {"Authorization": "Bearer {}".format(access_token)}}
+    elif location == "cookies":
+        kwargs = {"headers": {"Cookie": "access_token_cookie={}".format(access_token)}}
+    elif location == "query_string":
+        kwargs = {"query_string": {"jwt": access_token}}
+    else:
+        kwargs = {"json": {"access_token": access_token}}
+    bench_request(benchmark, run, app, "/required", **kwargs)
+
+
+@pytest.mark.parametrize("blacklist", [False, True])
+def test_blacklist(benchmark, run, keys, blacklist):
+    app = make_app(keys, blacklist=blacklist)
+    access_token, _ = run(make_tokens(app))
+    headers = {"Authorization": "Bearer {}".format(access_token)}
+    bench_request(benchmark, run, app, "/required", headers=headers)
+
+
+@pytest.mark.parametrize("claim_size", CLAIM_SIZES)
+def test_claim_sizes(benchmark, run, keys, claim_size):
+    app = make_app(keys)
+    access_token, _ = run(make_tokens(app, claim_size))
+    headers = {"Authorization": "Bearer {}".format(access_token)}
+    bench_request(benchmark, run, app, "/required", headers=headers)
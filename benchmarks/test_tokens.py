@@ -0,0 +1,30 @@
+import pytest
+
+from quart_jwt_extended import create_access_token, decode_token
+from benchmarks.conftest import ALGORITHMS, CLAIM_SIZES, make_app, user_claims
+
+
+@pytest.mark.parametrize("claim_size", CLAIM_SIZES)
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_create_access_token(benchmark, run, keys, algorithm, claim_size):
+    app = make_app(keys, algorithm)
+    claims = user_claims(claim_size)
+
+    async def bench():
+        async with app.app_context():
+            benchmark(create_access_token, "username", user_claims=claims)
+
+    run(bench())
+
+
+@pytest.mark.parametrize("claim_size", CLAIM_SIZES)
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_decode_token(benchmark, run, keys, algorithm, claim_size):
+    app = make_app(keys, algorithm)
+
+    async def bench():
+        async with app.test_request_context("/"):
+            token = create_access_token("username", user_claims=user_claims(claim_size))
+            benchmark(decode_token, token)
+
+    run(bench())
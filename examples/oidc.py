@@ -6,8 +6,8 @@ from jwt.algorithms import RSAAlgorithm
 from functools import wraps
 from quart_jwt_extended import (
     JWTManager,
+    jwt_required,
     verify_jwt_in_request,
-    get_raw_jwt,
     current_user,
 )
 import config
@@ -36,7 +36,7 @@ OIDC_USERNAME_CLAIM = "email"
 # idea here is to have few but could be hundreds of groups, based on which groups user belongs to, grants them access to various endpoints
 # in identity server this is usually mapped directly to ldap, so ldap group membership defines which endpoints user can access
 # https://www.keycloak.org/docs/latest/server_admin/index.html#_ldap_mappers, but remember groups don't have to come from ldap
-# group mapper was setup for flat group structure not to include any prefixes so if you have to do that, please update code in group_required method
+# group mapper was setup for flat group structure not to include any prefixes so if you have to do that, please update the roles required below
 OIDC_GROUPS_CLAIM = "groups"
 
 # ==== END OF SETUP
@@ -61,27 +61,6 @@ def token_required(fn):
     return wrapper
 
 
-def group_required(group=""):
-    def decorator(fn):
-        @wraps(fn)
-        def wrapper(*args, **kwargs):
-            # standard quart_jwt_extended token verifications
-            await verify_jwt_in_request()
-
-            # custom group membership verification
-            groups = get_raw_jwt()[OIDC_GROUPS_CLAIM]
-            if group not in groups:
-                return (
-                    {"result": "user not in group required to access this endpoint"},
-                    401,
-                )
-            return await fn(*args, **kwargs)
-
-        return wrapper
-
-    return decorator
-
-
 # Setup Token Verification
 # force use of RS265
 app.config["JWT_ALGORITHM"] = "RS256"
@@ -104,6 +83,9 @@ app.config["JWT_DECODE_AUDIENCE"] = OIDC_CLIENT_ID
 
 # name of token entry that will become distinct quart identity username
 app.config["JWT_IDENTITY_CLAIM"] = OIDC_USERNAME_CLAIM
+
+# name of token entry holding the groups checked by @jwt_required(roles=...)
+app.config["JWT_ROLES_CLAIM"] = OIDC_GROUPS_CLAIM
 jwt = JWTManager(app)
 
 
@@ -120,9 +102,7 @@ async def get_protected_by_token():
 
 
 @app.route("/group-protected", methods=["GET"])
-@group_required(
-    "api-access"
-)  # currently one, could be one of or multiple required depending on your needs
+@jwt_required(roles={"api-access"})  # every one of these groups is required
 async def get_protected_by_group():
     return (
         [
@@ -0,0 +1,68 @@
+from quart import Quart, request
+from quart_jwt_extended import (
+    JWTManager,
+    jwt_required,
+    create_access_token,
+    jwt_refresh_token_required,
+    create_refresh_token,
+    get_jwt_identity,
+    get_raw_jwt,
+    revoke_refresh_token_family,
+)
+
+app = Quart(__name__)
+
+app.config["JWT_SECRET_KEY"] = "super-secret"  # Change this!
+
+# Every refresh token can only be used once. Using one that was already
+# used revokes all of the refresh tokens created since the user logged in.
+app.config["JWT_REFRESH_TOKEN_ROTATION"] = True
+jwt = JWTManager(app)
+
+
+@app.route("/login", methods=["POST"])
+async def login():
+    username = (await request.get_json()).get("username", None)
+    password = (await request.get_json()).get("password", None)
+    if username != "test" or password != "test":
+        return {"msg": "Bad username or password"}, 401
+
+    # This starts a new family of refresh tokens
+    ret = {
+        "access_token": create_access_token(identity=username),
+        "refresh_token": create_refresh_token(identity=username),
+    }
+    return ret, 200
+
+
+# As the refresh token used to access this endpoint cannot be used again,
+# a new refresh token must be returned along with the new access token. It
+# is the next token of the same family.
+@app.route("/refresh", methods=["POST"])
+@jwt_refresh_token_required
+async def refresh():
+    current_user = get_jwt_identity()
+    ret = {
+        "access_token": create_access_token(identity=current_user),
+        "refresh_token": create_refresh_token(identity=current_user),
+    }
+    return ret, 200
+
+
+# Logging out revokes every refresh token of the family
+@app.route("/logout", methods=["DELETE"])
+@jwt_refresh_token_required
+async def logout():
+    await revoke_refresh_token_family(get_raw_jwt())
+    return {"msg": "Successfully logged out"}, 200
+
+
+@app.route("/protected", methods=["GET"])
+@jwt_required
+async def protected():
+    username = get_jwt_identity()
+    return dict(logged_in_as=username), 200
+
+
+if __name__ == "__main__":
+    app.run()
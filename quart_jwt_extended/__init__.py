@@ -1,3 +1,4 @@
+from .guard import jwt_exempt, jwt_requirement, protect
 from .jwt_manager import JWTManager
 from .utils import (
     create_access_token,
@@ -10,7 +11,12 @@ from .utils import (
     get_jwt_claims,
     get_jwt_identity,
     get_raw_jwt,
+    revoke_all_tokens,
+    revoke_identity_tokens,
+    revoke_refresh_token_family,
+    revoke_token,
     set_access_cookies,
+    set_jwt_cookies,
     set_refresh_cookies,
     unset_access_cookies,
     unset_jwt_cookies,
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from inspect import isawaitable
+from collections import OrderedDict
+
+_missing = object()
+
+
+class TTLCache(object):
+    """
+    A small bounded mapping whose entries expire `ttl` seconds after they
+    are set. Once `maxsize` entries are stored, the least recently used ones
+    are evicted first.
+
+    :param maxsize: The maximum number of entries to keep
+    :param ttl: How long (in seconds) an entry is kept for
+    :param timer: Function returning the current time in seconds
+    """
+
+    def __init__(self, maxsize, ttl, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _missing) is not _missing
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored for `key`, or `default` if there is no such
+        entry or it has expired.
+        """
+        try:
+            expires_at, value = self._data[key]
+        except KeyError:
+            return default
+        if expires_at <= self.timer():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Stores `value` for `key`, optionally overriding how long (in seconds)
+        this entry is kept for.
+        """
+        if ttl is None:
+            ttl = self.ttl
+        self._data[key] = (self.timer() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """
+        Removes the entry for `key`, returning its value (or `default`).
+        """
+        try:
+            expires_at, value = self._data.pop(key)
+        except KeyError:
+            return default
+        return value if expires_at > self.timer() else default
+
+    def clear(self):
+        """
+        Removes every entry from the cache.
+        """
+        self._data.clear()
+
+
+class SingleFlight(object):
+    """
+    Deduplicates concurrent calls: while a call made for a key is in flight,
+    the callers asking for the same key wait for it and share its result
+    (or exception) instead of making their own call.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, func, *args):
+        """
+        Returns the result of ``func(*args)``, awaiting it if it is awaitable,
+        or the result of the call already in flight for `key`. Results that
+        are not awaitable, and unhashable keys, are never shared.
+        """
+        try:
+            task = self._calls.get(key)
+        except TypeError:
+            task = None
+            key = _missing
+        if task is None:
+            result = func(*args)
+            if not isawaitable(result):
+                return result
+            task = asyncio.ensure_future(result)
+            if key is not _missing:
+                self._calls[key] = task
+                task.add_done_callback(lambda done: self._forget(key, done))
+        # A cancelled caller must not cancel the call the others are waiting for
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
@@ -0,0 +1,66 @@
+"""
+Clocks telling the current time to the extension, as the whole number of
+seconds since the epoch that the iat, nbf, exp and fresh claims are made of.
+Tokens are created and checked against the clock set with
+:meth:`~quart_jwt_extended.JWTManager.set_clock`, so that tests can move it
+to expire tokens (or make them valid) without waiting or patching
+``datetime``.
+"""
+import datetime
+import time
+
+
+class Clock(object):
+    """
+    The interface of the clocks used by the extension.
+    """
+
+    def now(self):
+        """
+        Returns the current time as an integer unix timestamp.
+        """
+        raise NotImplementedError
+
+
+class SystemClock(Clock):
+    """
+    The time of the system, which is the default clock.
+
+    :param timer: Function returning the current unix timestamp
+    """
+
+    def __init__(self, timer=time.time):
+        self.timer = timer
+
+    def now(self):
+        return int(self.timer())
+
+
+class ManualClock(Clock):
+    """
+    A clock that only moves when told to, for tests.
+
+    :param now: The unix timestamp to start at, the current time by default
+    """
+
+    def __init__(self, now=None):
+        self._now = int(time.time()) if now is None else int(now)
+
+    def now(self):
+        return self._now
+
+    def set(self, now):
+        """
+        Moves the clock to the unix timestamp `now`.
+        """
+        self._now = int(now)
+
+    def advance(self, delta):
+        """
+        Moves the clock forward by `delta` (backward if it is negative).
+
+        :param delta: A `datetime.timedelta` or a number of seconds
+        """
+        if isinstance(delta, datetime.timedelta):
+            delta = delta.total_seconds()
+        self._now = int(self._now + delta)
@@ -6,6 +6,8 @@ from collections.abc import Sequence, Set
 
 from quart import current_app
 
+from quart_jwt_extended.cookies import CookieSettings
+
 # Older versions of pyjwt do not have the requires_cryptography set. Also,
 # older versions will not be adding new algorithms to them, so I can hard code
 # the default version here and be safe. If there is a newer algorithm someone
@@ -26,6 +28,7 @@ except ImportError:  # pragma: no cover
         "PS256",
         "PS384",
         "PS512",
+        "EdDSA",
     }
 
 
@@ -278,6 +281,99 @@ class _Config(object):
     def blacklist_refresh_tokens(self):
         return "refresh" in self.blacklist_checks
 
+    @property
+    def failed_auth_limit(self):
+        return current_app.config["JWT_FAILED_AUTH_LIMIT"]
+
+    @staticmethod
+    def _get_seconds(option):
+        # Durations can be set as a datetime.timedelta or as a number of seconds
+        value = current_app.config[option]
+        if isinstance(value, datetime.timedelta):
+            value = value.total_seconds()
+        if value <= 0:
+            raise RuntimeError("{} must be greater than 0".format(option))
+        return value
+
+    @property
+    def failed_auth_period(self):
+        return self._get_seconds("JWT_FAILED_AUTH_PERIOD")
+
+    @property
+    def negative_cache_size(self):
+        return current_app.config["JWT_NEGATIVE_CACHE_SIZE"]
+
+    @property
+    def negative_cache_ttl(self):
+        return self._get_seconds("JWT_NEGATIVE_CACHE_TTL")
+
+    @property
+    def refresh_token_rotation(self):
+        return current_app.config["JWT_REFRESH_TOKEN_ROTATION"]
+
+    @property
+    def user_loader_cache_size(self):
+        return current_app.config["JWT_USER_LOADER_CACHE_SIZE"]
+
+    @property
+    def user_loader_cache_ttl(self):
+        return self._get_seconds("JWT_USER_LOADER_CACHE_TTL")
+
+    @property
+    def revocation_prune_interval(self):
+        if not current_app.config["JWT_REVOCATION_PRUNE_INTERVAL"]:
+            return None
+        return self._get_seconds("JWT_REVOCATION_PRUNE_INTERVAL")
+
+    @property
+    def revocation_prune_batch_size(self):
+        return current_app.config["JWT_REVOCATION_PRUNE_BATCH_SIZE"]
+
+    @property
+    def revocation_prune_jitter(self):
+        jitter = current_app.config["JWT_REVOCATION_PRUNE_JITTER"]
+        if not 0 <= jitter <= 1:
+            raise RuntimeError("JWT_REVOCATION_PRUNE_JITTER must be between 0 and 1")
+        return jitter
+
+    @property
+    def offload_verification(self):
+        return current_app.config["JWT_OFFLOAD_VERIFICATION"]
+
+    @property
+    def offload_loop_lag_threshold(self):
+        return self._get_seconds("JWT_OFFLOAD_LOOP_LAG_THRESHOLD")
+
+    @property
+    def offload_max_workers(self):
+        return current_app.config["JWT_OFFLOAD_MAX_WORKERS"]
+
+    @property
+    def coalesce_callbacks(self):
+        return current_app.config["JWT_COALESCE_CALLBACKS"]
+
+    @property
+    def sliding_expiration_window(self):
+        if not current_app.config["JWT_SLIDING_EXPIRATION_WINDOW"]:
+            return None
+        return self._get_seconds("JWT_SLIDING_EXPIRATION_WINDOW")
+
+    @property
+    def sliding_expiration_header_name(self):
+        return current_app.config["JWT_SLIDING_EXPIRATION_HEADER_NAME"]
+
+    @property
+    def sliding_expiration_cache_size(self):
+        return current_app.config["JWT_SLIDING_EXPIRATION_CACHE_SIZE"]
+
+    @property
+    def profile_auth(self):
+        return current_app.config["JWT_PROFILE_AUTH"]
+
+    @property
+    def profile_auth_header(self):
+        return current_app.config["JWT_PROFILE_AUTH_HEADER"]
+
     @property
     def _secret_key(self):
         key = current_app.config["JWT_SECRET_KEY"]
@@ -320,6 +416,37 @@ class _Config(object):
         # seconds 1 year in the future
         return None if self.session_cookie else 31540000  # 1 year
 
+    @property
+    def cookie_settings(self):
+        # Read in one go, since setting or unsetting the cookies uses all of
+        # them. Only read once per app (see JWTManager._get_cookies).
+        cfg = current_app.config
+        csrf_in_cookies = self.csrf_protect and cfg["JWT_CSRF_IN_COOKIES"]
+        return CookieSettings(
+            jwt_in_cookies=self.jwt_in_cookies,
+            csrf_in_cookies=bool(csrf_in_cookies),
+            max_age=self.cookie_max_age,
+            domain=cfg["JWT_COOKIE_DOMAIN"],
+            secure=cfg["JWT_COOKIE_SECURE"],
+            samesite=cfg["JWT_COOKIE_SAMESITE"],
+            access_cookie_name=cfg["JWT_ACCESS_COOKIE_NAME"],
+            access_cookie_path=cfg["JWT_ACCESS_COOKIE_PATH"],
+            access_csrf_cookie_name=cfg["JWT_ACCESS_CSRF_COOKIE_NAME"],
+            access_csrf_cookie_path=cfg["JWT_ACCESS_CSRF_COOKIE_PATH"],
+            refresh_cookie_name=cfg["JWT_REFRESH_COOKIE_NAME"],
+            refresh_cookie_path=cfg["JWT_REFRESH_COOKIE_PATH"],
+            refresh_csrf_cookie_name=cfg["JWT_REFRESH_CSRF_COOKIE_NAME"],
+            refresh_csrf_cookie_path=cfg["JWT_REFRESH_CSRF_COOKIE_PATH"],
+        )
+
+    @property
+    def roles_claim_key(self):
+        return current_app.config["JWT_ROLES_CLAIM"]
+
+    @property
+    def scopes_claim_key(self):
+        return current_app.config["JWT_SCOPES_CLAIM"]
+
     @property
     def identity_claim_key(self):
         return current_app.config["JWT_IDENTITY_CLAIM"]
@@ -0,0 +1,166 @@
+"""
+Precompiled ``Set-Cookie`` headers of the JWT cookies. Everything about these
+cookies but their value (and the expiry date that goes with a max age) only
+changes along with the app config, so their attributes are serialized once
+per config and only the value is filled in for each response. The headers
+are the same as the ones ``response.set_cookie`` would make.
+"""
+import re
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from werkzeug.http import dump_cookie
+
+# Everything the JWT cookies are set with, read from the config in one go
+# (see config.cookie_settings)
+CookieSettings = namedtuple(
+    "CookieSettings",
+    [
+        "jwt_in_cookies",
+        "csrf_in_cookies",
+        "max_age",
+        "domain",
+        "secure",
+        "samesite",
+        "access_cookie_name",
+        "access_cookie_path",
+        "access_csrf_cookie_name",
+        "access_csrf_cookie_path",
+        "refresh_cookie_name",
+        "refresh_cookie_path",
+        "refresh_csrf_cookie_name",
+        "refresh_csrf_cookie_path",
+    ],
+)
+
+# The cookies of one type of token. The csrf cookie is None unless the csrf
+# double submit values are set in cookies.
+CookieTemplates = namedtuple("CookieTemplates", ["token", "csrf"])
+
+# Everything needed to set the JWT cookies of an app, built once per app (see
+# JWTManager._get_cookies)
+AppCookies = namedtuple("AppCookies", ["settings", "access", "refresh"])
+
+# Values that werkzeug sets without quoting them, such as encoded JWTs and
+# csrf tokens
+_is_plain_value = re.compile(r"[A-Za-z0-9!#$%&'*+\-.^_`|~:]*\Z").match
+
+# The largest cookie werkzeug sets without warning that browsers may ignore it
+_MAX_SIZE = 4093
+
+
+class CookieTemplate(object):
+    """
+    The ``Set-Cookie`` header of a cookie, without its value.
+    """
+
+    def __init__(self, key, path, domain, secure, httponly, samesite):
+        self.key = key
+        self.attributes = dict(
+            path=path,
+            domain=domain,
+            secure=secure,
+            httponly=httponly,
+            samesite=samesite,
+        )
+        self._prefix = dump_cookie(key, path=None)
+        self._session = self._attributes_header()
+        self._expired = dump_cookie(key, expires=0, **self.attributes)
+        self._expiring = {}
+
+    def _attributes_header(self, **kwargs):
+        return dump_cookie(self.key, **kwargs, **self.attributes)[len(self._prefix) :]
+
+    def _expiring_header(self, max_age):
+        # The Expires attribute that goes with a max age changes every second
+        now = int(time.time())
+        cached = self._expiring.get(max_age)
+        if cached is None or cached[0] != now:
+            header = self._attributes_header(max_age=max_age, expires=now + max_age)
+            if len(self._expiring) >= 8:
+                self._expiring.clear()
+            cached = self._expiring[max_age] = (now, header)
+        return cached[1]
+
+    def header(self, value, max_age=None):
+        """
+        Returns the ``Set-Cookie`` header setting this cookie to `value`.
+
+        :param value: The value of the cookie
+        :param max_age: The max age of the cookie in seconds, or `None` for a
+                        session cookie
+        """
+        if isinstance(value, bytes):
+            value = value.decode()
+        if _is_plain_value(value):
+            if max_age is None:
+                header = self._prefix + value + self._session
+            elif isinstance(max_age, int):
+                header = self._prefix + value + self._expiring_header(max_age)
+            else:
+                header = None
+            if header is not None and len(header) <= _MAX_SIZE:
+                return header
+        # Left to werkzeug, which also warns about cookies that are too large
+        return dump_cookie(self.key, value, max_age=max_age, **self.attributes)
+
+    def expired_header(self):
+        """
+        Returns the ``Set-Cookie`` header deleting this cookie.
+        """
+        return self._expired
+
+
+def _templates(settings, name, path, csrf_name, csrf_path):
+    token = CookieTemplate(
+        name, path, settings.domain, settings.secure, True, settings.samesite
+    )
+    csrf = None
+    if settings.csrf_in_cookies:
+        csrf = CookieTemplate(
+            csrf_name,
+            csrf_path,
+            settings.domain,
+            settings.secure,
+            False,
+            settings.samesite,
+        )
+    return CookieTemplates(token, csrf)
+
+
+@lru_cache(maxsize=32)
+def access_cookie_templates(settings):
+    """
+    Returns the :class:`CookieTemplates` of the access token cookies.
+    """
+    return _templates(
+        settings,
+        settings.access_cookie_name,
+        settings.access_cookie_path,
+        settings.access_csrf_cookie_name,
+        settings.access_csrf_cookie_path,
+    )
+
+
+@lru_cache(maxsize=32)
+def refresh_cookie_templates(settings):
+    """
+    Returns the :class:`CookieTemplates` of the refresh token cookies.
+    """
+    return _templates(
+        settings,
+        settings.refresh_cookie_name,
+        settings.refresh_cookie_path,
+        settings.refresh_csrf_cookie_name,
+        settings.refresh_csrf_cookie_path,
+    )
+
+
+def app_cookies(settings):
+    """
+    Returns the :class:`AppCookies` of an app with these settings.
+    """
+    return AppCookies(
+        settings, access_cookie_templates(settings), refresh_cookie_templates(settings)
+    )
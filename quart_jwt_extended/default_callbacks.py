@@ -8,6 +8,8 @@ http://quart-jwt-extended.readthedocs.io/en/latest/tokens_from_complex_object.ht
 """
 from typing import Dict, Tuple
 
+from quart import request
+
 from quart_jwt_extended.config import config
 
 
@@ -127,3 +129,26 @@ def default_encode_key_callback(identity) -> str:
     JWT_PRIVATE_KEY settings will be used to encode all tokens
     """
     return config.encode_key
+
+
+def default_failed_auth_limit_key_callback(encoded_token):
+    """
+    By default, failed authentication attempts are counted per client address
+    """
+    return request.remote_addr
+
+
+def default_failed_auth_rate_limited_callback() -> Tuple[Dict[str, str], int]:
+    """
+    By default, if a client has made too many failed authentication attempts,
+    we return a generic error message with a 429 status code
+    """
+    return {config.error_msg_key: "Too many failed authentication attempts"}, 429
+
+
+def default_insufficient_claims_callback() -> Tuple[Dict[str, str], int]:
+    """
+    By default, if a token does not have the roles or scopes required by an
+    endpoint, we return a general error message with a 403 status code
+    """
+    return {config.error_msg_key: "Insufficient roles or scopes"}, 403
@@ -80,3 +80,21 @@ class UserClaimsVerificationError(JWTExtendedException):
     """
 
     pass
+
+
+class InsufficientClaimsError(JWTExtendedException):
+    """
+    Error raised when a token does not have the roles or scopes required by
+    the endpoint it is used to access
+    """
+
+    pass
+
+
+class FailedAuthRateLimitError(JWTExtendedException):
+    """
+    Error raised when a client that has made too many failed authentication
+    attempts tries to access a protected endpoint
+    """
+
+    pass
@@ -0,0 +1,112 @@
+"""
+Protection of every endpoint of an app or blueprint by a single
+``before_request`` guard, instead of decorating each view. Which token each
+endpoint needs is looked up in a table built from the views (see
+:func:`jwt_requirement`) the first time the guard runs for an app, so a
+request costs one dictionary lookup on top of verifying its token.
+"""
+from weakref import WeakKeyDictionary
+
+from quart import current_app, request
+
+from quart_jwt_extended.view_decorators import (
+    verify_fresh_jwt_in_request,
+    verify_jwt_in_request,
+    verify_jwt_in_request_optional,
+    verify_jwt_refresh_token_in_request,
+)
+
+_verify_functions = {
+    "required": verify_jwt_in_request,
+    "fresh": verify_fresh_jwt_in_request,
+    "optional": verify_jwt_in_request_optional,
+    "refresh": verify_jwt_refresh_token_in_request,
+    None: None,
+}
+
+
+def _check_requirement(requirement):
+    if requirement not in _verify_functions:
+        raise ValueError(
+            'The JWT requirement must be "required", "fresh", "optional", '
+            '"refresh" or None, not {!r}'.format(requirement)
+        )
+
+
+def _is_static_view(app, view):
+    # The views Quart adds to serve the static folder of the app and of its
+    # blueprints, as opposed to views that merely share their name
+    owner = getattr(view, "__self__", None)
+    return getattr(view, "__name__", None) == "send_static_file" and (
+        owner is app or any(owner is bp for bp in app.blueprints.values())
+    )
+
+
+def jwt_requirement(requirement):
+    """
+    A decorator setting the token an endpoint needs when it is protected by
+    :func:`protect`, without wrapping the view.
+
+    :param requirement: ``"required"``, ``"fresh"``, ``"optional"``,
+                        ``"refresh"``, or `None` to exempt the endpoint
+    """
+    _check_requirement(requirement)
+
+    def decorator(fn):
+        fn._jwt_requirement = requirement
+        return fn
+
+    return decorator
+
+
+def jwt_exempt(fn):
+    """
+    A decorator exempting an endpoint from the protection of :func:`protect`.
+    """
+    return jwt_requirement(None)(fn)
+
+
+def protect(app_or_blueprint, requirement="required", exempt=()):
+    """
+    Protects every endpoint of a Quart app or blueprint with a single
+    ``before_request`` guard. Endpoints need the token set on their view
+    with :func:`jwt_requirement` (or :func:`jwt_exempt`), or `requirement`
+    otherwise. Static files are never protected.
+
+    :param app_or_blueprint: The Quart app or blueprint to protect
+    :param requirement: The token the endpoints need by default:
+                        ``"required"`` (as
+                        :func:`~quart_jwt_extended.jwt_required`),
+                        ``"fresh"``, ``"optional"`` or ``"refresh"``
+    :param exempt: Names of endpoints that are not protected, including the
+                   name of their blueprint (such as ``"auth.login"``)
+    """
+    _check_requirement(requirement)
+    exempt = frozenset(exempt)
+    tables = WeakKeyDictionary()
+
+    def build_table(app):
+        table = {}
+        for endpoint, view in app.view_functions.items():
+            if endpoint in exempt or _is_static_view(app, view):
+                endpoint_requirement = None
+            else:
+                endpoint_requirement = getattr(view, "_jwt_requirement", requirement)
+            table[endpoint] = _verify_functions[endpoint_requirement]
+        return table
+
+    async def guard():
+        app = current_app._get_current_object()
+        endpoint = request.endpoint
+        table = tables.get(app)
+        if table is None or (endpoint not in table and endpoint is not None):
+            # Rebuilt for endpoints added since, which are never let through
+            # unprotected
+            table = tables[app] = build_table(app)
+        # Requests that match no endpoint are left to fail with a 404
+        verify = table.get(endpoint)
+        if verify is not None:
+            await verify()
+
+    app_or_blueprint.before_request(guard)
+    return guard
@@ -1,5 +1,8 @@
+import asyncio
 import datetime
+import uuid
 from warnings import warn
+from weakref import WeakKeyDictionary
 
 from jwt import (
     ExpiredSignatureError,
@@ -9,6 +12,8 @@ from jwt import (
     DecodeError,
 )
 
+from quart import current_app
+
 try:
     from quart import _app_ctx_stack as ctx_stack
 except ImportError:  # pragma: no cover
@@ -25,6 +30,8 @@ from quart_jwt_extended.exceptions import (
     CSRFError,
     UserLoadError,
     UserClaimsVerificationError,
+    FailedAuthRateLimitError,
+    InsufficientClaimsError,
 )
 from quart_jwt_extended.default_callbacks import (
     default_expired_token_callback,
@@ -40,9 +47,29 @@ from quart_jwt_extended.default_callbacks import (
     default_decode_key_callback,
     default_encode_key_callback,
     default_jwt_headers_callback,
+    default_failed_auth_limit_key_callback,
+    default_failed_auth_rate_limited_callback,
+    default_insufficient_claims_callback,
 )
+from quart_jwt_extended.caching import SingleFlight, TTLCache
+from quart_jwt_extended.clock import SystemClock
+from quart_jwt_extended.cookies import app_cookies
+from quart_jwt_extended.metrics import AuthMetrics, timed
+from quart_jwt_extended.offloading import VerificationOffloader, create_executor
+from quart_jwt_extended.profiling import get_auth_timings, server_timing_header
+from quart_jwt_extended.pruning import prune_expired_revocations, prune_periodically
+from quart_jwt_extended.rate_limiting import TokenBucketLimiter
+from quart_jwt_extended.revocation import RevocationWatermarks, _BatchedLookups
+from quart_jwt_extended.rotation import MemoryRefreshTokenFamilyStore
+from quart_jwt_extended.tracing import span
 from quart_jwt_extended.tokens import encode_refresh_token, encode_access_token
-from quart_jwt_extended.utils import get_jwt_identity, await_if_possible
+from quart_jwt_extended.utils import (
+    await_if_possible,
+    get_jwt_identity,
+    get_raw_jwt,
+    set_access_cookies,
+    verify_token_not_blacklisted,
+)
 
 
 class JWTManager(object):
@@ -80,6 +107,29 @@ class JWTManager(object):
         self._decode_key_callback = default_decode_key_callback
         self._encode_key_callback = default_encode_key_callback
         self._jwt_additional_header_callback = default_jwt_headers_callback
+        self._failed_auth_limit_key_callback = default_failed_auth_limit_key_callback
+        self._failed_auth_rate_limited_callback = (
+            default_failed_auth_rate_limited_callback
+        )
+        self._insufficient_claims_callback = default_insufficient_claims_callback
+        self._failed_auth_limiter = None
+        self._negative_cache = None
+        self._user_cache = None
+        self._blacklist_flights = SingleFlight()
+        self._user_loader_flights = SingleFlight()
+        self._refresh_token_family_store = None
+        self._revocation_watermarks = RevocationWatermarks()
+        self._revocation_store = None
+        self._revocation_lookups = None
+        self._prune_tasks = {}
+        self._verification_executor = None
+        self._verification_offloader = None
+        self._metrics = AuthMetrics()
+        self._tracer = None
+        self._auth_profile_callback = None
+        self._clock = SystemClock()
+        self._renewed_tokens = None
+        self._cookies = WeakKeyDictionary()
 
         # Register this extension with the quart app now (if it is provided)
         if app is not None:
@@ -98,7 +148,14 @@ class JWTManager(object):
 
         # Set all the default configurations for this extension
         self._set_default_configuration_options(app)
+        # The cookie options are read again after registering an app again
+        self._cookies.pop(app, None)
         self._set_error_handler_callbacks(app)
+        app.after_request(self._renew_access_token)
+        app.after_request(self._report_auth_profile)
+        app.before_serving(self._start_pruning)
+        app.after_serving(self._stop_pruning)
+        app.after_serving(self._stop_offloading)
 
     def _set_error_handler_callbacks(self, app):
         """
@@ -174,6 +231,25 @@ class JWTManager(object):
         async def handle_failed_user_claims_verification(e):
             return await await_if_possible(self._verify_claims_failed_callback())
 
+        @app.errorhandler(FailedAuthRateLimitError)
+        async def handle_failed_auth_rate_limit(e):
+            return await await_if_possible(self._failed_auth_rate_limited_callback())
+
+        @app.errorhandler(InsufficientClaimsError)
+        async def handle_insufficient_claims(e):
+            return await await_if_possible(self._insufficient_claims_callback())
+
+    async def _report_auth_profile(self, response):
+        # Sends back how long each stage of authentication took, if this
+        # request was profiled (see JWT_PROFILE_AUTH)
+        timings = get_auth_timings()
+        if timings:
+            if config.profile_auth_header:
+                response.headers.add("Server-Timing", server_timing_header(timings))
+            if self._auth_profile_callback is not None:
+                await await_if_possible(self._auth_profile_callback(timings))
+        return response
+
     @staticmethod
     def _set_default_configuration_options(app):
         """
@@ -246,6 +322,8 @@ class JWTManager(object):
 
         app.config.setdefault("JWT_IDENTITY_CLAIM", "identity")
         app.config.setdefault("JWT_USER_CLAIMS", "user_claims")
+        app.config.setdefault("JWT_ROLES_CLAIM", "roles")
+        app.config.setdefault("JWT_SCOPES_CLAIM", "scope")
         app.config.setdefault("JWT_DECODE_AUDIENCE", None)
         app.config.setdefault("JWT_ENCODE_ISSUER", None)
         app.config.setdefault("JWT_DECODE_ISSUER", None)
@@ -253,8 +331,54 @@ class JWTManager(object):
 
         app.config.setdefault("JWT_CLAIMS_IN_REFRESH_TOKEN", False)
 
+        # Option for rotating refresh tokens every time they are used
+        app.config.setdefault("JWT_REFRESH_TOKEN_ROTATION", False)
+
         app.config.setdefault("JWT_ERROR_MESSAGE_KEY", "msg")
 
+        # Options for limiting clients that keep presenting invalid tokens
+        app.config.setdefault("JWT_FAILED_AUTH_LIMIT", None)
+        app.config.setdefault("JWT_FAILED_AUTH_PERIOD", datetime.timedelta(minutes=1))
+
+        # Options for remembering recently rejected tokens
+        app.config.setdefault("JWT_NEGATIVE_CACHE_SIZE", 0)
+        app.config.setdefault("JWT_NEGATIVE_CACHE_TTL", datetime.timedelta(seconds=30))
+
+        # Options for caching the users loaded by the user loader callback
+        app.config.setdefault("JWT_USER_LOADER_CACHE_SIZE", 0)
+        app.config.setdefault(
+            "JWT_USER_LOADER_CACHE_TTL", datetime.timedelta(minutes=1)
+        )
+
+        # Share the in-flight blacklist and user loader callbacks between
+        # concurrent requests
+        app.config.setdefault("JWT_COALESCE_CALLBACKS", False)
+
+        # Options for pruning the revocations of expired tokens while serving
+        app.config.setdefault(
+            "JWT_REVOCATION_PRUNE_INTERVAL", datetime.timedelta(minutes=10)
+        )
+        app.config.setdefault("JWT_REVOCATION_PRUNE_BATCH_SIZE", 1000)
+        app.config.setdefault("JWT_REVOCATION_PRUNE_JITTER", 0.1)
+
+        # Options for verifying signatures off the event loop when it lags
+        app.config.setdefault("JWT_OFFLOAD_VERIFICATION", False)
+        app.config.setdefault(
+            "JWT_OFFLOAD_LOOP_LAG_THRESHOLD", datetime.timedelta(milliseconds=10)
+        )
+        app.config.setdefault("JWT_OFFLOAD_MAX_WORKERS", None)
+
+        # Options for renewing access tokens that are about to expire
+        app.config.setdefault("JWT_SLIDING_EXPIRATION_WINDOW", None)
+        app.config.setdefault(
+            "JWT_SLIDING_EXPIRATION_HEADER_NAME", "X-Renewed-Access-Token"
+        )
+        app.config.setdefault("JWT_SLIDING_EXPIRATION_CACHE_SIZE", 10000)
+
+        # Options for profiling each stage of authentication
+        app.config.setdefault("JWT_PROFILE_AUTH", False)
+        app.config.setdefault("JWT_PROFILE_AUTH_HEADER", True)
+
     def user_claims_loader(self, callback):
         """
         This decorator sets the callback function for adding custom claims to an
@@ -375,6 +499,12 @@ class JWTManager(object):
         able to be loaded for any reason. If this callback function returns
         `None`, the :meth:`~quart_jwt_extended.JWTManager.user_loader_error_loader`
         will be called.
+
+        The callback may be a coroutine function. It is called at most once
+        per request, even if it is protected by several decorators. Set
+        ``JWT_USER_LOADER_CACHE_SIZE`` to also reuse the loaded users across
+        requests, and ``JWT_COALESCE_CALLBACKS`` to share a call in flight
+        between concurrent requests of the same identity.
         """
         self._user_loader_callback = callback
         return callback
@@ -404,7 +534,9 @@ class JWTManager(object):
         *HINT*: The callback must be a function that takes **one** argument, which is the
         decoded JWT (python dictionary), and returns *`True`* if the token
         has been blacklisted (or is otherwise considered revoked), or *`False`*
-        otherwise.
+        otherwise. It may be a coroutine function. Set
+        ``JWT_COALESCE_CALLBACKS`` to share a call in flight between concurrent
+        requests made with the same token (by ``jti``).
         """
         self._token_in_blacklist_callback = callback
         return callback
@@ -452,7 +584,9 @@ class JWTManager(object):
         *HINT*: The callback function should be a function that takes
         **two** arguments, which are the unverified claims and headers of the jwt
         (dictionaries). The function must return a *string* which is the decode key
-        in PEM format to verify the token.
+        in PEM format to verify the token, or a JWK (for example, the key of a JWKS
+        with the ``kid`` of the headers). Loaded keys are cached, so the same key
+        is only parsed once.
         """
         self._decode_key_callback = callback
         return callback
@@ -490,6 +624,279 @@ class JWTManager(object):
         self._jwt_additional_header_callback = callback
         return callback
 
+    def failed_auth_limit_key_loader(self, callback):
+        """
+        This decorator sets the callback function used to identify a client
+        when counting failed authentication attempts (see
+        ``JWT_FAILED_AUTH_LIMIT``). By default, clients are identified by
+        their remote address.
+
+        *HINT*: The callback must be a function that takes **one** argument, which
+        is the encoded (and not yet verified) token found in the request, and
+        returns a hashable key identifying the client, such as the unverified
+        ``sub`` claim of the token.
+        """
+        self._failed_auth_limit_key_callback = callback
+        return callback
+
+    def failed_auth_rate_limited_loader(self, callback):
+        """
+        This decorator sets the callback function that will be called if a
+        client that has made too many failed authentication attempts tries to
+        access a protected endpoint. The default implementation will return a
+        429 status code with the JSON:
+
+        {"msg": "Too many failed authentication attempts"}
+
+        *HINT*: The callback must be a function that takes **no** arguments, and returns
+        a *Quart response*.
+        """
+        self._failed_auth_rate_limited_callback = callback
+        return callback
+
+    def insufficient_claims_loader(self, callback):
+        """
+        This decorator sets the callback function that will be called if a
+        valid token without the roles or scopes required by an endpoint (such
+        as ``@jwt_required(roles={"admin"})``) attempts to access it. The
+        default implementation will return a 403 status code with the JSON:
+
+        {"msg": "Insufficient roles or scopes"}
+
+        *HINT*: The callback must be a function that takes **no** arguments, and returns
+        a *Quart response*.
+        """
+        self._insufficient_claims_callback = callback
+        return callback
+
+    def auth_profile_loader(self, callback):
+        """
+        This decorator sets the callback function that will be called at the
+        end of every request profiled with ``JWT_PROFILE_AUTH``, for example to
+        log slow authentications. By default, this callback is not used.
+
+        *HINT*: The callback must be a function that takes **one** argument, which
+        is a dictionary of the seconds spent in each stage of authentication
+        (see :func:`~quart_jwt_extended.profiling.get_auth_timings`). Its
+        return value is ignored.
+        """
+        self._auth_profile_callback = callback
+        return callback
+
+    def set_failed_auth_limiter(self, limiter):
+        """
+        Sets the limiter used to count failed authentication attempts, such as
+        a :class:`~quart_jwt_extended.rate_limiting.SharedMemoryTokenBucketLimiter`
+        shared between worker processes. By default, an in-process
+        :class:`~quart_jwt_extended.rate_limiting.TokenBucketLimiter` is used
+        if ``JWT_FAILED_AUTH_LIMIT`` is set.
+
+        :param limiter: An object with ``is_limited(key)`` and
+                        ``record_failure(key)`` methods, or `None` to go back
+                        to the default limiter.
+        """
+        self._failed_auth_limiter = limiter
+
+    def _get_failed_auth_limiter(self):
+        if self._failed_auth_limiter is None and config.failed_auth_limit:
+            self._failed_auth_limiter = TokenBucketLimiter(
+                config.failed_auth_limit, config.failed_auth_period
+            )
+        return self._failed_auth_limiter
+
+    def set_metrics(self, metrics):
+        """
+        Sets the object used to record metrics about authentication, such as
+        a :class:`~quart_jwt_extended.metrics.PrometheusMetrics`. By default,
+        no metrics are recorded.
+
+        :param metrics: A :class:`~quart_jwt_extended.metrics.AuthMetrics`
+        """
+        self._metrics = metrics
+
+    def set_tracer(self, tracer):
+        """
+        Sets the OpenTelemetry tracer used to trace the verification and
+        creation of tokens, for example
+        ``jwt.set_tracer(opentelemetry.trace.get_tracer("quart_jwt_extended"))``.
+        By default, nothing is traced.
+
+        :param tracer: An OpenTelemetry ``Tracer``, or `None` to stop tracing
+        """
+        self._tracer = tracer
+
+    def set_clock(self, clock):
+        """
+        Sets the clock tokens are created and checked with, such as a
+        :class:`~quart_jwt_extended.clock.ManualClock` to move time around in
+        tests. By default, the
+        :class:`~quart_jwt_extended.clock.SystemClock` is used.
+
+        :param clock: A :class:`~quart_jwt_extended.clock.Clock`
+        """
+        self._clock = clock
+
+    def _get_negative_cache(self):
+        if self._negative_cache is None and config.negative_cache_size:
+            self._negative_cache = TTLCache(
+                config.negative_cache_size, config.negative_cache_ttl
+            )
+        return self._negative_cache
+
+    def set_refresh_token_family_store(self, store):
+        """
+        Sets the store keeping the state of the refresh token families when
+        ``JWT_REFRESH_TOKEN_ROTATION`` is enabled. By default, a
+        :class:`~quart_jwt_extended.rotation.MemoryRefreshTokenFamilyStore` is
+        used, which is not shared between processes.
+
+        :param store: A
+                      :class:`~quart_jwt_extended.rotation.RefreshTokenFamilyStore`
+        """
+        self._refresh_token_family_store = store
+
+    def _get_refresh_token_family_store(self):
+        if self._refresh_token_family_store is None:
+            self._refresh_token_family_store = MemoryRefreshTokenFamilyStore()
+        return self._refresh_token_family_store
+
+    def _next_refresh_token_generation(self, identity):
+        # Refresh tokens created while handling a rotated refresh token of the
+        # same identity carry on its family, any others start a new family
+        current_token = get_raw_jwt()
+        if (
+            current_token.get("type") == "refresh"
+            and "fam" in current_token
+            and current_token[config.identity_claim_key] == identity
+        ):
+            return current_token["fam"], current_token["gen"] + 1
+        return uuid.uuid4().hex, 0
+
+    def set_revocation_watermarks(self, watermarks):
+        """
+        Sets the object keeping the watermarks recorded by
+        :func:`~quart_jwt_extended.revoke_identity_tokens` and
+        :func:`~quart_jwt_extended.revoke_all_tokens`. By default, they are
+        kept in a :class:`~quart_jwt_extended.revocation.RevocationWatermarks`,
+        which is not shared between processes.
+
+        :param watermarks: An object with the same methods as
+                           :class:`~quart_jwt_extended.revocation.RevocationWatermarks`
+        """
+        self._revocation_watermarks = watermarks
+
+    def set_revocation_store(self, store):
+        """
+        Sets the store in which individual tokens are revoked by
+        :func:`~quart_jwt_extended.revoke_token`. When ``JWT_BLACKLIST_ENABLED``
+        is set, tokens are then checked against this store instead of with the
+        :meth:`~quart_jwt_extended.JWTManager.token_in_blacklist_loader`
+        callback, and the checks of concurrent requests are batched into a
+        single lookup.
+
+        :param store: A :class:`~quart_jwt_extended.revocation.RevocationStore`,
+                      or `None` to go back to the
+                      :meth:`~quart_jwt_extended.JWTManager.token_in_blacklist_loader`
+                      callback
+        """
+        self._revocation_store = store
+        self._revocation_lookups = None if store is None else _BatchedLookups(store)
+
+    async def prune_expired_revocations(self):
+        """
+        Removes the entries of the tokens that have expired from the
+        revocation store set with
+        :meth:`~quart_jwt_extended.JWTManager.set_revocation_store` and from
+        the refresh token family store, ``JWT_REVOCATION_PRUNE_BATCH_SIZE`` at
+        a time, and returns how many were removed. This is done every
+        ``JWT_REVOCATION_PRUNE_INTERVAL`` while the app is serving (if either
+        store is used), call it
+        yourself (in an app context) if you would rather schedule it
+        elsewhere.
+        """
+        return await prune_expired_revocations(self)
+
+    async def _start_pruning(self):
+        if config.revocation_prune_interval is None:
+            return
+        # Apps that never store revocations have nothing to prune
+        if (
+            self._revocation_store is None
+            and self._refresh_token_family_store is None
+            and not config.refresh_token_rotation
+        ):
+            return
+        app = current_app._get_current_object()
+        self._prune_tasks[app] = asyncio.ensure_future(prune_periodically(app, self))
+
+    async def _stop_pruning(self):
+        task = self._prune_tasks.pop(current_app._get_current_object(), None)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def set_verification_executor(self, executor):
+        """
+        Sets the executor signatures are verified in when
+        ``JWT_OFFLOAD_VERIFICATION`` is enabled and the event loop is lagging,
+        instead of the thread or process pool created by the extension. It is
+        not shut down when the app stops serving.
+
+        :param executor: A `concurrent.futures.Executor`
+        """
+        self._verification_executor = executor
+        self._verification_offloader = None
+
+    def _get_verification_offloader(self):
+        if self._verification_offloader is None:
+            executor = self._verification_executor
+            if executor is None:
+                executor = create_executor(
+                    config.offload_verification, config.offload_max_workers
+                )
+            self._verification_offloader = VerificationOffloader(
+                executor, config.offload_loop_lag_threshold
+            )
+        return self._verification_offloader
+
+    async def _stop_offloading(self):
+        offloader, self._verification_offloader = self._verification_offloader, None
+        if offloader is not None:
+            offloader.monitor.stop()
+            if offloader.executor is not self._verification_executor:
+                offloader.executor.shutdown(wait=False)
+
+    def _get_user_cache(self):
+        if self._user_cache is None and config.user_loader_cache_size:
+            self._user_cache = TTLCache(
+                config.user_loader_cache_size, config.user_loader_cache_ttl
+            )
+        return self._user_cache
+
+    def invalidate_cached_user(self, identity):
+        """
+        Removes the user loaded for `identity` from the cache enabled with
+        ``JWT_USER_LOADER_CACHE_SIZE``, so that the next request made with this
+        identity calls the
+        :meth:`~quart_jwt_extended.JWTManager.user_loader_callback_loader`
+        callback again. Call this whenever a user is updated or deleted.
+
+        :param identity: The identity of the user, as found in its tokens
+        """
+        if self._user_cache is not None:
+            self._user_cache.pop(identity)
+
+    def clear_cached_users(self):
+        """
+        Removes every user from the cache enabled with
+        ``JWT_USER_LOADER_CACHE_SIZE``.
+        """
+        if self._user_cache is not None:
+            self._user_cache.clear()
+
     def _create_refresh_token(
         self, identity, expires_delta=None, user_claims=None, headers=None
     ):
@@ -502,18 +909,30 @@ class JWTManager(object):
         if headers is None:
             headers = self._jwt_additional_header_callback(identity)
 
-        refresh_token = encode_refresh_token(
-            identity=self._user_identity_callback(identity),
-            secret=self._encode_key_callback(identity),
-            algorithm=config.algorithm,
-            expires_delta=expires_delta,
-            user_claims=user_claims,
-            csrf=config.csrf_protect,
-            identity_claim_key=config.identity_claim_key,
-            user_claims_key=config.user_claims_key,
-            json_encoder=config.json_encoder,
-            headers=headers,
-        )
+        token_identity = self._user_identity_callback(identity)
+        family = generation = None
+        if config.refresh_token_rotation:
+            family, generation = self._next_refresh_token_generation(token_identity)
+
+        algorithm = config.algorithm
+        with span(self._tracer, "jwt.sign", type="refresh", algorithm=algorithm), timed(
+            self._metrics, "create_token", type="refresh", algorithm=algorithm
+        ):
+            refresh_token = encode_refresh_token(
+                identity=token_identity,
+                secret=self._encode_key_callback(identity),
+                algorithm=algorithm,
+                expires_delta=expires_delta,
+                user_claims=user_claims,
+                csrf=config.csrf_protect,
+                identity_claim_key=config.identity_claim_key,
+                user_claims_key=config.user_claims_key,
+                json_encoder=config.json_encoder,
+                headers=headers,
+                family=family,
+                generation=generation,
+                now=self._clock.now(),
+            )
         return refresh_token
 
     def _create_access_token(
@@ -528,18 +947,129 @@ class JWTManager(object):
         if headers is None:
             headers = self._jwt_additional_header_callback(identity)
 
-        access_token = encode_access_token(
-            identity=self._user_identity_callback(identity),
-            secret=self._encode_key_callback(identity),
-            algorithm=config.algorithm,
-            expires_delta=expires_delta,
-            fresh=fresh,
-            user_claims=user_claims,
-            csrf=config.csrf_protect,
-            identity_claim_key=config.identity_claim_key,
-            user_claims_key=config.user_claims_key,
-            json_encoder=config.json_encoder,
-            headers=headers,
-            issuer=config.encode_issuer,
+        return self._encode_access_token(
+            self._user_identity_callback(identity),
+            self._encode_key_callback(identity),
+            fresh,
+            expires_delta,
+            user_claims,
+            headers,
         )
+
+    def _encode_access_token(
+        self,
+        token_identity,
+        secret,
+        fresh,
+        expires_delta,
+        user_claims,
+        headers,
+        csrf_value=None,
+    ):
+        algorithm = config.algorithm
+        with span(self._tracer, "jwt.sign", type="access", algorithm=algorithm), timed(
+            self._metrics, "create_token", type="access", algorithm=algorithm
+        ):
+            access_token = encode_access_token(
+                identity=token_identity,
+                secret=secret,
+                algorithm=algorithm,
+                expires_delta=expires_delta,
+                fresh=fresh,
+                user_claims=user_claims,
+                csrf=csrf_value or config.csrf_protect,
+                identity_claim_key=config.identity_claim_key,
+                user_claims_key=config.user_claims_key,
+                json_encoder=config.json_encoder,
+                headers=headers,
+                issuer=config.encode_issuer,
+                now=self._clock.now(),
+            )
         return access_token
+
+    def _get_cookies(self):
+        # The cookie options are read once per app, when cookies are first
+        # set or unset, along with the Set-Cookie templates made from them
+        app = current_app._get_current_object()
+        cookies = self._cookies.get(app)
+        if cookies is None:
+            cookies = self._cookies[app] = app_cookies(config.cookie_settings)
+        return cookies
+
+    def _get_renewed_tokens(self):
+        if self._renewed_tokens is None:
+            leeway = config.leeway
+            if isinstance(leeway, datetime.timedelta):
+                leeway = leeway.total_seconds()
+            # A token stays within the window until it expires, so it only
+            # ever needs to be renewed once
+            self._renewed_tokens = TTLCache(
+                config.sliding_expiration_cache_size,
+                config.sliding_expiration_window + leeway,
+            )
+        return self._renewed_tokens
+
+    async def _renew_access_token(self, response):
+        # Replaces the access token this request was authenticated with when
+        # it is about to expire (see JWT_SLIDING_EXPIRATION_WINDOW)
+        window = config.sliding_expiration_window
+        if window is None or response.status_code >= 400:
+            return response
+        ctx = ctx_stack.top
+        decoded_token = getattr(ctx, "jwt", None)
+        location = getattr(ctx, "access_jwt_location", None)
+        if (
+            not decoded_token
+            or decoded_token["type"] != "access"
+            or location not in ("cookies", "headers")
+            or "exp" not in decoded_token
+            or decoded_token["exp"] - self._clock.now() > window
+        ):
+            return response
+
+        jti = decoded_token["jti"]
+        renewed_tokens = self._get_renewed_tokens()
+        if jti is None or jti in renewed_tokens:
+            return response
+        if location == "cookies":
+            # Such as when logging out, the cookies set by the view are kept
+            prefix = config.access_cookie_name + "="
+            if any(
+                h.startswith(prefix) for h in response.headers.getlist("Set-Cookie")
+            ):
+                return response
+        header_name = config.sliding_expiration_header_name
+        if location == "headers" and header_name in response.headers:
+            return response
+        # Claimed before yielding to the event loop, so that concurrent
+        # requests with the same token do not all renew it
+        renewed_tokens.set(jti, True)
+
+        try:
+            # The token may have been revoked while handling this request
+            await verify_token_not_blacklisted(decoded_token, "access")
+        except RevokedTokenError:
+            return response
+        identity = decoded_token[config.identity_claim_key]
+        fresh = decoded_token["fresh"]
+        headers = {
+            k: v
+            for k, v in getattr(ctx, "jwt_header", {}).items()
+            if k not in ("alg", "typ")
+        }
+        access_token = self._encode_access_token(
+            identity,
+            self._encode_key_callback(identity),
+            False if isinstance(fresh, bool) else fresh,
+            config.access_expires,
+            decoded_token[config.user_claims_key],
+            headers or None,
+            # The client may only know the double submit value of the token
+            # it sent, such as when it is not set in cookies
+            csrf_value=decoded_token.get("csrf"),
+        )
+        if location == "cookies":
+            set_access_cookies(response, access_token)
+        else:
+            response.headers[header_name] = access_token
+        return response
@@ -0,0 +1,143 @@
+"""
+Metrics about what authentication costs. By default nothing is recorded;
+install a :class:`PrometheusMetrics` object (or your own subclass of
+:class:`AuthMetrics`) with :meth:`~quart_jwt_extended.JWTManager.set_metrics`
+to start recording.
+
+These are the metrics that are recorded:
+
+=================== ========= ============================================
+Name                Type      Labels
+=================== ========= ============================================
+``verify``          latency   ``algorithm``
+``auth_errors``     counter   ``error``, ``location``
+``blacklist_check`` latency
+``blacklist_hits``  counter   ``revoked``
+``user_load``       latency
+``create_token``    latency   ``type``, ``algorithm``
+=================== ========= ============================================
+
+The ``algorithm`` of ``verify`` is ``"invalid"`` for tokens whose header names
+an algorithm that is not accepted, so clients cannot add new series.
+"""
+from contextlib import nullcontext
+from time import perf_counter
+
+try:
+    import prometheus_client
+except ImportError:  # pragma: no cover
+    prometheus_client = None
+
+
+class AuthMetrics(object):
+    """
+    The interface metrics are recorded through. This implementation does
+    nothing, and as long as ``enabled`` is False the extension will not even
+    time anything.
+    """
+
+    enabled = False
+
+    def observe(self, name, seconds, **labels):
+        """
+        Records how long (in seconds) an operation took.
+        """
+
+    def increment(self, name, **labels):
+        """
+        Increments a counter by one.
+        """
+
+
+class PrometheusMetrics(AuthMetrics):
+    """
+    Records metrics with `prometheus_client`, as histograms (for latencies)
+    and counters named ``<namespace>_<name>_seconds`` and
+    ``<namespace>_<name>_total``.
+
+    :param registry: The prometheus registry to register the metrics with.
+                     Defaults to the global registry.
+    :param namespace: Prefix for the names of the metrics
+    :param buckets: Histogram buckets (in seconds) for the latencies
+    """
+
+    enabled = True
+
+    _latencies = {
+        "verify": ("Time spent verifying a token", ("algorithm",)),
+        "blacklist_check": ("Time spent in the token_in_blacklist callback", ()),
+        "user_load": ("Time spent in the user loader callback", ()),
+        "create_token": ("Time spent creating a token", ("type", "algorithm")),
+    }
+    _counters = {
+        "auth_errors": ("Failed authentication attempts", ("error", "location")),
+        "blacklist_hits": ("Blacklist checks by outcome", ("revoked",)),
+    }
+
+    def __init__(
+        self,
+        registry=None,
+        namespace="jwt",
+        buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1),
+    ):
+        if prometheus_client is None:
+            raise RuntimeError(
+                "prometheus_client must be installed to use PrometheusMetrics"
+            )
+        if registry is None:
+            registry = prometheus_client.REGISTRY
+
+        self._metrics = {}
+        for name, (documentation, labels) in self._latencies.items():
+            self._metrics[name] = prometheus_client.Histogram(
+                "{}_{}_seconds".format(namespace, name),
+                documentation,
+                labels,
+                registry=registry,
+                buckets=buckets,
+            )
+        for name, (documentation, labels) in self._counters.items():
+            self._metrics[name] = prometheus_client.Counter(
+                "{}_{}".format(namespace, name),
+                documentation,
+                labels,
+                registry=registry,
+            )
+
+    def _metric(self, name, labels):
+        metric = self._metrics[name]
+        return metric.labels(**labels) if labels else metric
+
+    def observe(self, name, seconds, **labels):
+        self._metric(name, labels).observe(seconds)
+
+    def increment(self, name, **labels):
+        self._metric(name, labels).inc()
+
+
+class _Timer(object):
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, perf_counter() - self.start, **self.labels)
+
+
+_not_timed = nullcontext()
+
+
+def timed(metrics, name, **labels):
+    """
+    Returns a context manager recording how long its block took as the `name`
+    latency of `metrics`. Nothing is timed if the metrics are not enabled.
+    """
+    if not metrics.enabled:
+        return _not_timed
+    return _Timer(metrics, name, labels)
@@ -0,0 +1,120 @@
+"""
+Offloading of signature verification while the event loop is under pressure.
+Verifying an RSA, ECDSA or EdDSA signature takes long enough that, when many
+requests are being authenticated at once, everything else running on the
+event loop waits behind it. With ``JWT_OFFLOAD_VERIFICATION`` set, the lag of
+the event loop (how late it runs the callbacks that are due) is measured, and
+while it is above ``JWT_OFFLOAD_LOOP_LAG_THRESHOLD`` these signatures are
+verified in a thread pool (``cryptography`` releases the GIL while verifying)
+or in a process pool. Otherwise they are still verified inline, which is
+cheaper than handing them off.
+"""
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from quart_jwt_extended.config import requires_cryptography
+from quart_jwt_extended.tokens import _verify_signature
+
+
+class LoopLagMonitor(object):
+    """
+    Measures the lag of an event loop by scheduling a callback every
+    `interval` seconds and recording how late it runs.
+
+    :param interval: How often (in seconds) the lag is measured
+    :param timer: Function returning the current time in seconds
+    """
+
+    def __init__(self, interval=0.05, timer=time.monotonic):
+        self.interval = interval
+        self.timer = timer
+        self.lag = 0.0
+        self.loop = None
+        self._handle = None
+        self._expected = None
+
+    def start(self, loop):
+        """
+        Starts measuring the lag of `loop`, forgetting any previous loop.
+        """
+        self.stop()
+        self.loop = loop
+        self._schedule()
+
+    def stop(self):
+        """
+        Stops measuring the lag.
+        """
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self.loop = None
+        self.lag = 0.0
+
+    def _schedule(self):
+        self._expected = self.timer() + self.interval
+        self._handle = self.loop.call_later(self.interval, self._measure)
+
+    def _measure(self):
+        self.lag = max(0.0, self.timer() - self._expected)
+        self._schedule()
+
+
+class VerificationOffloader(object):
+    """
+    Decides whether to verify a signature inline or in `executor`, depending
+    on the lag of the running event loop.
+
+    :param executor: A `concurrent.futures.Executor`
+    :param threshold: The lag (in seconds) above which signatures are
+                      verified in `executor`
+    :param monitor: The :class:`LoopLagMonitor` measuring the lag
+    """
+
+    def __init__(self, executor, threshold, monitor=None):
+        self.executor = executor
+        self.threshold = threshold
+        self.monitor = LoopLagMonitor() if monitor is None else monitor
+
+    def should_offload(self, algorithm):
+        """
+        Returns True if signatures of `algorithm` should be verified in the
+        executor right now.
+        """
+        if algorithm not in requires_cryptography:
+            # Verifying an HMAC costs less than handing it off
+            return False
+        loop = asyncio.get_event_loop()
+        if self.monitor.loop is not loop:
+            self.monitor.start(loop)
+        return self.monitor.lag >= self.threshold
+
+    async def verify_signature(self, raw_token, secret, algorithms):
+        """
+        Verifies the signature of `raw_token` in the executor. Keys that were
+        already loaded (such as ``cryptography`` key objects returned by the
+        ``decode_key_loader``) cannot be sent to a process pool, so their
+        signatures are verified inline instead.
+        """
+        if isinstance(self.executor, ProcessPoolExecutor) and not isinstance(
+            secret, (str, bytes)
+        ):
+            _verify_signature(raw_token, secret, algorithms)
+            return
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(
+            self.executor, _verify_signature, raw_token, secret, algorithms
+        )
+
+
+def create_executor(kind, max_workers=None):
+    # The executor used for JWT_OFFLOAD_VERIFICATION
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers, thread_name_prefix="jwt-verify")
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers)
+    raise RuntimeError(
+        'JWT_OFFLOAD_VERIFICATION must be False, "thread" or "process", '
+        "not {!r}".format(kind)
+    )
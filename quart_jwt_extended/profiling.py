@@ -0,0 +1,83 @@
+"""
+Per-request profiling of the authentication pipeline. When
+``JWT_PROFILE_AUTH`` is enabled, the time spent in each of these stages is
+recorded on the app context of every request:
+
+============== ===================================================
+Stage          Covers
+============== ===================================================
+``extract``    Looking for the token in each of ``JWT_TOKEN_LOCATION``
+``parse``      Splitting and base64/json decoding the token
+``key_lookup`` The ``decode_key_loader`` callback
+``verify``     Verifying the signature and registered claims
+``blacklist``  The ``token_in_blacklist_loader`` callback
+``claims``     The ``claims_verification_loader`` callback
+``user_load``  The ``user_loader_callback_loader`` callback
+============== ===================================================
+
+The timings are sent back in a ``Server-Timing`` header (unless
+``JWT_PROFILE_AUTH_HEADER`` is False) and handed to the
+:meth:`~quart_jwt_extended.JWTManager.auth_profile_loader` callback. When
+profiling is disabled, nothing is timed.
+"""
+from contextlib import nullcontext
+from time import perf_counter
+
+try:
+    from quart import _app_ctx_stack as ctx_stack
+except ImportError:  # pragma: no cover
+    from quart import _request_ctx_stack as ctx_stack
+
+from quart_jwt_extended.config import config
+
+
+class _StageTimer(object):
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = perf_counter() - self.start
+        ctx = ctx_stack.top
+        timings = getattr(ctx, "jwt_auth_timings", None)
+        if timings is None:
+            timings = ctx.jwt_auth_timings = {}
+        timings[self.stage] = timings.get(self.stage, 0) + elapsed
+
+
+_not_profiled = nullcontext()
+
+
+def profiled(stage):
+    """
+    Returns a context manager adding how long its block took to the time
+    spent in `stage` during the current request, or doing nothing if
+    ``JWT_PROFILE_AUTH`` is disabled.
+    """
+    if not config.profile_auth:
+        return _not_profiled
+    return _StageTimer(stage)
+
+
+def get_auth_timings():
+    """
+    Returns a dictionary of the seconds spent in each stage of authentication
+    during the current request, in the order the stages ran. This is empty
+    unless ``JWT_PROFILE_AUTH`` is enabled.
+    """
+    return getattr(ctx_stack.top, "jwt_auth_timings", {})
+
+
+def server_timing_header(timings):
+    """
+    Formats `timings` as the value of a ``Server-Timing`` header, with the
+    durations in milliseconds.
+    """
+    return ", ".join(
+        "jwt-{};dur={:.3f}".format(stage.replace("_", "-"), seconds * 1000)
+        for stage, seconds in timings.items()
+    )
@@ -0,0 +1,49 @@
+"""
+Periodic removal of the revocation entries of tokens that have expired. While
+the app is serving, every ``JWT_REVOCATION_PRUNE_INTERVAL`` (give or take
+``JWT_REVOCATION_PRUNE_JITTER``, so that the workers of a deployment do not
+all prune at the same time), the expired entries of the revocation store set
+with :meth:`~quart_jwt_extended.JWTManager.set_revocation_store` and of the
+refresh token family store are removed, ``JWT_REVOCATION_PRUNE_BATCH_SIZE``
+at a time.
+"""
+import asyncio
+import random
+
+from quart_jwt_extended.config import config
+
+
+async def prune_expired_revocations(jwt_manager):
+    # Returns how many entries were removed, yielding to the event loop
+    # between batches so that requests are not held up
+    removed = 0
+    store = jwt_manager._revocation_store
+    if store is not None:
+        batch_size = config.revocation_prune_batch_size
+        while True:
+            pruned = await store.prune_expired(limit=batch_size)
+            removed += pruned
+            if pruned < batch_size:
+                break
+            await asyncio.sleep(0)
+    if jwt_manager._refresh_token_family_store is not None:
+        removed += await jwt_manager._refresh_token_family_store.prune_expired()
+    return removed
+
+
+def _next_delay():
+    jitter = config.revocation_prune_jitter
+    return config.revocation_prune_interval * random.uniform(1 - jitter, 1 + jitter)
+
+
+async def prune_periodically(app, jwt_manager):
+    while True:
+        async with app.app_context():
+            delay = _next_delay()
+        await asyncio.sleep(delay)
+        try:
+            async with app.app_context():
+                await prune_expired_revocations(jwt_manager)
+        except Exception:
+            # Keep pruning on the next run, the store may be back by then
+            app.logger.exception("Failed to prune the expired revocations")
@@ -0,0 +1,139 @@
+"""
+Limiters used to cheaply turn away clients that keep presenting invalid
+tokens, before any signature verification is done for them. Both limiters
+here are token buckets: every failed attempt puts one token in a client's
+bucket, the bucket drains at a rate of ``limit`` tokens per ``period``
+seconds, and once a bucket is full the client is limited until it drains.
+"""
+import struct
+import time
+import zlib
+from collections import OrderedDict
+
+
+class TokenBucketLimiter(object):
+    """
+    An in-process limiter of failed authentication attempts. This is used
+    by default if ``JWT_FAILED_AUTH_LIMIT`` is set.
+
+    :param limit: How many failed attempts a client may make in a row
+    :param period: How long (in seconds) it takes for a client's full bucket
+                   to drain completely
+    :param max_clients: The maximum number of clients to keep track of. The
+                        least recently failing clients are forgotten first.
+    """
+
+    def __init__(self, limit, period, max_clients=10000):
+        self.limit = limit
+        self.rate = limit / period
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+
+    def _level(self, bucket, now):
+        level, last = bucket
+        return max(0.0, level - (now - last) * self.rate)
+
+    def is_limited(self, key):
+        """
+        Returns True if the client identified by `key` has used up all of
+        its failed attempts.
+        """
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return False
+        return self._level(bucket, time.monotonic()) + 1 > self.limit
+
+    def record_failure(self, key):
+        """
+        Records a failed authentication attempt by the client identified by
+        `key`.
+        """
+        now = time.monotonic()
+        bucket = self._buckets.pop(key, None)
+        level = self._level(bucket, now) if bucket else 0.0
+        self._buckets[key] = (min(level + 1, self.limit), now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+
+class SharedMemoryTokenBucketLimiter(object):
+    """
+    A limiter of failed authentication attempts whose buckets live in a
+    named block of shared memory, so that all the worker processes of an
+    app attaching to the same ``name`` share their counts. Requires
+    python 3.8 or newer.
+
+    Clients are hashed into a fixed number of slots, so two clients sharing
+    a slot share a bucket, and concurrent updates to the same slot from
+    different processes are not locked; the counts are approximate.
+
+    :param name: Name of the shared memory block. It is created by the
+                 first process to use it and attached to by the others.
+    :param limit: How many failed attempts a client may make in a row
+    :param period: How long (in seconds) it takes for a client's full bucket
+                   to drain completely
+    :param slots: How many buckets to allocate in the shared memory block
+    """
+
+    _slot = struct.Struct("dd")
+
+    def __init__(self, name, limit, period, slots=65536):
+        try:
+            from multiprocessing import shared_memory
+        except ImportError:  # pragma: no cover
+            raise RuntimeError(
+                "SharedMemoryTokenBucketLimiter requires python 3.8 or newer"
+            )
+
+        self.limit = limit
+        self.rate = limit / period
+        self.slots = slots
+        size = self._slot.size * slots
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self._owner = True
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+            # Attaching processes must not unlink the block when they exit,
+            # which the resource tracker would otherwise do
+            try:
+                from multiprocessing import resource_tracker
+
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+            except Exception:  # pragma: no cover
+                pass
+
+    def _offset(self, key):
+        index = zlib.crc32(str(key).encode("utf-8")) % self.slots
+        return index * self._slot.size
+
+    def _level(self, offset, now):
+        level, last = self._slot.unpack_from(self._shm.buf, offset)
+        return max(0.0, level - (now - last) * self.rate)
+
+    def is_limited(self, key):
+        """
+        Returns True if the client identified by `key` has used up all of
+        its failed attempts.
+        """
+        return self._level(self._offset(key), time.monotonic()) + 1 > self.limit
+
+    def record_failure(self, key):
+        """
+        Records a failed authentication attempt by the client identified by
+        `key`.
+        """
+        now = time.monotonic()
+        offset = self._offset(key)
+        level = min(self._level(offset, now) + 1, self.limit)
+        self._slot.pack_into(self._shm.buf, offset, level, now)
+
+    def close(self):
+        """
+        Detaches from the shared memory block, removing it if this is the
+        limiter that created it.
+        """
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,323 @@
+"""
+Revocation of tokens in bulk. Instead of remembering every revoked token,
+:func:`~quart_jwt_extended.revoke_identity_tokens` records a watermark for an
+identity: every token of that identity issued (see its ``iat`` claim) before
+the watermark is revoked, for example when the user changes their password.
+:func:`~quart_jwt_extended.revoke_all_tokens` does the same for every token,
+for example after rotating a compromised key.
+
+Watermarks are checked for every token, whether or not
+``JWT_BLACKLIST_ENABLED`` is set, as soon as one has been recorded.
+
+Individual tokens can be revoked in a :class:`RevocationStore`, such as
+:class:`MemoryRevocationStore`, :class:`SQLiteRevocationStore` or
+:class:`RedisRevocationStore`.
+"""
+import asyncio
+import sqlite3
+import time
+
+
+class RevocationWatermarks(object):
+    """
+    Keeps the revocation watermarks (as unix timestamps) in a dictionary of
+    the current process, indexed by identity, along with the global
+    watermark. Watermarks only ever move forward. Set your own implementation
+    of these methods (for example, one synchronised between processes) with
+    :meth:`~quart_jwt_extended.JWTManager.set_revocation_watermarks`.
+    """
+
+    def __init__(self):
+        self.global_watermark = None
+        self._identities = {}
+
+    def __len__(self):
+        return len(self._identities)
+
+    def __bool__(self):
+        return self.global_watermark is not None or bool(self._identities)
+
+    def is_revoked(self, identity, issued_at):
+        """
+        Returns True if a token of `identity` issued at `issued_at` (or
+        whose issue time is unknown, if this is `None`) has been revoked.
+        """
+        watermark = self.global_watermark
+        if self._identities:
+            try:
+                identity_watermark = self._identities.get(identity)
+            except TypeError:
+                # Unhashable identities cannot have a watermark
+                identity_watermark = None
+            if identity_watermark is not None and (
+                watermark is None or identity_watermark > watermark
+            ):
+                watermark = identity_watermark
+        if watermark is None:
+            return False
+        return issued_at is None or issued_at < watermark
+
+    def revoke_identity(self, identity, issued_before):
+        """
+        Revokes the tokens of `identity` issued before the `issued_before`
+        unix timestamp.
+        """
+        current = self._identities.get(identity)
+        if current is None or current < issued_before:
+            self._identities[identity] = issued_before
+
+    def revoke_all(self, issued_before):
+        """
+        Revokes every token issued before the `issued_before` unix timestamp.
+        """
+        if self.global_watermark is None or self.global_watermark < issued_before:
+            self.global_watermark = issued_before
+
+    def prune(self, issued_before):
+        """
+        Forgets the watermarks that are not later than `issued_before`, the
+        unix timestamp before which every token issued has expired anyway.
+        Returns how many watermarks were removed.
+        """
+        stale = [
+            identity
+            for identity, watermark in self._identities.items()
+            if watermark <= issued_before
+        ]
+        for identity in stale:
+            del self._identities[identity]
+        if self.global_watermark is not None and self.global_watermark <= issued_before:
+            self.global_watermark = None
+            return len(stale) + 1
+        return len(stale)
+
+
+class RevocationStore(object):
+    """
+    The interface of the stores revoked tokens can be kept in, by ``jti``.
+    Once a store is set with
+    :meth:`~quart_jwt_extended.JWTManager.set_revocation_store`, it is used
+    instead of the
+    :meth:`~quart_jwt_extended.JWTManager.token_in_blacklist_loader` callback
+    to check tokens when ``JWT_BLACKLIST_ENABLED`` is set.
+
+    The checks made by concurrent requests during the same iteration of the
+    event loop are coalesced into a single call to :meth:`is_revoked_many`, so
+    stores only need a single round trip for all of them. All the methods are
+    coroutines.
+    """
+
+    async def is_revoked(self, jti):
+        """
+        Returns True if the token with this `jti` has been revoked.
+        """
+        return (await self.is_revoked_many([jti]))[0]
+
+    async def is_revoked_many(self, jtis):
+        """
+        Returns a list telling for each of `jtis` if that token was revoked.
+        """
+        raise NotImplementedError
+
+    async def revoke(self, jti, expires_at):
+        """
+        Revokes the token with this `jti`.
+
+        :param jti: The ``jti`` claim of the token
+        :param expires_at: The ``exp`` claim of the token (a unix timestamp),
+                           after which it can be forgotten, or `None` if the
+                           token never expires
+        """
+        await self.revoke_many([(jti, expires_at)])
+
+    async def revoke_many(self, tokens):
+        """
+        Revokes several tokens at once.
+
+        :param tokens: An iterable of ``(jti, expires_at)`` tuples
+        """
+        raise NotImplementedError
+
+    async def prune_expired(self, limit=None):
+        """
+        Forgets (at most `limit` of) the revoked tokens that have expired,
+        returning how many were removed.
+        """
+        raise NotImplementedError
+
+
+class MemoryRevocationStore(RevocationStore):
+    """
+    Keeps the revoked tokens in a dictionary of the current process.
+
+    :param timer: Function returning the current unix timestamp
+    """
+
+    def __init__(self, timer=time.time):
+        self.timer = timer
+        self._revoked = {}
+
+    def __len__(self):
+        return len(self._revoked)
+
+    async def is_revoked(self, jti):
+        return jti in self._revoked
+
+    async def is_revoked_many(self, jtis):
+        revoked = self._revoked
+        return [jti in revoked for jti in jtis]
+
+    async def revoke_many(self, tokens):
+        self._revoked.update(tokens)
+
+    async def prune_expired(self, limit=None):
+        now = self.timer()
+        expired = [
+            jti
+            for jti, expires_at in self._revoked.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        for jti in expired[:limit]:
+            del self._revoked[jti]
+        return len(expired[:limit])
+
+
+class SQLiteRevocationStore(RevocationStore):
+    """
+    Keeps the revoked tokens in a table of a SQLite database, indexed by
+    ``jti`` and by expiry so that expired tokens can be pruned without
+    scanning the table. As local SQLite queries only take microseconds,
+    they are run directly on the event loop.
+
+    :param database: The path of the database file, or ``":memory:"``
+    :param table: The name of the table, which is created if needed
+    :param timer: Function returning the current unix timestamp
+    """
+
+    # Stay below the lowest default SQLITE_MAX_VARIABLE_NUMBER
+    _chunk_size = 500
+
+    def __init__(self, database, table="revoked_tokens", timer=time.time):
+        self.timer = timer
+        self._table = table
+        self._connection = sqlite3.connect(
+            database, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS {} "
+            "(jti TEXT PRIMARY KEY, exp INTEGER) WITHOUT ROWID".format(table)
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS {0}_exp ON {0} (exp)".format(table)
+        )
+
+    def close(self):
+        """
+        Closes the connection to the database.
+        """
+        self._connection.close()
+
+    async def is_revoked(self, jti):
+        query = "SELECT 1 FROM {} WHERE jti = ?".format(self._table)
+        return self._connection.execute(query, (jti,)).fetchone() is not None
+
+    async def is_revoked_many(self, jtis):
+        revoked = set()
+        for start in range(0, len(jtis), self._chunk_size):
+            chunk = jtis[start : start + self._chunk_size]
+            query = "SELECT jti FROM {} WHERE jti IN ({})".format(
+                self._table, ", ".join("?" * len(chunk))
+            )
+            revoked.update(row[0] for row in self._connection.execute(query, chunk))
+        return [jti in revoked for jti in jtis]
+
+    async def revoke_many(self, tokens):
+        query = "INSERT OR REPLACE INTO {} (jti, exp) VALUES (?, ?)".format(self._table)
+        with self._connection:
+            self._connection.execute("BEGIN")
+            self._connection.executemany(query, tokens)
+
+    async def prune_expired(self, limit=None):
+        query = (
+            "DELETE FROM {0} WHERE jti IN "
+            "(SELECT jti FROM {0} WHERE exp <= ? LIMIT ?)".format(self._table)
+        )
+        limit = -1 if limit is None else limit
+        return self._connection.execute(query, (self.timer(), limit)).rowcount
+
+
+class RedisRevocationStore(RevocationStore):
+    """
+    Keeps the revoked tokens as keys of a redis server, which expire along
+    with the tokens, so they never need to be pruned. Batched lookups are a
+    single ``MGET``.
+
+    :param client: An asyncio redis client, such as a ``redis.asyncio.Redis``
+                   (or anything speaking the same protocol, such as a
+                   ``fakeredis`` client in tests)
+    :param prefix: Prefix of the keys of the revoked tokens
+    :param timer: Function returning the current unix timestamp
+    """
+
+    def __init__(self, client, prefix="jwt:revoked:", timer=time.time):
+        self.client = client
+        self.prefix = prefix
+        self.timer = timer
+
+    async def is_revoked(self, jti):
+        return await self.client.get(self.prefix + jti) is not None
+
+    async def is_revoked_many(self, jtis):
+        values = await self.client.mget([self.prefix + jti for jti in jtis])
+        return [value is not None for value in values]
+
+    async def revoke_many(self, tokens):
+        pipeline = self.client.pipeline(transaction=False)
+        now = self.timer()
+        for jti, expires_at in tokens:
+            ttl = None if expires_at is None else max(1, int(expires_at - now))
+            pipeline.set(self.prefix + jti, 1, ex=ttl)
+        await pipeline.execute()
+
+    async def prune_expired(self, limit=None):
+        return 0
+
+
+class _BatchedLookups(object):
+    # Coalesces the lookups made during an iteration of the event loop into a
+    # single call to the is_revoked_many method of the store, made once the
+    # callbacks that were already scheduled have run.
+
+    def __init__(self, store):
+        self.store = store
+        self._pending = None
+
+    def is_revoked(self, jti):
+        loop = asyncio.get_event_loop()
+        if self._pending is None:
+            self._pending = {}
+            loop.call_soon(self._flush)
+        future = self._pending.get(jti)
+        if future is None:
+            future = self._pending[jti] = loop.create_future()
+        # Lookups of the same jti share the future, which a cancelled caller
+        # must not cancel for the others
+        return asyncio.shield(future)
+
+    def _flush(self):
+        pending, self._pending = self._pending, None
+        asyncio.ensure_future(self._lookup(pending))
+
+    async def _lookup(self, pending):
+        jtis = list(pending)
+        try:
+            results = await self.store.is_revoked_many(jtis)
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for jti, revoked in zip(jtis, results):
+            future = pending[jti]
+            if not future.done():
+                future.set_result(bool(revoked))
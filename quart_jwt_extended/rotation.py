@@ -0,0 +1,118 @@
+"""
+Refresh token rotation. With ``JWT_REFRESH_TOKEN_ROTATION`` enabled, every
+refresh token belongs to a family (its ``fam`` claim) started when the user
+logged in, and has a generation (its ``gen`` claim) within that family.
+
+A refresh token can only be used once: using it moves its family on to the
+next generation, which is the generation of the refresh token
+:func:`~quart_jwt_extended.create_refresh_token` issues during that request.
+If an older generation is ever used again, the token must have been stolen
+(either by whoever uses it now or by whoever used it first), so the whole
+family is revoked and its owner has to log in again.
+
+The state of every family is a single entry in a
+:class:`RefreshTokenFamilyStore`, so checking a token is a single lookup
+however many times the family was rotated.
+"""
+import time
+
+# Generation recorded for revoked families
+REVOKED = -1
+
+
+class RefreshTokenFamilyStore(object):
+    """
+    The interface the state of the refresh token families is kept in. Set
+    your own implementation (for example backed by redis, to share families
+    between processes) with
+    :meth:`~quart_jwt_extended.JWTManager.set_refresh_token_family_store`.
+    All the methods are coroutines.
+    """
+
+    async def use(self, family, generation, expires_at):
+        """
+        Atomically records that the refresh token of `generation` in `family`
+        is being used. If `generation` is the current generation of the family
+        (or the family is unknown), the family moves on to generation
+        ``generation + 1`` and True is returned. Otherwise the family is
+        revoked and False is returned.
+
+        :param family: The family id
+        :param generation: The generation of the token being used
+        :param expires_at: Unix timestamp after which no token of the family
+                           can be valid, and the family can be forgotten, or
+                           `None` if its tokens never expire
+        """
+        raise NotImplementedError
+
+    async def revoke(self, family, expires_at):
+        """
+        Revokes every refresh token of `family`, for example when the user
+        logs out.
+
+        :param family: The family id
+        :param expires_at: Unix timestamp after which the family can be
+                           forgotten, or `None` to keep it forever
+        """
+        raise NotImplementedError
+
+    async def prune_expired(self):
+        """
+        Forgets the families whose tokens have all expired, returning how many
+        were removed.
+        """
+        raise NotImplementedError
+
+
+class MemoryRefreshTokenFamilyStore(RefreshTokenFamilyStore):
+    """
+    Keeps the refresh token families in a dictionary of the current process.
+    Expired families are pruned every time the number of families doubles.
+
+    :param timer: Function returning the current unix timestamp
+    """
+
+    def __init__(self, timer=time.time):
+        self.timer = timer
+        self._families = {}
+        self._prune_at = 1024
+
+    def __len__(self):
+        return len(self._families)
+
+    def _set(self, family, generation, expires_at):
+        # A family is kept until its longest lived token expires
+        families = self._families
+        previous = families.get(family)
+        if previous is not None and expires_at is not None:
+            if previous[1] is None or previous[1] > expires_at:
+                expires_at = previous[1]
+        families[family] = (generation, expires_at)
+        if len(families) >= self._prune_at:
+            self._prune()
+            self._prune_at = max(1024, 2 * len(families))
+
+    def _prune(self):
+        now = self.timer()
+        expired = [
+            family
+            for family, (_, expires_at) in self._families.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        for family in expired:
+            del self._families[family]
+        return len(expired)
+
+    async def use(self, family, generation, expires_at):
+        current = self._families.get(family)
+        if current is not None and current[0] != generation:
+            self._set(family, REVOKED, expires_at)
+            return False
+        self._set(family, generation + 1, expires_at)
+        return True
+
+    async def revoke(self, family, expires_at):
+        self._set(family, REVOKED, expires_at)
+
+    async def prune_expired(self):
+        return self._prune()
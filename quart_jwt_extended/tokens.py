@@ -1,10 +1,34 @@
+import binascii
 import datetime
+import hashlib
+import hmac
+import json
+import time
 import uuid
 from calendar import timegm
+from collections import namedtuple
+from collections.abc import Iterable, Mapping
+from functools import lru_cache
 
 import jwt
+from jwt.algorithms import get_default_algorithms
+from jwt.exceptions import (
+    DecodeError,
+    ExpiredSignatureError,
+    ImmatureSignatureError,
+    InvalidAlgorithmError,
+    InvalidAudienceError,
+    InvalidIssuedAtError,
+    InvalidIssuerError,
+    InvalidKeyError,
+    InvalidSignatureError,
+    InvalidTokenError,
+    MissingRequiredClaimError,
+)
+from jwt.utils import base64url_decode, base64url_encode
 from werkzeug.security import safe_str_cmp
 
+from quart_jwt_extended.config import requires_cryptography
 from quart_jwt_extended.exceptions import JWTDecodeError, CSRFError
 
 
@@ -12,6 +36,15 @@ def _create_csrf_token():
     return str(uuid.uuid4())
 
 
+def _add_delta(timestamp, delta):
+    # Returns the unix timestamp `delta` after `timestamp`
+    if isinstance(delta, datetime.timedelta):
+        return timestamp + int(delta.total_seconds())
+    # Such as a dateutil relativedelta, which can only be added to dates
+    when = datetime.datetime.utcfromtimestamp(timestamp) + delta
+    return timegm(when.utctimetuple())
+
+
 def _encode_jwt(
     additional_token_data,
     expires_delta,
@@ -19,9 +52,11 @@ def _encode_jwt(
     algorithm,
     json_encoder=None,
     headers=None,
+    now=None,
 ):
     uid = _create_csrf_token()
-    now = datetime.datetime.utcnow()
+    if now is None:
+        now = int(time.time())
     token_data = {
         "iat": now,
         "nbf": now,
@@ -30,14 +65,46 @@ def _encode_jwt(
     # If expires_delta is False, the JWT should never expire
     # and the 'exp' claim is not set.
     if expires_delta:
-        token_data["exp"] = now + expires_delta
+        token_data["exp"] = _add_delta(now, expires_delta)
     token_data.update(additional_token_data)
+    if algorithm in _hmac_digests and not (headers and "alg" in headers):
+        return _encode_hmac_jwt(token_data, secret, algorithm, json_encoder, headers)
     encoded_token = jwt.encode(
-        token_data, secret, algorithm, json_encoder=json_encoder, headers=headers
+        token_data,
+        prepare_key(algorithm, secret),
+        algorithm,
+        json_encoder=json_encoder,
+        headers=headers,
     )
     return encoded_token
 
 
+def _encode_hmac_jwt(token_data, secret, algorithm, json_encoder, headers):
+    # Builds the same token as jwt.encode, without its generic dispatch
+    header = {"typ": "JWT", "alg": algorithm}
+    if headers:
+        if "kid" in headers and not isinstance(headers["kid"], str):
+            raise InvalidTokenError("Key ID header parameter must be a string")
+        header.update(headers)
+        if not header["typ"]:
+            del header["typ"]
+    payload = token_data.copy()
+    for time_claim in ("exp", "iat", "nbf"):
+        if isinstance(payload.get(time_claim), _datetime):
+            payload[time_claim] = timegm(payload[time_claim].utctimetuple())
+
+    json_header = json.dumps(header, separators=(",", ":"), cls=json_encoder)
+    json_payload = json.dumps(payload, separators=(",", ":"), cls=json_encoder)
+    signing_input = b".".join(
+        (
+            base64url_encode(json_header.encode("utf-8")),
+            base64url_encode(json_payload.encode("utf-8")),
+        )
+    )
+    signature = _hmac_signature(algorithm, secret, signing_input)
+    return b".".join((signing_input, base64url_encode(signature))).decode("utf-8")
+
+
 def encode_access_token(
     identity,
     secret,
@@ -51,6 +118,7 @@ def encode_access_token(
     json_encoder=None,
     headers=None,
     issuer=None,
+    now=None,
 ):
     """
     Creates a new encoded (utf-8) access token.
@@ -68,17 +136,19 @@ def encode_access_token(
     :param user_claims: Custom claims to include in this token. This data must
                         be json serializable
     :param csrf: Whether to include a csrf double submit claim in this token
-                 (boolean)
+                 (boolean), or the value of that claim (string)
     :param identity_claim_key: Which key should be used to store the identity
     :param user_claims_key: Which key should be used to store the user claims
     :param headers: valid dict for specifying additional headers in JWT header section
     :param issuer: Issuer value configured as JWT_ENCODE_ISSUER
+    :param now: The current time as seconds since the epoch (optional)
     :return: Access token
     """
+    if now is None:
+        now = int(time.time())
 
     if isinstance(fresh, datetime.timedelta):
-        now = datetime.datetime.utcnow()
-        fresh = timegm((now + fresh).utctimetuple())
+        fresh = _add_delta(now, fresh)
 
     token_data = {
         identity_claim_key: identity,
@@ -90,7 +160,9 @@ def encode_access_token(
     if user_claims:
         token_data[user_claims_key] = user_claims
 
-    if csrf:
+    if isinstance(csrf, str):
+        token_data["csrf"] = csrf
+    elif csrf:
         token_data["csrf"] = _create_csrf_token()
     if issuer is not None:
         token_data["iss"] = issuer
@@ -101,6 +173,7 @@ def encode_access_token(
         algorithm,
         json_encoder=json_encoder,
         headers=headers,
+        now=now,
     )
 
 
@@ -115,6 +188,9 @@ def encode_refresh_token(
     user_claims_key,
     json_encoder=None,
     headers=None,
+    family=None,
+    generation=None,
+    now=None,
 ):
     """
     Creates a new encoded (utf-8) refresh token.
@@ -132,6 +208,9 @@ def encode_refresh_token(
     :param identity_claim_key: Which key should be used to store the identity
     :param user_claims_key: Which key should be used to store the user claims
     :param headers: valid dict for specifying additional headers in JWT header section
+    :param family: The refresh token family this token belongs to (optional)
+    :param generation: The generation of this token within its family
+    :param now: The current time as seconds since the epoch (optional)
     :return: Encoded refresh token
     """
     token_data = {
@@ -143,6 +222,10 @@ def encode_refresh_token(
     if user_claims:
         token_data[user_claims_key] = user_claims
 
+    if family is not None:
+        token_data["fam"] = family
+        token_data["gen"] = generation
+
     if csrf:
         token_data["csrf"] = _create_csrf_token()
     return _encode_jwt(
@@ -152,9 +235,250 @@ def encode_refresh_token(
         algorithm,
         json_encoder=json_encoder,
         headers=headers,
+        now=now,
     )
 
 
+# The pieces of an encoded JWT after it has been split and its header and
+# payload have been deserialized. Nothing in here has been verified yet.
+RawJWT = namedtuple("RawJWT", ["header", "payload", "signing_input", "signature"])
+
+_algorithms = get_default_algorithms()
+
+
+def prepare_key(algorithm, key):
+    """
+    Loads `key` into the object `algorithm` signs and verifies with. Parsing
+    a PEM key takes far longer than verifying a signature (especially an
+    EdDSA one) with it, so the most recently used keys are only ever loaded
+    once.
+
+    :param algorithm: The name of the algorithm, such as ``"EdDSA"``
+    :param key: A secret, a PEM or OpenSSH encoded key, a JWK (as a `dict` or
+                as a JSON string, such as an ``OKP`` key for ``EdDSA``), or an
+                already loaded key
+    :return: The loaded key
+    :raises InvalidKeyError: If `key` is not a key of `algorithm`, such as a
+                             public key (or a JWK string) given for an HMAC
+                             algorithm
+    """
+    if algorithm not in _algorithms:
+        # Left for pyjwt to reject
+        return key
+    jwk = False
+    if isinstance(key, Mapping):
+        key, jwk = json.dumps(key, sort_keys=True), True
+    elif isinstance(key, str) and algorithm in requires_cryptography:
+        jwk = key.lstrip().startswith("{")
+    elif isinstance(key, str) and _is_jwk_string(key):
+        # Like pyjwt does with PEM keys, so that a public JWK can never be
+        # used as an HMAC secret
+        raise InvalidKeyError(
+            "The specified key is a JWK string and should not be used as an "
+            "HMAC secret. Give it as a dict instead."
+        )
+    if not _is_hashable(key):
+        return _load_key(algorithm, key, jwk)
+    return _load_cached_key(algorithm, key, jwk)
+
+
+def _is_jwk_string(key):
+    if not key.lstrip().startswith("{"):
+        return False
+    try:
+        return "kty" in json.loads(key)
+    except (TypeError, ValueError):
+        return False
+
+
+def _is_hashable(key):
+    try:
+        hash(key)
+    except TypeError:
+        return False
+    return True
+
+
+def _load_key(algorithm, key, jwk):
+    alg_obj = _algorithms[algorithm]
+    return alg_obj.from_jwk(key) if jwk else alg_obj.prepare_key(key)
+
+
+_load_cached_key = lru_cache(maxsize=32)(_load_key)
+
+
+# Bound once like in pyjwt, so that patching datetime.datetime (to move the
+# current time) does not change which claims are converted
+_datetime = datetime.datetime
+
+_hmac_digests = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+
+@lru_cache(maxsize=32)
+def _keyed_hmac(algorithm, secret):
+    return hmac.new(prepare_key(algorithm, secret), digestmod=_hmac_digests[algorithm])
+
+
+def _hmac_signature(algorithm, secret, signing_input):
+    # Keying an HMAC hashes the secret, so a keyed one is kept per secret and
+    # copied for each token instead
+    if _is_hashable(secret):
+        keyed = _keyed_hmac(algorithm, secret)
+    else:
+        key = prepare_key(algorithm, secret)
+        keyed = hmac.new(key, digestmod=_hmac_digests[algorithm])
+    mac = keyed.copy()
+    mac.update(signing_input)
+    return mac.digest()
+
+
+def parse_jwt(encoded_token):
+    """
+    Splits an encoded JWT into its segments and deserializes the header and
+    payload, so that a token only ever needs to be parsed once per request.
+    The signature is *not* verified.
+
+    :param encoded_token: The encoded JWT string to parse
+    :return: A :class:`RawJWT` for the token
+    """
+    if isinstance(encoded_token, str):
+        encoded_token = encoded_token.encode("utf-8")
+    if not isinstance(encoded_token, bytes):
+        raise DecodeError("Invalid token type. Token must be a {}".format(bytes))
+
+    try:
+        signing_input, crypto_segment = encoded_token.rsplit(b".", 1)
+        header_segment, payload_segment = signing_input.split(b".", 1)
+    except ValueError:
+        raise DecodeError("Not enough segments")
+
+    try:
+        header_data = base64url_decode(header_segment)
+    except (TypeError, binascii.Error):
+        raise DecodeError("Invalid header padding")
+    try:
+        header = json.loads(header_data)
+    except ValueError as e:
+        raise DecodeError("Invalid header string: {}".format(e))
+    if not isinstance(header, Mapping):
+        raise DecodeError("Invalid header string: must be a json object")
+    if "kid" in header and not isinstance(header["kid"], str):
+        raise InvalidTokenError("Key ID header parameter must be a string")
+
+    try:
+        payload_data = base64url_decode(payload_segment)
+    except (TypeError, binascii.Error):
+        raise DecodeError("Invalid payload padding")
+    try:
+        payload = json.loads(payload_data)
+    except ValueError as e:
+        raise DecodeError("Invalid payload string: {}".format(e))
+    if not isinstance(payload, dict):
+        raise DecodeError("Invalid payload string: must be a json object")
+
+    try:
+        signature = base64url_decode(crypto_segment)
+    except (TypeError, binascii.Error):
+        raise DecodeError("Invalid crypto padding")
+
+    return RawJWT(header, payload, signing_input, signature)
+
+
+def _verify_signature(raw_token, secret, algorithms):
+    alg = raw_token.header.get("alg")
+    if alg not in algorithms:
+        raise InvalidAlgorithmError("The specified alg value is not allowed")
+    if alg in _hmac_digests:
+        try:
+            signature = _hmac_signature(alg, secret, raw_token.signing_input)
+        except InvalidKeyError:
+            # Such as a token signed with the public key as its HMAC secret
+            raise InvalidAlgorithmError("The specified alg value is not allowed")
+        if not hmac.compare_digest(signature, raw_token.signature):
+            raise InvalidSignatureError("Signature verification failed")
+        return
+    try:
+        alg_obj = _algorithms[alg]
+    except KeyError:
+        raise InvalidAlgorithmError("Algorithm not supported")
+
+    key = prepare_key(alg, secret)
+    if not alg_obj.verify(raw_token.signing_input, key, raw_token.signature):
+        raise InvalidSignatureError("Signature verification failed")
+
+
+def _validate_claims(data, now, audience, issuer, leeway):
+    # Mirrors the registered claim checks pyjwt does in jwt.decode, minus the
+    # exp claim, which is checked last (see verify_not_expired)
+    if not isinstance(audience, (bytes, str, type(None), Iterable)):
+        raise TypeError("audience must be a string, iterable, or None")
+
+    if "iat" in data:
+        try:
+            int(data["iat"])
+        except (TypeError, ValueError):
+            raise InvalidIssuedAtError("Issued At claim (iat) must be an integer.")
+
+    if "nbf" in data:
+        try:
+            nbf = int(data["nbf"])
+        except (TypeError, ValueError):
+            raise DecodeError("Not Before claim (nbf) must be an integer.")
+        if nbf > (now + leeway):
+            raise ImmatureSignatureError("The token is not yet valid (nbf)")
+
+    if issuer is not None:
+        if "iss" not in data:
+            raise MissingRequiredClaimError("iss")
+        if data["iss"] != issuer:
+            raise InvalidIssuerError("Invalid issuer")
+
+    audience_claims = data.get("aud")
+    if audience is None:
+        if audience_claims:
+            raise InvalidAudienceError("Invalid audience")
+    else:
+        if not audience_claims:
+            raise MissingRequiredClaimError("aud")
+        if isinstance(audience_claims, str):
+            audience_claims = [audience_claims]
+        if not isinstance(audience_claims, list) or any(
+            not isinstance(c, str) for c in audience_claims
+        ):
+            raise InvalidAudienceError("Invalid claim format in token")
+        if isinstance(audience, str):
+            audience = [audience]
+        if all(aud not in audience_claims for aud in audience):
+            raise InvalidAudienceError("Invalid audience")
+
+
+def verify_not_expired(data, leeway=0, now=None):
+    """
+    Raises an ExpiredSignatureError if the exp claim of an already decoded
+    token is in the past.
+
+    :param data: Dictionary containing the contents of the JWT
+    :param leeway: optional leeway to add some margin around expiration times
+    :param now: The current time as seconds since the epoch (optional)
+    """
+    if "exp" not in data:
+        return
+    if isinstance(leeway, datetime.timedelta):
+        leeway = leeway.total_seconds()
+    try:
+        exp = int(data["exp"])
+    except (TypeError, ValueError):
+        raise DecodeError("Expiration Time claim (exp) must be an integer.")
+    if now is None:
+        now = int(time.time())
+    if exp < (now - leeway):
+        raise ExpiredSignatureError("Signature has expired")
+
+
 def decode_jwt(
     encoded_token,
     secret,
@@ -166,6 +490,9 @@ def decode_jwt(
     leeway=0,
     allow_expired=False,
     issuer=None,
+    raw_token=None,
+    verify_signature=True,
+    now=None,
 ):
     """
     Decodes an encoded JWT
@@ -180,22 +507,29 @@ def decode_jwt(
     :param issuer: expected issuer in the JWT
     :param leeway: optional leeway to add some margin around expiration times
     :param allow_expired: Options to ignore exp claim validation in token
+    :param raw_token: The already parsed token (see :func:`parse_jwt`), to
+                      avoid parsing it a second time
+    :param verify_signature: Set this to `False` if the signature of
+                             `raw_token` has already been verified
+    :param now: The current time as seconds since the epoch (optional)
     :return: Dictionary containing contents of the JWT
     """
-    options = {}
-    if allow_expired:
-        options["verify_exp"] = False
+    if raw_token is None:
+        raw_token = parse_jwt(encoded_token)
+    if isinstance(leeway, datetime.timedelta):
+        leeway = leeway.total_seconds()
 
-    # This call verifies the ext, iat, nbf, and aud claims
-    data = jwt.decode(
-        encoded_token,
-        secret,
-        algorithms=algorithms,
-        audience=audience,
-        leeway=leeway,
-        options=options,
-        issuer=issuer,
-    )
+    if verify_signature:
+        _verify_signature(raw_token, secret, algorithms)
+
+    # The parsed payload may have been handed to user callbacks already, so
+    # fill in the defaults on a (shallow) copy of it
+    data = dict(raw_token.payload)
+    if now is None:
+        now = int(time.time())
+
+    # This verifies the iat, nbf, iss and aud claims
+    _validate_claims(data, now, audience, issuer, leeway)
 
     # Make sure that any custom claims we expect in the token are present
     if "jti" not in data:
@@ -216,4 +550,9 @@ def decode_jwt(
             raise JWTDecodeError("Missing claim: csrf")
         if not safe_str_cmp(data["csrf"], csrf_value):
             raise CSRFError("CSRF double submit tokens do not match")
+
+    # The exp claim is checked last, so that everything else about an
+    # expired token has been validated by the time it is reported as expired
+    if not allow_expired:
+        verify_not_expired(data, leeway, now)
     return data
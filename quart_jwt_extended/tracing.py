@@ -0,0 +1,43 @@
+"""
+Tracing of the authentication pipeline. Once an OpenTelemetry tracer is
+installed with :meth:`~quart_jwt_extended.JWTManager.set_tracer`, these spans
+are started (all attributes are prefixed with ``jwt.``):
+
+======================= ===================================================
+Span                    Attributes
+======================= ===================================================
+``jwt.authenticate``    ``request_type``
+``jwt.extract``         ``location``
+``jwt.negative_cache``  ``cache`` (``hit`` or ``miss``)
+``jwt.decode_key``      ``algorithm``, ``kid``
+``jwt.verify``          ``algorithm``, ``kid``
+``jwt.blacklist_check`` ``revoked``
+``jwt.verify_claims``
+``jwt.load_user``
+``jwt.sign``            ``type``, ``algorithm``
+======================= ===================================================
+
+When no tracer is installed, no spans are created at all.
+"""
+from contextlib import nullcontext
+
+
+class _NoopSpan(object):
+    def set_attribute(self, key, value):
+        pass
+
+
+_no_span = nullcontext(_NoopSpan())
+
+
+def span(tracer, name, **attributes):
+    """
+    Returns a context manager running its block in a new span of `tracer`,
+    or doing nothing if `tracer` is None. Attributes set to None are left out.
+    """
+    if tracer is None:
+        return _no_span
+    attributes = {
+        "jwt." + key: value for key, value in attributes.items() if value is not None
+    }
+    return tracer.start_as_current_span(name, attributes=attributes)
@@ -1,9 +1,14 @@
+import datetime
+import hashlib
 from asyncio import iscoroutine
+from calendar import timegm
+from collections import namedtuple
+from contextlib import contextmanager
 from typing import Any
 from warnings import warn
 
 from quart import current_app
-from jwt import ExpiredSignatureError
+from jwt import ExpiredSignatureError, ImmatureSignatureError, InvalidTokenError
 from werkzeug.local import LocalProxy
 
 try:
@@ -17,7 +22,15 @@ from quart_jwt_extended.exceptions import (
     UserClaimsVerificationError,
     WrongTokenError,
 )
-from quart_jwt_extended.tokens import decode_jwt
+from quart_jwt_extended.metrics import timed
+from quart_jwt_extended.profiling import profiled
+from quart_jwt_extended.tracing import span
+from quart_jwt_extended.tokens import (
+    _add_delta,
+    decode_jwt,
+    parse_jwt,
+    verify_not_expired,
+)
 import jwt
 
 
@@ -97,54 +110,195 @@ def decode_token(encoded_token, csrf_value=None, allow_expired=False):
     :param allow_expired: Options to ignore exp claim validation in token
     :return: Dictionary containing contents of the JWT
     """
+    return _decode_token(encoded_token, csrf_value, allow_expired)[0]
+
+
+# Why a token was rejected, as remembered in the negative cache. For expired
+# tokens, the decoded token is kept for the expired token callback.
+_Rejection = namedtuple("_Rejection", ["error_class", "message", "expired_token"])
+
+
+def _token_cache_key(encoded_token):
+    if isinstance(encoded_token, str):
+        encoded_token = encoded_token.encode("utf-8")
+    if not isinstance(encoded_token, bytes):
+        return None
+    return hashlib.sha256(encoded_token).digest()
+
+
+def _raise_if_rejected(negative_cache, cache_key, allow_expired, allow_revoked):
+    rejection = negative_cache.get(cache_key)
+    if rejection is None:
+        return
+    if rejection.expired_token is not None:
+        if allow_expired:
+            return
+        ctx_stack.top.expired_jwt = rejection.expired_token
+    elif rejection.error_class is RevokedTokenError and allow_revoked:
+        return
+    raise rejection.error_class(rejection.message)
+
+
+def _remember_rejection(encoded_token, error, expired_token=None):
+    negative_cache = _get_jwt_manager()._get_negative_cache()
+    cache_key = _token_cache_key(encoded_token)
+    if negative_cache is not None and cache_key is not None:
+        rejection = _Rejection(type(error), str(error), expired_token)
+        negative_cache.set(cache_key, rejection)
+
+
+def _decode_token(
+    encoded_token, csrf_value=None, allow_expired=False, allow_revoked=True
+):
+    # Returns a tuple of the decoded token and its headers
     jwt_manager = _get_jwt_manager()
-    unverified_claims = jwt.decode(
-        encoded_token,
-        options=dict(verify_signature=False),
-        algorithms=config.decode_algorithms,
-    )
-    unverified_headers = jwt.get_unverified_header(encoded_token)
+    with _negative_cache(jwt_manager, encoded_token, allow_expired, allow_revoked):
+        raw_token, secret = _load_token(jwt_manager, encoded_token)
+        return _check_token(jwt_manager, raw_token, secret, csrf_value, allow_expired)
+
+
+async def _decode_token_offloading(encoded_token, csrf_value=None, allow_revoked=True):
+    # Same as _decode_token, but the signature is verified in the executor of
+    # the verification offloader while the event loop is lagging
+    jwt_manager = _get_jwt_manager()
+    with _negative_cache(jwt_manager, encoded_token, False, allow_revoked):
+        raw_token, secret = _load_token(jwt_manager, encoded_token)
+        offloader = jwt_manager._get_verification_offloader()
+        algorithm = raw_token.header.get("alg")
+        if not offloader.should_offload(algorithm):
+            return _check_token(jwt_manager, raw_token, secret, csrf_value, False)
+
+        kid = raw_token.header.get("kid")
+        with span(
+            jwt_manager._tracer,
+            "jwt.verify",
+            algorithm=algorithm,
+            kid=kid,
+            offloaded=True,
+        ), _timed_verify(jwt_manager._metrics, algorithm), profiled("verify"):
+            await offloader.verify_signature(
+                raw_token, secret, config.decode_algorithms
+            )
+            decoded_token = _decode_raw_token(
+                raw_token, secret, csrf_value, verify_signature=False
+            )
+        return _verify_not_expired(decoded_token), raw_token.header
+
+
+@contextmanager
+def _negative_cache(jwt_manager, encoded_token, allow_expired, allow_revoked):
+    # Tokens that were rejected recently are rejected again straight from the
+    # negative cache, without doing any crypto, and new rejections are
+    # remembered
+    negative_cache = jwt_manager._get_negative_cache()
+    cache_key = None if negative_cache is None else _token_cache_key(encoded_token)
+    if cache_key is None:
+        yield
+        return
+
+    with span(jwt_manager._tracer, "jwt.negative_cache") as cache_span:
+        cache_span.set_attribute("jwt.cache", "hit")
+        _raise_if_rejected(negative_cache, cache_key, allow_expired, allow_revoked)
+        cache_span.set_attribute("jwt.cache", "miss")
+    try:
+        yield
+    except ExpiredSignatureError as e:
+        expired_token = ctx_stack.top.expired_jwt
+        negative_cache.set(cache_key, _Rejection(type(e), str(e), expired_token))
+        raise
+    except ImmatureSignatureError:
+        # This token will become valid later on, so it is not remembered
+        raise
+    except InvalidTokenError as e:
+        negative_cache.set(cache_key, _Rejection(type(e), str(e), None))
+        raise
+
+
+def _load_token(jwt_manager, encoded_token):
+    # Parses the token a single time, handing the unverified claims and
+    # headers to the decode key callback. Returns the parsed token and the key
+    # to verify its signature with.
+    with profiled("parse"):
+        raw_token = parse_jwt(encoded_token)
+    unverified_claims = raw_token.payload
+    unverified_headers = raw_token.header
+    algorithm = unverified_headers.get("alg")
+    kid = unverified_headers.get("kid")
     # Attempt to call callback with both claims and headers, but fallback to just claims
     # for backwards compatibility
-    try:
-        secret = jwt_manager._decode_key_callback(unverified_claims, unverified_headers)
-    except TypeError:
-        msg = (
-            "The single-argument (unverified_claims) form of decode_key_callback ",
-            "is deprecated. Update your code to use the two-argument form ",
-            "(unverified_claims, unverified_headers).",
-        )
-        warn(msg, DeprecationWarning)
-        secret = jwt_manager._decode_key_callback(unverified_claims)
+    with span(
+        jwt_manager._tracer, "jwt.decode_key", algorithm=algorithm, kid=kid
+    ), profiled("key_lookup"):
+        try:
+            secret = jwt_manager._decode_key_callback(
+                unverified_claims, unverified_headers
+            )
+        except TypeError:
+            msg = (
+                "The single-argument (unverified_claims) form of decode_key_callback ",
+                "is deprecated. Update your code to use the two-argument form ",
+                "(unverified_claims, unverified_headers).",
+            )
+            warn(msg, DeprecationWarning)
+            secret = jwt_manager._decode_key_callback(unverified_claims)
+    return raw_token, secret
+
+
+def _check_token(jwt_manager, raw_token, secret, csrf_value, allow_expired):
+    # Verifies the signature (over the raw bytes the token was parsed from)
+    # and the claims of a token loaded by _load_token. Returns a tuple of the
+    # decoded token and its headers.
+    algorithm = raw_token.header.get("alg")
+    kid = raw_token.header.get("kid")
+    with span(
+        jwt_manager._tracer, "jwt.verify", algorithm=algorithm, kid=kid
+    ), _timed_verify(jwt_manager._metrics, algorithm), profiled("verify"):
+        decoded_token = _decode_raw_token(raw_token, secret, csrf_value)
+    if not allow_expired:
+        _verify_not_expired(decoded_token)
+    return decoded_token, raw_token.header
+
+
+def _timed_verify(metrics, algorithm):
+    # The algorithm in the header is chosen by the client, so only the
+    # algorithms that are accepted are used as metric labels. Nothing is
+    # looked up unless the metrics are enabled.
+    if not metrics.enabled:
+        return timed(metrics, "verify")
+    if not (isinstance(algorithm, str) and algorithm in config.decode_algorithms):
+        algorithm = "invalid"
+    return timed(metrics, "verify", algorithm=algorithm)
+
+
+def _decode_raw_token(raw_token, secret, csrf_value, verify_signature=True):
+    return decode_jwt(
+        encoded_token=None,
+        secret=secret,
+        algorithms=config.decode_algorithms,
+        identity_claim_key=config.identity_claim_key,
+        user_claims_key=config.user_claims_key,
+        csrf_value=csrf_value,
+        audience=config.audience,
+        issuer=config.decode_issuer,
+        leeway=config.leeway,
+        allow_expired=True,
+        raw_token=raw_token,
+        verify_signature=verify_signature,
+        now=_get_jwt_manager()._clock.now(),
+    )
 
+
+def _verify_not_expired(decoded_token):
     try:
-        return decode_jwt(
-            encoded_token=encoded_token,
-            secret=secret,
-            algorithms=config.decode_algorithms,
-            identity_claim_key=config.identity_claim_key,
-            user_claims_key=config.user_claims_key,
-            csrf_value=csrf_value,
-            audience=config.audience,
-            issuer=config.decode_issuer,
-            leeway=config.leeway,
-            allow_expired=allow_expired,
+        verify_not_expired(
+            decoded_token, config.leeway, _get_jwt_manager()._clock.now()
         )
     except ExpiredSignatureError:
-        expired_token = decode_jwt(
-            encoded_token=encoded_token,
-            secret=secret,
-            algorithms=config.decode_algorithms,
-            identity_claim_key=config.identity_claim_key,
-            user_claims_key=config.user_claims_key,
-            csrf_value=csrf_value,
-            audience=config.audience,
-            issuer=config.decode_issuer,
-            leeway=config.leeway,
-            allow_expired=True,
-        )
-        ctx_stack.top.expired_jwt = expired_token
+        # The token has been fully verified apart from its expiry, so it can
+        # be handed straight to the expired token callback
+        ctx_stack.top.expired_jwt = decoded_token
         raise
+    return decoded_token
 
 
 def _get_jwt_manager():
@@ -241,27 +395,155 @@ def verify_token_type(decoded_token, expected_type):
         raise WrongTokenError("Only {} tokens are allowed".format(expected_type))
 
 
-def verify_token_not_blacklisted(decoded_token, request_type):
+async def verify_token_not_blacklisted(decoded_token, request_type):
+    jwt_manager = _get_jwt_manager()
+    watermarks = jwt_manager._revocation_watermarks
+    if watermarks:
+        identity = decoded_token[config.identity_claim_key]
+        if watermarks.is_revoked(identity, decoded_token.get("iat")):
+            raise RevokedTokenError("Token has been revoked")
+
     if not config.blacklist_enabled:
         return
-    if not has_token_in_blacklist_callback():
+    if jwt_manager._revocation_store is None and not has_token_in_blacklist_callback():
         raise RuntimeError(
             "A token_in_blacklist_callback must be provided via "
-            "the '@token_in_blacklist_loader' if "
-            "JWT_BLACKLIST_ENABLED is True"
+            "the '@token_in_blacklist_loader' (or a revocation store via "
+            "JWTManager.set_revocation_store) if JWT_BLACKLIST_ENABLED is True"
         )
     if config.blacklist_access_tokens and request_type == "access":
-        if token_in_blacklist(decoded_token):
-            raise RevokedTokenError("Token has been revoked")
+        await _verify_not_in_blacklist(decoded_token)
     if config.blacklist_refresh_tokens and request_type == "refresh":
-        if token_in_blacklist(decoded_token):
-            raise RevokedTokenError("Token has been revoked")
+        await _verify_not_in_blacklist(decoded_token)
+
+
+async def _is_in_blacklist(jwt_manager, decoded_token):
+    if jwt_manager._revocation_store is None:
+        jti = decoded_token["jti"]
+        if config.coalesce_callbacks and jti is not None:
+            flights = jwt_manager._blacklist_flights
+            return await flights.do(jti, token_in_blacklist, decoded_token)
+        return await await_if_possible(token_in_blacklist(decoded_token))
+    jti = decoded_token["jti"]
+    return jti is not None and await jwt_manager._revocation_lookups.is_revoked(jti)
+
+
+async def _verify_not_in_blacklist(decoded_token):
+    jwt_manager = _get_jwt_manager()
+    metrics = jwt_manager._metrics
+    with span(jwt_manager._tracer, "jwt.blacklist_check") as check_span, timed(
+        metrics, "blacklist_check"
+    ), profiled("blacklist"):
+        revoked = await _is_in_blacklist(jwt_manager, decoded_token)
+        check_span.set_attribute("jwt.revoked", bool(revoked))
+    if metrics.enabled:
+        metrics.increment("blacklist_hits", revoked="true" if revoked else "false")
+    if revoked:
+        raise RevokedTokenError("Token has been revoked")
+
+
+async def revoke_token(decoded_token):
+    """
+    Revokes `decoded_token` in the revocation store set with
+    :meth:`~quart_jwt_extended.JWTManager.set_revocation_store`, for example
+    when a user logs out. It is remembered until it expires.
+
+    :param decoded_token: The decoded token, such as
+                          :func:`~quart_jwt_extended.get_raw_jwt` in a
+                          protected endpoint
+    """
+    store = _get_jwt_manager()._revocation_store
+    if store is None:
+        raise RuntimeError(
+            "A revocation store must be set with "
+            "JWTManager.set_revocation_store to revoke tokens"
+        )
+    if decoded_token["jti"] is None:
+        raise ValueError("Tokens without a jti claim cannot be revoked")
+    await store.revoke(decoded_token["jti"], decoded_token.get("exp"))
+
+
+def _refresh_token_family_expires_at(decoded_token):
+    # The family outlives this token by as long as the refresh token created
+    # to replace it lives
+    refresh_expires = config.refresh_expires
+    if not refresh_expires or "exp" not in decoded_token:
+        return None
+    replaced_at = _add_delta(_get_jwt_manager()._clock.now(), refresh_expires)
+    return max(decoded_token["exp"], replaced_at)
+
+
+async def verify_refresh_token_not_reused(decoded_token):
+    if not config.refresh_token_rotation or "fam" not in decoded_token:
+        return
+    store = _get_jwt_manager()._get_refresh_token_family_store()
+    expires_at = _refresh_token_family_expires_at(decoded_token)
+    if not await store.use(decoded_token["fam"], decoded_token["gen"], expires_at):
+        raise RevokedTokenError("Token has been revoked")
+
+
+async def revoke_refresh_token_family(decoded_token):
+    """
+    Revokes the refresh token `decoded_token` along with every other refresh
+    token of its family (see ``JWT_REFRESH_TOKEN_ROTATION``), for example when
+    a user logs out. This does nothing for refresh tokens that were created
+    without rotation.
+
+    :param decoded_token: The decoded refresh token, such as
+                          :func:`~quart_jwt_extended.get_raw_jwt` in an endpoint
+                          protected by
+                          :func:`~quart_jwt_extended.jwt_refresh_token_required`
+    """
+    if "fam" not in decoded_token:
+        return
+    store = _get_jwt_manager()._get_refresh_token_family_store()
+    expires_at = _refresh_token_family_expires_at(decoded_token)
+    await store.revoke(decoded_token["fam"], expires_at)
+
+
+def _to_timestamp(when):
+    if when is None:
+        return _get_jwt_manager()._clock.now()
+    if isinstance(when, datetime.datetime):
+        return timegm(when.utctimetuple())
+    return int(when)
+
+
+def revoke_identity_tokens(identity, issued_before=None):
+    """
+    Revokes every token of `identity` issued before `issued_before`, for
+    example when a user changes their password. Only the time of the
+    revocation is stored for each identity, however many tokens it revokes.
+
+    :param identity: The identity of the tokens to revoke, as found in their
+                     identity claim
+    :param issued_before: A naive UTC `datetime.datetime` or a unix timestamp.
+                          Defaults to now. Tokens issued during the same
+                          second are not revoked.
+    """
+    watermarks = _get_jwt_manager()._revocation_watermarks
+    watermarks.revoke_identity(identity, _to_timestamp(issued_before))
+
+
+def revoke_all_tokens(issued_before=None):
+    """
+    Revokes every token issued before `issued_before`, whatever its identity,
+    for example after a signing key has been compromised.
+
+    :param issued_before: A naive UTC `datetime.datetime` or a unix timestamp.
+                          Defaults to now. Tokens issued during the same
+                          second are not revoked.
+    """
+    watermarks = _get_jwt_manager()._revocation_watermarks
+    watermarks.revoke_all(_to_timestamp(issued_before))
 
 
 def verify_token_claims(jwt_data):
     jwt_manager = _get_jwt_manager()
     user_claims = jwt_data[config.user_claims_key]
-    if not jwt_manager._claims_verification_callback(user_claims):
+    with span(jwt_manager._tracer, "jwt.verify_claims"), profiled("claims"):
+        valid = jwt_manager._claims_verification_callback(user_claims)
+    if not valid:
         raise UserClaimsVerificationError("User claims verification failed")
 
 
@@ -291,36 +573,14 @@ def set_access_cookies(response, encoded_access_token, max_age=None):
                     JWT_SESSION_COOKIE option will be ignored.  Values should be
                     the number of seconds (as an integer).
     """
-    if not config.jwt_in_cookies:
+    cookies = _get_jwt_manager()._get_cookies()
+    if not cookies.settings.jwt_in_cookies:
         raise RuntimeWarning(
             "set_access_cookies() called without "
             "'JWT_TOKEN_LOCATION' configured to use cookies"
         )
-
-    # Set the access JWT in the cookie
-    response.set_cookie(
-        config.access_cookie_name,
-        value=encoded_access_token,
-        max_age=max_age or config.cookie_max_age,
-        secure=config.cookie_secure,
-        httponly=True,
-        domain=config.cookie_domain,
-        path=config.access_cookie_path,
-        samesite=config.cookie_samesite,
-    )
-
-    # If enabled, set the csrf double submit access cookie
-    if config.csrf_protect and config.csrf_in_cookies:
-        response.set_cookie(
-            config.access_csrf_cookie_name,
-            value=get_csrf_token(encoded_access_token),
-            max_age=max_age or config.cookie_max_age,
-            secure=config.cookie_secure,
-            httponly=False,
-            domain=config.cookie_domain,
-            path=config.access_csrf_cookie_path,
-            samesite=config.cookie_samesite,
-        )
+    max_age = max_age or cookies.settings.max_age
+    _set_cookies(response, cookies.access, encoded_access_token, max_age)
 
 
 def set_refresh_cookies(response, encoded_refresh_token, max_age=None):
@@ -338,36 +598,53 @@ def set_refresh_cookies(response, encoded_refresh_token, max_age=None):
                     JWT_SESSION_COOKIE option will be ignored.  Values should be
                     the number of seconds (as an integer).
     """
-    if not config.jwt_in_cookies:
+    cookies = _get_jwt_manager()._get_cookies()
+    if not cookies.settings.jwt_in_cookies:
         raise RuntimeWarning(
             "set_refresh_cookies() called without "
             "'JWT_TOKEN_LOCATION' configured to use cookies"
         )
+    max_age = max_age or cookies.settings.max_age
+    _set_cookies(response, cookies.refresh, encoded_refresh_token, max_age)
 
-    # Set the refresh JWT in the cookie
-    response.set_cookie(
-        config.refresh_cookie_name,
-        value=encoded_refresh_token,
-        max_age=max_age or config.cookie_max_age,
-        secure=config.cookie_secure,
-        httponly=True,
-        domain=config.cookie_domain,
-        path=config.refresh_cookie_path,
-        samesite=config.cookie_samesite,
-    )
 
-    # If enabled, set the csrf double submit refresh cookie
-    if config.csrf_protect and config.csrf_in_cookies:
-        response.set_cookie(
-            config.refresh_csrf_cookie_name,
-            value=get_csrf_token(encoded_refresh_token),
-            max_age=max_age or config.cookie_max_age,
-            secure=config.cookie_secure,
-            httponly=False,
-            domain=config.cookie_domain,
-            path=config.refresh_csrf_cookie_path,
-            samesite=config.cookie_samesite,
+def set_jwt_cookies(
+    response, encoded_access_token, encoded_refresh_token, max_age=None
+):
+    """
+    Takes a quart response object, an encoded access token and an encoded
+    refresh token, and configures the response to set both tokens in cookies
+    (along with their CSRF double submit values if `JWT_CSRF_IN_COOKIES` is
+    `True`). This is the same as calling :func:`set_access_cookies` and
+    :func:`set_refresh_cookies`, with the config read only once.
+
+    :param response: The Quart response object to set the cookies in.
+    :param encoded_access_token: The encoded access token to set in the cookies.
+    :param encoded_refresh_token: The encoded refresh token to set in the cookies.
+    :param max_age: The max age of the cookies. If this is None, it will use the
+                    `JWT_SESSION_COOKIE` option (see :ref:`Configuration Options`).
+                    Otherwise, it will use this as the cookies `max-age` and the
+                    JWT_SESSION_COOKIE option will be ignored.  Values should be
+                    the number of seconds (as an integer).
+    """
+    cookies = _get_jwt_manager()._get_cookies()
+    if not cookies.settings.jwt_in_cookies:
+        raise RuntimeWarning(
+            "set_jwt_cookies() called without "
+            "'JWT_TOKEN_LOCATION' configured to use cookies"
         )
+    max_age = max_age or cookies.settings.max_age
+    _set_cookies(response, cookies.access, encoded_access_token, max_age)
+    _set_cookies(response, cookies.refresh, encoded_refresh_token, max_age)
+
+
+def _set_cookies(response, templates, encoded_token, max_age):
+    response.headers.add("Set-Cookie", templates.token.header(encoded_token, max_age))
+
+    # If enabled, set the csrf double submit cookie
+    if templates.csrf is not None:
+        csrf_token = get_csrf_token(encoded_token)
+        response.headers.add("Set-Cookie", templates.csrf.header(csrf_token, max_age))
 
 
 def unset_jwt_cookies(response):
@@ -377,8 +654,14 @@ def unset_jwt_cookies(response):
 
     :param response: The Quart response object to delete the JWT cookies in.
     """
-    unset_access_cookies(response)
-    unset_refresh_cookies(response)
+    cookies = _get_jwt_manager()._get_cookies()
+    if not cookies.settings.jwt_in_cookies:
+        raise RuntimeWarning(
+            "unset_jwt_cookies() called without "
+            "'JWT_TOKEN_LOCATION' configured to use cookies"
+        )
+    _unset_cookies(response, cookies.access)
+    _unset_cookies(response, cookies.refresh)
 
 
 def unset_access_cookies(response):
@@ -390,34 +673,13 @@ def unset_access_cookies(response):
 
     :param response: the quart response object to delete the jwt cookies in.
     """
-    if not config.jwt_in_cookies:
+    cookies = _get_jwt_manager()._get_cookies()
+    if not cookies.settings.jwt_in_cookies:
         raise RuntimeWarning(
-            "unset_refresh_cookies() called without "
+            "unset_access_cookies() called without "
             "'JWT_TOKEN_LOCATION' configured to use cookies"
         )
-
-    response.set_cookie(
-        config.access_cookie_name,
-        value="",
-        expires=0,
-        secure=config.cookie_secure,
-        httponly=True,
-        domain=config.cookie_domain,
-        path=config.access_cookie_path,
-        samesite=config.cookie_samesite,
-    )
-
-    if config.csrf_protect and config.csrf_in_cookies:
-        response.set_cookie(
-            config.access_csrf_cookie_name,
-            value="",
-            expires=0,
-            secure=config.cookie_secure,
-            httponly=False,
-            domain=config.cookie_domain,
-            path=config.access_csrf_cookie_path,
-            samesite=config.cookie_samesite,
-        )
+    _unset_cookies(response, cookies.access)
 
 
 def unset_refresh_cookies(response):
@@ -429,34 +691,19 @@ def unset_refresh_cookies(response):
 
     :param response: the quart response object to delete the jwt cookies in.
     """
-    if not config.jwt_in_cookies:
+    cookies = _get_jwt_manager()._get_cookies()
+    if not cookies.settings.jwt_in_cookies:
         raise RuntimeWarning(
             "unset_refresh_cookies() called without "
             "'JWT_TOKEN_LOCATION' configured to use cookies"
         )
+    _unset_cookies(response, cookies.refresh)
 
-    response.set_cookie(
-        config.refresh_cookie_name,
-        value="",
-        expires=0,
-        secure=config.cookie_secure,
-        httponly=True,
-        domain=config.cookie_domain,
-        path=config.refresh_cookie_path,
-        samesite=config.cookie_samesite,
-    )
 
-    if config.csrf_protect and config.csrf_in_cookies:
-        response.set_cookie(
-            config.refresh_csrf_cookie_name,
-            value="",
-            expires=0,
-            secure=config.cookie_secure,
-            httponly=False,
-            domain=config.cookie_domain,
-            path=config.refresh_csrf_cookie_path,
-            samesite=config.cookie_samesite,
-        )
+def _unset_cookies(response, templates):
+    response.headers.add("Set-Cookie", templates.token.expired_header())
+    if templates.csrf is not None:
+        response.headers.add("Set-Cookie", templates.csrf.expired_header())
 
 
 def get_unverified_jwt_headers(encoded_token):
@@ -1,9 +1,8 @@
+from collections import namedtuple
 from functools import wraps
-from datetime import datetime
-from calendar import timegm
 from re import split
 
-from werkzeug.exceptions import BadRequest
+from jwt import ExpiredSignatureError, ImmatureSignatureError, InvalidTokenError
 
 from quart import request
 
@@ -13,21 +12,33 @@ except ImportError:  # pragma: no cover
     from quart import _request_ctx_stack as ctx_stack
 
 from quart_jwt_extended.config import config
+from quart_jwt_extended.metrics import timed
+from quart_jwt_extended.profiling import profiled
+from quart_jwt_extended.tracing import span
 from quart_jwt_extended.exceptions import (
     CSRFError,
+    FailedAuthRateLimitError,
     FreshTokenRequired,
+    InsufficientClaimsError,
     InvalidHeaderError,
+    JWTDecodeError,
+    JWTExtendedException,
     NoAuthorizationError,
+    RevokedTokenError,
     UserLoadError,
 )
 from quart_jwt_extended.utils import (
-    decode_token,
+    _decode_token,
+    _decode_token_offloading,
+    _get_jwt_manager,
+    _remember_rejection,
+    await_if_possible,
     has_user_loader,
     user_loader,
+    verify_refresh_token_not_reused,
     verify_token_claims,
     verify_token_not_blacklisted,
     verify_token_type,
-    get_unverified_jwt_headers,
 )
 
 
@@ -41,8 +52,8 @@ async def verify_jwt_in_request():
         jwt_data, jwt_header = await _decode_jwt_from_request(request_type="access")
         ctx_stack.top.jwt = jwt_data
         ctx_stack.top.jwt_header = jwt_header
-        verify_token_claims(jwt_data)
-        _load_user(jwt_data[config.identity_claim_key])
+        _verify_claims(jwt_data)
+        await _load_user(jwt_data[config.identity_claim_key])
 
 
 async def verify_jwt_in_request_optional():
@@ -56,13 +67,16 @@ async def verify_jwt_in_request_optional():
     If there is an invalid access token in the request (expired, tampered with,
     etc), this will still raise the appropiate exception.
     """
+    if request.method in config.exempt_methods or not _has_access_credentials():
+        # Anonymous requests are let through without looking for the token in
+        # each location
+        return
     try:
-        if request.method not in config.exempt_methods:
-            jwt_data, jwt_header = await _decode_jwt_from_request(request_type="access")
-            ctx_stack.top.jwt = jwt_data
-            ctx_stack.top.jwt_header = jwt_header
-            verify_token_claims(jwt_data)
-            _load_user(jwt_data[config.identity_claim_key])
+        jwt_data, jwt_header = await _decode_jwt_from_request(request_type="access")
+        ctx_stack.top.jwt = jwt_data
+        ctx_stack.top.jwt_header = jwt_header
+        _verify_claims(jwt_data)
+        await _load_user(jwt_data[config.identity_claim_key])
     except (NoAuthorizationError, InvalidHeaderError):
         pass
 
@@ -82,11 +96,10 @@ async def verify_fresh_jwt_in_request():
             if not fresh:
                 raise FreshTokenRequired("Fresh token required")
         else:
-            now = timegm(datetime.utcnow().utctimetuple())
-            if fresh < now:
+            if fresh < _get_jwt_manager()._clock.now():
                 raise FreshTokenRequired("Fresh token required")
-        verify_token_claims(jwt_data)
-        _load_user(jwt_data[config.identity_claim_key])
+        _verify_claims(jwt_data)
+        await _load_user(jwt_data[config.identity_claim_key])
 
 
 async def verify_jwt_refresh_token_in_request():
@@ -98,10 +111,10 @@ async def verify_jwt_refresh_token_in_request():
         jwt_data, jwt_header = await _decode_jwt_from_request(request_type="refresh")
         ctx_stack.top.jwt = jwt_data
         ctx_stack.top.jwt_header = jwt_header
-        _load_user(jwt_data[config.identity_claim_key])
+        await _load_user(jwt_data[config.identity_claim_key])
 
 
-def jwt_required(fn):
+def jwt_required(fn=None, *, roles=None, scopes=None):
     """
     A decorator to protect a Quart endpoint.
 
@@ -109,15 +122,29 @@ def jwt_required(fn):
     has a valid access token before allowing the endpoint to be called. This
     does not check the freshness of the access token.
 
+    It can also be called with the roles and scopes the token must all have,
+    such as ``@jwt_required(roles={"admin"}, scopes={"read:users"})``.
+    These are read from the ``JWT_ROLES_CLAIM`` and ``JWT_SCOPES_CLAIM``
+    claims (see :ref:`Configuration Options`).
+
     See also: :func:`~quart_jwt_extended.fresh_jwt_required`
+
+    :param roles: The roles the token must have (a role or a set of roles)
+    :param scopes: The scopes the token must have (a scope or a set of scopes)
     """
+    requirements = _compile_requirements(roles, scopes)
 
-    @wraps(fn)
-    async def wrapper(*args, **kwargs):
-        await verify_jwt_in_request()
-        return await fn(*args, **kwargs)
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            await verify_jwt_in_request()
+            if requirements is not None:
+                _verify_requirements(requirements)
+            return await fn(*args, **kwargs)
 
-    return wrapper
+        return wrapper
+
+    return decorator if fn is None else decorator(fn)
 
 
 def jwt_optional(fn):
@@ -143,23 +170,33 @@ def jwt_optional(fn):
     return wrapper
 
 
-def fresh_jwt_required(fn):
+def fresh_jwt_required(fn=None, *, roles=None, scopes=None):
     """
     A decorator to protect a Quart endpoint.
 
     If you decorate an endpoint with this, it will ensure that the requester
     has a valid and fresh access token before allowing the endpoint to be
-    called.
+    called. Like :func:`~quart_jwt_extended.jwt_required`, it can also be
+    called with the roles and scopes the token must have.
 
     See also: :func:`~quart_jwt_extended.jwt_required`
+
+    :param roles: The roles the token must have (a role or a set of roles)
+    :param scopes: The scopes the token must have (a scope or a set of scopes)
     """
+    requirements = _compile_requirements(roles, scopes)
 
-    @wraps(fn)
-    async def wrapper(*args, **kwargs):
-        await verify_fresh_jwt_in_request()
-        return await fn(*args, **kwargs)
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            await verify_fresh_jwt_in_request()
+            if requirements is not None:
+                _verify_requirements(requirements)
+            return await fn(*args, **kwargs)
 
-    return wrapper
+        return wrapper
+
+    return decorator if fn is None else decorator(fn)
 
 
 def jwt_refresh_token_required(fn):
@@ -178,13 +215,161 @@ def jwt_refresh_token_required(fn):
     return wrapper
 
 
-def _load_user(identity):
+def _as_frozenset(values):
+    if values is None:
+        return frozenset()
+    if isinstance(values, str):
+        return frozenset((values,))
+    return frozenset(values)
+
+
+def _compile_requirements(roles, scopes):
+    # Compiled once, when the endpoint is decorated
+    roles, scopes = _as_frozenset(roles), _as_frozenset(scopes)
+    if not roles and not scopes:
+        return None
+    return roles, scopes
+
+
+def _granted(jwt_data, claim_key):
+    # A list, or a space separated string such as the OAuth 2.0 scope claim,
+    # in the token or in its user claims
+    values = jwt_data.get(claim_key)
+    if values is None:
+        user_claims = jwt_data.get(config.user_claims_key)
+        if isinstance(user_claims, dict):
+            values = user_claims.get(claim_key)
+    if isinstance(values, str):
+        return frozenset(values.split())
+    if not isinstance(values, list):
+        return frozenset()
+    return frozenset(v for v in values if isinstance(v, str))
+
+
+def _verify_requirements(requirements):
+    # The roles and scopes of a token are only converted to sets once per
+    # request, after which checking them does not depend on how many the
+    # token has
+    ctx = ctx_stack.top
+    jwt_data = ctx.jwt
+    grants = getattr(ctx, "jwt_grants", None)
+    if grants is None or grants[0] is not jwt_data:
+        grants = ctx.jwt_grants = (
+            jwt_data,
+            _granted(jwt_data, config.roles_claim_key),
+            _granted(jwt_data, config.scopes_claim_key),
+        )
+    roles, scopes = requirements
+    if not (roles <= grants[1] and scopes <= grants[2]):
+        raise InsufficientClaimsError("Insufficient roles or scopes")
+
+
+def _request_memo():
+    # What was already verified for the current request. The app context can
+    # outlive a request and be shared by later ones (such as when it is held
+    # open), so this is tied to the request it was made for.
+    ctx = ctx_stack.top
+    current_request = request._get_current_object()
+    memo = getattr(ctx, "jwt_request_memo", None)
+    if memo is None or memo[0] is not current_request:
+        memo = ctx.jwt_request_memo = (current_request, {})
+    return memo[1]
+
+
+def _verify_claims(jwt_data):
+    # The claims of a token are only verified once per request
+    memo = _request_memo()
+    if memo.get("claims_verified") is not jwt_data:
+        verify_token_claims(jwt_data)
+        memo["claims_verified"] = jwt_data
+
+
+_missing = object()
+
+
+async def _load_user(identity):
     if has_user_loader():
-        user = user_loader(identity)
+        # Stacked decorators and repeated verify calls in the same request
+        # only load the user once
+        memo = _request_memo()
+        if memo.get("user_identity", _missing) == identity:
+            return
+        user = await _get_user(identity)
         if user is None:
             raise UserLoadError("user_loader returned None for {}".format(identity))
         else:
             ctx_stack.top.jwt_user = user
+            memo["user_identity"] = identity
+
+
+async def _get_user(identity):
+    jwt_manager = _get_jwt_manager()
+    user_cache = jwt_manager._get_user_cache()
+    if user_cache is not None:
+        try:
+            user = user_cache.get(identity)
+        except TypeError:
+            # Unhashable identities are never cached
+            user_cache = None
+        else:
+            if user is not None:
+                return user
+
+    with span(jwt_manager._tracer, "jwt.load_user"), timed(
+        jwt_manager._metrics, "user_load"
+    ), profiled("user_load"):
+        if config.coalesce_callbacks:
+            flights = jwt_manager._user_loader_flights
+            user = await flights.do(identity, user_loader, identity)
+        else:
+            user = await await_if_possible(user_loader(identity))
+    if user is not None and user_cache is not None:
+        user_cache.set(identity, user)
+    return user
+
+
+# A location the token was not found in. The reason is only formatted when the
+# token is missing from every location, so finding the token in a later
+# location costs neither an exception nor any string formatting.
+_Miss = namedtuple("_Miss", ["template", "args"])
+
+
+def _format_miss(miss):
+    return miss.template.format(*miss.args)
+
+
+def _has_access_credentials():
+    # Whether any of the token locations holds something that could be an
+    # access token. The body is never read for this, json requests are
+    # assumed to hold one.
+    for location in config.token_location:
+        if location == "cookies":
+            if request.cookies.get(config.access_cookie_name):
+                return True
+        elif location == "query_string":
+            if request.args.get(config.query_string_name):
+                return True
+        elif location == "headers":
+            if request.headers.get(config.header_name):
+                return True
+        elif location == "json":
+            if request.content_type == "application/json":
+                return True
+    return False
+
+
+async def _extract_token(location, request_type):
+    # Returns the encoded token and the csrf value found in `location`, or a
+    # _Miss
+    if location == "cookies":
+        return await _decode_jwt_from_cookies(request_type)
+    if location == "query_string":
+        return await _decode_jwt_from_query_string()
+    if location == "headers":
+        return await _decode_jwt_from_headers()
+    if location == "json":
+        return await _decode_jwt_from_json(request_type)
+    return None
 
 
 async def _decode_jwt_from_headers():
@@ -194,7 +379,7 @@ async def _decode_jwt_from_headers():
     # Verify we have the auth header
     auth_header = request.headers.get(header_name, None)
     if not auth_header:
-        raise NoAuthorizationError("Missing {} Header".format(header_name))
+        return _Miss("Missing {} Header", (header_name,))
 
     # Make sure the header is in a valid format that we are expecting, ie
     # <HeaderName>: <HeaderType(optional)> <JWT>
@@ -238,7 +423,7 @@ async def _decode_jwt_from_cookies(request_type):
 
     encoded_token = request.cookies.get(cookie_key)
     if not encoded_token:
-        raise NoAuthorizationError('Missing cookie "{}"'.format(cookie_key))
+        return _Miss('Missing cookie "{}"', (cookie_key,))
 
     if config.csrf_protect and request.method in config.csrf_request_methods:
         csrf_value = request.headers.get(csrf_header_key, None)
@@ -259,82 +444,130 @@ async def _decode_jwt_from_query_string():
     query_param = config.query_string_name
     encoded_token = request.args.get(query_param)
     if not encoded_token:
-        raise NoAuthorizationError('Missing "{}" query paramater'.format(query_param))
+        return _Miss('Missing "{}" query paramater', (query_param,))
 
     return encoded_token, None
 
 
 async def _decode_jwt_from_json(request_type):
     if request.content_type != "application/json":
-        raise NoAuthorizationError("Invalid content-type. Must be application/json.")
+        return _Miss("Invalid content-type. Must be application/json.", ())
 
     if request_type == "access":
         token_key = config.json_key
     else:
         token_key = config.refresh_json_key
 
-    try:
-        try:
-            encoded_token = (await request.get_json(silent=True))[token_key]
-        except TypeError:
-            raise BadRequest()
-    except (BadRequest, KeyError):
-        raise NoAuthorizationError('Missing "{}" key in json data.'.format(token_key))
+    data = await request.get_json(silent=True)
+    if not isinstance(data, dict) or token_key not in data:
+        return _Miss('Missing "{}" key in json data.', (token_key,))
 
-    return encoded_token, None
+    return data[token_key], None
 
 
-async def _decode_jwt_from_request(request_type):
-    # All the places we can get a JWT from in this request
-    get_encoded_token_functions = []
+async def _decode_client_token(encoded_token, csrf_token):
+    jwt_manager = _get_jwt_manager()
+    limiter = jwt_manager._get_failed_auth_limiter()
+    if limiter is None:
+        return await _decode_request_token(encoded_token, csrf_token)
+
+    # Clients that keep sending bad tokens are turned away before spending
+    # any time verifying another one
+    key = jwt_manager._failed_auth_limit_key_callback(encoded_token)
+    if limiter.is_limited(key):
+        raise FailedAuthRateLimitError("Too many failed authentication attempts")
+    try:
+        return await _decode_request_token(encoded_token, csrf_token)
+    except (ExpiredSignatureError, ImmatureSignatureError):
+        # Tokens that were validly signed but are used at the wrong time are
+        # not attempts at guessing one, and clients need to refresh them
+        raise
+    except (InvalidTokenError, JWTDecodeError, CSRFError):
+        limiter.record_failure(key)
+        raise
 
-    locations = config.token_location
 
-    # add the functions in the order specified in JWT_TOKEN_LOCATION
-    for location in locations:
-        if location == "cookies":
-            get_encoded_token_functions.append(
-                lambda: _decode_jwt_from_cookies(request_type)
-            )
-        if location == "query_string":
-            get_encoded_token_functions.append(_decode_jwt_from_query_string)
-        if location == "headers":
-            get_encoded_token_functions.append(_decode_jwt_from_headers)
-        if location == "json":
-            get_encoded_token_functions.append(
-                lambda: _decode_jwt_from_json(request_type)
-            )
+async def _decode_request_token(encoded_token, csrf_token):
+    if config.offload_verification:
+        return await _decode_token_offloading(
+            encoded_token, csrf_token, allow_revoked=False
+        )
+    return _decode_token(encoded_token, csrf_token, allow_revoked=False)
 
-    # Try to find the token from one of these locations. It only needs to exist
-    # in one place to be valid (not every location).
-    errors = []
+
+async def _decode_jwt_from_request(request_type):
+    # Stacked decorators and views verifying the token again reuse the token
+    # that was already verified in this request
+    verified = _request_memo().setdefault("verified", {})
+    if request_type in verified:
+        return verified[request_type]
+
+    tracer = _get_jwt_manager()._tracer
+    with span(tracer, "jwt.authenticate", request_type=request_type):
+        token = await _decode_jwt_from_locations(request_type, tracer)
+    verified[request_type] = token
+    return token
+
+
+async def _decode_jwt_from_locations(request_type, tracer):
+    # Try to find the token from one of the locations, in the order specified
+    # in JWT_TOKEN_LOCATION. It only needs to exist in one place to be valid
+    # (not every location).
+    misses = []
     decoded_token = None
     jwt_header = None
-    for get_encoded_token_function in get_encoded_token_functions:
-        try:
-            encoded_token, csrf_token = await get_encoded_token_function()
-            decoded_token = decode_token(encoded_token, csrf_token)
-            jwt_header = get_unverified_jwt_headers(encoded_token)
-            break
-        except NoAuthorizationError as e:
-            errors.append(str(e))
-
-    # Do some work to make a helpful and human readable error message if no
-    # token was found in any of the expected locations.
-    if not decoded_token:
-        token_locations = config.token_location
-        multiple_jwt_locations = len(token_locations) != 1
-
-        if multiple_jwt_locations:
-            err_msg = "Missing JWT in {start_locs} or {end_locs} ({details})".format(
-                start_locs=", ".join(token_locations[:-1]),
-                end_locs=token_locations[-1],
-                details="; ".join(errors),
+    location = None
+    try:
+        for location in config.token_location:
+            with span(tracer, "jwt.extract", location=location), profiled("extract"):
+                found = await _extract_token(location, request_type)
+            if found is None:
+                continue
+            if isinstance(found, _Miss):
+                misses.append(found)
+                continue
+            encoded_token, csrf_token = found
+            decoded_token, jwt_header = await _decode_client_token(
+                encoded_token, csrf_token
             )
-            raise NoAuthorizationError(err_msg)
-        else:
-            raise NoAuthorizationError(errors[0])
+            break
 
-    verify_token_type(decoded_token, expected_type=request_type)
-    verify_token_not_blacklisted(decoded_token, request_type)
+        # Do some work to make a helpful and human readable error message if no
+        # token was found in any of the expected locations.
+        if not decoded_token:
+            location = None
+            token_locations = config.token_location
+            multiple_jwt_locations = len(token_locations) != 1
+
+            if multiple_jwt_locations:
+                err_msg = (
+                    "Missing JWT in {start_locs} or {end_locs} ({details})".format(
+                        start_locs=", ".join(token_locations[:-1]),
+                        end_locs=token_locations[-1],
+                        details="; ".join(map(_format_miss, misses)),
+                    )
+                )
+                raise NoAuthorizationError(err_msg)
+            else:
+                raise NoAuthorizationError(_format_miss(misses[0]))
+
+        verify_token_type(decoded_token, expected_type=request_type)
+        try:
+            await verify_token_not_blacklisted(decoded_token, request_type)
+            if request_type == "refresh":
+                await verify_refresh_token_not_reused(decoded_token)
+        except RevokedTokenError as e:
+            _remember_rejection(encoded_token, e)
+            raise
+    except (JWTExtendedException, InvalidTokenError) as e:
+        metrics = _get_jwt_manager()._metrics
+        if metrics.enabled:
+            metrics.increment(
+                "auth_errors", error=type(e).__name__, location=location or "none"
+            )
+        raise
+    if request_type == "access":
+        # For renewing the token in the same place (see
+        # JWT_SLIDING_EXPIRATION_WINDOW)
+        ctx_stack.top.access_jwt_location = location
     return decoded_token, jwt_header
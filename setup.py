@@ -34,7 +34,11 @@ setup(
         "six",
     ],
     python_requires=">=3.7",
-    extras_require={"asymmetric_crypto": ["cryptography >= 35.0.0"]},
+    extras_require={
+        "asymmetric_crypto": ["cryptography >= 35.0.0"],
+        "metrics": ["prometheus_client"],
+        "tracing": ["opentelemetry-api"],
+    },
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Environment :: Web Environment",
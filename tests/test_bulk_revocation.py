@@ -0,0 +1,160 @@
+import pytest
+from calendar import timegm
+from datetime import datetime, timedelta
+from quart import Quart, jsonify
+
+from quart_jwt_extended import (
+    JWTManager,
+    jwt_required,
+    jwt_refresh_token_required,
+    create_access_token,
+    create_refresh_token,
+    revoke_all_tokens,
+    revoke_identity_tokens,
+)
+from quart_jwt_extended.revocation import RevocationWatermarks
+from tests.utils import get_jwt_manager, make_headers, encode_token
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    JWTManager(app)
+
+    @app.route("/protected", methods=["GET"])
+    @jwt_required
+    async def protected():
+        return jsonify(foo="bar")
+
+    @app.route("/refresh_protected", methods=["GET"])
+    @jwt_refresh_token_required
+    async def refresh_protected():
+        return jsonify(foo="bar")
+
+    return app
+
+
+def _issued_at(seconds_ago):
+    return datetime.utcnow() - timedelta(seconds=seconds_ago)
+
+
+async def _token(app, identity, seconds_ago, token_type="access"):
+    token_data = {
+        "identity": identity,
+        "type": token_type,
+        "fresh": False,
+        "iat": _issued_at(seconds_ago),
+        "jti": "{}-{}".format(identity, seconds_ago),
+    }
+    return await encode_token(app, token_data)
+
+
+async def _status(test_client, token, url="/protected"):
+    response = await test_client.get(url, headers=make_headers(token))
+    return response.status_code
+
+
+@pytest.mark.asyncio
+async def test_revoke_identity_tokens(app):
+    test_client = app.test_client()
+    old_token = await _token(app, "username", 60)
+    old_refresh_token = await _token(app, "username", 60, "refresh")
+    other_token = await _token(app, "other", 60)
+
+    async with app.test_request_context("/protected"):
+        revoke_identity_tokens("username", _issued_at(30))
+        new_token = create_access_token("username")
+        new_refresh_token = create_refresh_token("username")
+
+    assert await _status(test_client, old_token) == 401
+    assert await _status(test_client, old_refresh_token, "/refresh_protected") == 401
+    assert await _status(test_client, other_token) == 200
+    assert await _status(test_client, new_token) == 200
+    assert await _status(test_client, new_refresh_token, "/refresh_protected") == 200
+
+    response = await test_client.get("/protected", headers=make_headers(old_token))
+    assert await response.get_json() == {"msg": "Token has been revoked"}
+
+
+@pytest.mark.asyncio
+async def test_revoke_identity_tokens_now(app):
+    test_client = app.test_client()
+    old_token = await _token(app, "username", 5)
+    async with app.test_request_context("/protected"):
+        revoke_identity_tokens("username")
+    assert await _status(test_client, old_token) == 401
+
+    # Watermarks only move forward
+    async with app.test_request_context("/protected"):
+        revoke_identity_tokens("username", _issued_at(60))
+    assert await _status(test_client, old_token) == 401
+
+
+@pytest.mark.asyncio
+async def test_revoke_all_tokens(app):
+    test_client = app.test_client()
+    tokens = [await _token(app, identity, 60) for identity in ("foo", "bar")]
+    recent_token = await _token(app, "foo", 10)
+    dict_identity_token = await _token(app, {"foo": "bar"}, 60)
+
+    async with app.test_request_context("/protected"):
+        revoke_identity_tokens("foo", _issued_at(5))
+        revoke_all_tokens(timegm(_issued_at(30).utctimetuple()))
+
+    for token in tokens + [recent_token, dict_identity_token]:
+        assert await _status(test_client, token) == 401
+
+    bar_token = await _token(app, "bar", 10)
+    assert await _status(test_client, bar_token) == 200
+
+
+@pytest.mark.asyncio
+async def test_custom_watermarks(app):
+    checks = []
+
+    class RecordingWatermarks(RevocationWatermarks):
+        def is_revoked(self, identity, issued_at):
+            checks.append(identity)
+            return False
+
+    watermarks = RecordingWatermarks()
+    get_jwt_manager(app).set_revocation_watermarks(watermarks)
+    test_client = app.test_client()
+    token = await _token(app, "username", 60)
+
+    # Nothing is checked until a watermark has been recorded
+    assert await _status(test_client, token) == 200
+    assert checks == []
+
+    async with app.test_request_context("/protected"):
+        revoke_all_tokens()
+    assert await _status(test_client, token) == 200
+    assert checks == ["username"]
+
+
+def test_watermarks():
+    watermarks = RevocationWatermarks()
+    assert not watermarks
+    assert not watermarks.is_revoked("foo", 100)
+
+    watermarks.revoke_identity("foo", 100)
+    watermarks.revoke_identity("bar", 200)
+    assert watermarks
+    assert watermarks.is_revoked("foo", 99)
+    assert not watermarks.is_revoked("foo", 100)
+    assert watermarks.is_revoked("foo", None)
+    assert not watermarks.is_revoked("baz", None)
+    assert not watermarks.is_revoked(["unhashable"], 0)
+
+    watermarks.revoke_all(150)
+    assert watermarks.is_revoked("foo", 149)
+    assert watermarks.is_revoked("bar", 199)
+    assert watermarks.is_revoked(["unhashable"], 149)
+
+    assert watermarks.prune(100) == 1
+    assert len(watermarks) == 1
+    assert watermarks.prune(150) == 1
+    assert watermarks.global_watermark is None
+    assert watermarks.prune(199) == 0
+    assert watermarks.is_revoked("bar", 199)
@@ -0,0 +1,109 @@
+import pytest
+from quart import Quart, jsonify
+
+from quart_jwt_extended import (
+    JWTManager,
+    create_access_token,
+    fresh_jwt_required,
+    jwt_required,
+)
+from tests.utils import encode_token, get_jwt_manager, make_headers
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    JWTManager(app)
+
+    @app.route("/admin", methods=["GET"])
+    @jwt_required(roles="admin")
+    async def admin():
+        return jsonify(foo="bar")
+
+    @app.route("/read", methods=["GET"])
+    @jwt_required(roles={"admin", "staff"}, scopes=["read:users"])
+    async def read():
+        return jsonify(foo="bar")
+
+    @app.route("/fresh", methods=["GET"])
+    @fresh_jwt_required(scopes={"write:users"})
+    async def fresh():
+        return jsonify(foo="bar")
+
+    @app.route("/protected", methods=["GET"])
+    @jwt_required()
+    async def protected():
+        return jsonify(foo="bar")
+
+    return app
+
+
+async def _token(app, user_claims, fresh=False):
+    async with app.test_request_context("/protected"):
+        return create_access_token("username", fresh=fresh, user_claims=user_claims)
+
+
+async def _get(app, url, token):
+    test_client = app.test_client()
+    response = await test_client.get(url, headers=make_headers(token))
+    return response.status_code, await response.get_json()
+
+
+ALLOWED = (200, {"foo": "bar"})
+FORBIDDEN = (403, {"msg": "Insufficient roles or scopes"})
+
+
+@pytest.mark.asyncio
+async def test_roles_and_scopes_in_user_claims(app):
+    admin_token = await _token(app, {"roles": ["admin"]})
+    staff_token = await _token(
+        app, {"roles": ["staff", "admin", "other"], "scope": "read:users write:users"}
+    )
+    no_claims_token = await _token(app, {})
+
+    assert await _get(app, "/admin", admin_token) == ALLOWED
+    assert await _get(app, "/read", admin_token) == FORBIDDEN
+    assert await _get(app, "/admin", staff_token) == ALLOWED
+    assert await _get(app, "/read", staff_token) == ALLOWED
+    assert await _get(app, "/admin", no_claims_token) == FORBIDDEN
+    assert await _get(app, "/protected", no_claims_token) == ALLOWED
+
+    assert await _get(app, "/fresh", staff_token) == (
+        401,
+        {"msg": "Fresh token required"},
+    )
+    fresh_token = await _token(app, {"scope": ["write:users"]}, fresh=True)
+    assert await _get(app, "/fresh", fresh_token) == ALLOWED
+
+
+@pytest.mark.asyncio
+async def test_custom_claims(app):
+    app.config["JWT_ROLES_CLAIM"] = "groups"
+    app.config["JWT_SCOPES_CLAIM"] = "scp"
+    token = await encode_token(
+        app,
+        {
+            "identity": "username",
+            "type": "access",
+            "groups": ["admin", "staff"],
+            "scp": ["read:users"],
+        },
+    )
+    assert await _get(app, "/read", token) == ALLOWED
+
+    # Claims that are not lists or strings grant nothing
+    token = await encode_token(
+        app, {"identity": "username", "type": "access", "groups": {"admin": True}}
+    )
+    assert await _get(app, "/admin", token) == FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test_insufficient_claims_loader(app):
+    @get_jwt_manager(app).insufficient_claims_loader
+    def insufficient_claims():
+        return jsonify(foo="baz"), 404
+
+    token = await _token(app, {})
+    assert await _get(app, "/admin", token) == (404, {"foo": "baz"})
@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+import pytest
+from dateutil.relativedelta import relativedelta
+from quart import Quart, jsonify
+
+from quart_jwt_extended import (
+    JWTManager,
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    fresh_jwt_required,
+    jwt_required,
+)
+from quart_jwt_extended.clock import ManualClock, SystemClock
+from tests.utils import get_jwt_manager, make_headers
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    JWTManager(app)
+
+    @app.route("/protected", methods=["GET"])
+    @jwt_required
+    async def protected():
+        return jsonify(foo="bar")
+
+    @app.route("/fresh_protected", methods=["GET"])
+    @fresh_jwt_required
+    async def fresh_protected():
+        return jsonify(foo="bar")
+
+    return app
+
+
+@pytest.fixture(scope="function")
+def clock(app):
+    clock = ManualClock(1500000000)
+    get_jwt_manager(app).set_clock(clock)
+    return clock
+
+
+async def _get(app, url, token):
+    test_client = app.test_client()
+    response = await test_client.get(url, headers=make_headers(token))
+    return response.status_code, await response.get_json()
+
+
+@pytest.mark.asyncio
+async def test_tokens_use_the_clock(app, clock):
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username", fresh=timedelta(minutes=5))
+        refresh_token = create_refresh_token("username")
+        access_data = decode_token(access_token)
+        refresh_data = decode_token(refresh_token)
+
+    assert access_data["iat"] == access_data["nbf"] == 1500000000
+    assert access_data["exp"] == 1500000000 + 15 * 60
+    assert access_data["fresh"] == 1500000000 + 5 * 60
+    assert refresh_data["exp"] == 1500000000 + 30 * 24 * 60 * 60
+
+
+@pytest.mark.asyncio
+async def test_relativedelta_expiry(app, clock):
+    app.config["JWT_ACCESS_TOKEN_EXPIRES"] = relativedelta(months=1)
+    async with app.test_request_context("/protected"):
+        decoded = decode_token(create_access_token("username"))
+    # July 14th to August 14th 2017
+    assert decoded["exp"] == 1500000000 + 31 * 24 * 60 * 60
+
+
+@pytest.mark.asyncio
+async def test_time_travel(app, clock):
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username", fresh=timedelta(minutes=5))
+
+    assert await _get(app, "/fresh_protected", access_token) == (200, {"foo": "bar"})
+
+    clock.advance(timedelta(minutes=6))
+    status_code, json_data = await _get(app, "/fresh_protected", access_token)
+    assert (status_code, json_data) == (401, {"msg": "Fresh token required"})
+    assert await _get(app, "/protected", access_token) == (200, {"foo": "bar"})
+
+    clock.advance(10 * 60)
+    status_code, json_data = await _get(app, "/protected", access_token)
+    assert (status_code, json_data) == (401, {"msg": "Token has expired"})
+
+    clock.set(1500000000)
+    assert await _get(app, "/protected", access_token) == (200, {"foo": "bar"})
+
+
+def test_system_clock():
+    assert SystemClock(timer=lambda: 1500000000.9).now() == 1500000000
+    assert isinstance(SystemClock().now(), int)
@@ -0,0 +1,135 @@
+import asyncio
+import pytest
+from quart import Quart, jsonify
+
+from quart_jwt_extended import (
+    JWTManager,
+    jwt_required,
+    create_access_token,
+    current_user,
+)
+from quart_jwt_extended.caching import SingleFlight
+from tests.utils import get_jwt_manager, make_headers
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    app.config["JWT_BLACKLIST_ENABLED"] = True
+    app.config["JWT_COALESCE_CALLBACKS"] = True
+    jwt = JWTManager(app)
+    app.calls = []
+
+    @jwt.token_in_blacklist_loader
+    async def check_if_token_in_blacklist(decoded_token):
+        app.calls.append(("blacklist", decoded_token["jti"]))
+        await asyncio.sleep(0.01)
+        return False
+
+    @jwt.user_loader_callback_loader
+    async def user_load_callback(identity):
+        app.calls.append(("user", identity))
+        await asyncio.sleep(0.01)
+        return {"username": identity}
+
+    @app.route("/protected", methods=["GET"])
+    @jwt_required
+    async def protected():
+        return jsonify(foo=current_user["username"])
+
+    return app
+
+
+async def _get_concurrently(app, tokens):
+    test_client = app.test_client()
+    responses = await asyncio.gather(
+        *[test_client.get("/protected", headers=make_headers(t)) for t in tokens]
+    )
+    return [(r.status_code, await r.get_json()) for r in responses]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_shared(app):
+    async with app.test_request_context("/protected"):
+        token = create_access_token("username")
+        other_token = create_access_token("other")
+
+    results = await _get_concurrently(app, [token] * 5 + [other_token] * 2)
+    assert results == [(200, {"foo": "username"})] * 5 + [(200, {"foo": "other"})] * 2
+    assert sorted(kind for kind, _ in app.calls) == ["blacklist"] * 2 + ["user"] * 2
+    assert len(get_jwt_manager(app)._user_loader_flights) == 0
+
+    # Calls are only shared while they are in flight
+    await _get_concurrently(app, [token])
+    assert len(app.calls) == 6
+
+
+@pytest.mark.asyncio
+async def test_coalescing_disabled(app):
+    app.config["JWT_COALESCE_CALLBACKS"] = False
+    async with app.test_request_context("/protected"):
+        token = create_access_token("username")
+
+    results = await _get_concurrently(app, [token] * 3)
+    assert results == [(200, {"foo": "username"})] * 3
+    assert len(app.calls) == 6
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_exceptions():
+    flights = SingleFlight()
+    calls = []
+
+    async def fail(value):
+        calls.append(value)
+        await asyncio.sleep(0)
+        raise ValueError(value)
+
+    results = await asyncio.gather(
+        flights.do("key", fail, 1), flights.do("key", fail, 2), return_exceptions=True
+    )
+    assert [str(e) for e in results] == ["1", "1"]
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_cancelled_callers():
+    flights = SingleFlight()
+    event = asyncio.Event()
+
+    async def wait():
+        await event.wait()
+        return "done"
+
+    first = asyncio.ensure_future(flights.do("key", wait))
+    second = asyncio.ensure_future(flights.do("key", wait))
+    await asyncio.sleep(0)
+    first.cancel()
+    event.set()
+    assert await second == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.asyncio
+async def test_single_flight_without_sharing():
+    flights = SingleFlight()
+    calls = []
+
+    def sync(value):
+        calls.append(value)
+        return value
+
+    async def coroutine(value):
+        calls.append(value)
+        await asyncio.sleep(0)
+        return value
+
+    assert await flights.do("key", sync, 1) == 1
+    assert await asyncio.gather(
+        flights.do(["unhashable"], coroutine, 2),
+        flights.do(["unhashable"], coroutine, 3),
+    ) == [2, 3]
+    assert calls == [1, 2, 3]
+    assert len(flights) == 0
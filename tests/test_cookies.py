@@ -7,7 +7,9 @@ from quart_jwt_extended import (
     jwt_refresh_token_required,
     create_access_token,
     create_refresh_token,
+    get_csrf_token,
     set_access_cookies,
+    set_jwt_cookies,
     set_refresh_cookies,
     unset_jwt_cookies,
     unset_access_cookies,
@@ -538,3 +540,88 @@ async def test_jwt_optional_with_csrf_enabled(app):
     response = await test_client.post("/optional_post_protected")
     assert response.status_code == 401
     assert await response.get_json() == {"msg": "Missing CSRF token"}
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {
+            "JWT_COOKIE_SECURE": True,
+            "JWT_COOKIE_DOMAIN": "test.com",
+            "JWT_SESSION_COOKIE": False,
+            "JWT_COOKIE_SAMESITE": "Strict",
+        },
+        {"JWT_CSRF_IN_COOKIES": False, "JWT_ACCESS_COOKIE_PATH": "/api/"},
+    ],
+)
+@pytest.mark.asyncio
+async def test_cookie_headers_match_set_cookie(app, monkeypatch, options):
+    monkeypatch.setattr("time.time", lambda: 1500000000.5)
+    monkeypatch.setattr("werkzeug.http.time", lambda: 1500000000.5)
+    app.config.update(options)
+
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+        refresh_token = create_refresh_token("username")
+        response = jsonify(login=True)
+        set_jwt_cookies(response, access_token, refresh_token)
+        set_access_cookies(response, access_token, max_age=60)
+        unset_jwt_cookies(response)
+
+        expected = jsonify(login=True)
+        max_age = None if app.config["JWT_SESSION_COOKIE"] else 31540000
+        cookies = [
+            ("JWT_ACCESS_COOKIE_NAME", "JWT_ACCESS_COOKIE_PATH", access_token),
+            ("JWT_REFRESH_COOKIE_NAME", "JWT_REFRESH_COOKIE_PATH", refresh_token),
+            ("JWT_ACCESS_COOKIE_NAME", "JWT_ACCESS_COOKIE_PATH", access_token),
+            ("JWT_ACCESS_COOKIE_NAME", "JWT_ACCESS_COOKIE_PATH", None),
+            ("JWT_REFRESH_COOKIE_NAME", "JWT_REFRESH_COOKIE_PATH", None),
+        ]
+        for i, (name, path, token) in enumerate(cookies):
+            kwargs = dict(
+                secure=app.config["JWT_COOKIE_SECURE"],
+                domain=app.config["JWT_COOKIE_DOMAIN"],
+                samesite=app.config["JWT_COOKIE_SAMESITE"],
+            )
+            if token is None:
+                kwargs["expires"] = 0
+            else:
+                kwargs["max_age"] = 60 if i == 2 else max_age
+            expected.set_cookie(
+                app.config[name],
+                token or "",
+                path=app.config[path],
+                httponly=True,
+                **kwargs
+            )
+            if app.config["JWT_CSRF_IN_COOKIES"]:
+                csrf_name = name.replace("_COOKIE_NAME", "_CSRF_COOKIE_NAME")
+                csrf_path = path.replace("_COOKIE_PATH", "_CSRF_COOKIE_PATH")
+                expected.set_cookie(
+                    app.config[csrf_name],
+                    get_csrf_token(token) if token else "",
+                    path=app.config[csrf_path],
+                    httponly=False,
+                    **kwargs
+                )
+
+    headers = response.headers.getlist("Set-Cookie")
+    assert headers == expected.headers.getlist("Set-Cookie")
+
+
+@pytest.mark.asyncio
+async def test_cookie_options_read_once_per_app(app):
+    test_client = app.test_client()
+    response = await test_client.get("/access_token")
+    assert _get_cookie_from_response(response, "access_token_cookie") is not None
+
+    # Changed after the cookies were first set
+    app.config["JWT_ACCESS_COOKIE_NAME"] = "new_access_cookie"
+    response = await test_client.get("/access_token")
+    assert _get_cookie_from_response(response, "access_token_cookie") is not None
+
+    # Read again when the app is registered again
+    JWTManager(app)
+    response = await test_client.get("/access_token")
+    assert _get_cookie_from_response(response, "new_access_cookie") is not None
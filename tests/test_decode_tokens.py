@@ -1,6 +1,6 @@
 import jwt
 import pytest
-from datetime import datetime, timedelta
+from datetime import timedelta
 from dateutil.relativedelta import relativedelta
 import warnings
 
@@ -23,6 +23,7 @@ from quart_jwt_extended import (
     get_jti,
     get_unverified_jwt_headers,
 )
+from quart_jwt_extended.clock import ManualClock
 from quart_jwt_extended.config import config
 from quart_jwt_extended.exceptions import JWTDecodeError
 from tests.utils import get_jwt_manager, encode_token
@@ -51,19 +52,6 @@ async def default_access_token(app):
         }
 
 
-@pytest.fixture(scope="function")
-def patch_datetime_now(monkeypatch):
-    date_in_future = datetime.utcnow() + timedelta(seconds=30)
-
-    class mydatetime(datetime):
-        @classmethod
-        def utcnow(cls):
-            return date_in_future
-
-    monkeypatch.setattr(__name__ + ".datetime", mydatetime)
-    monkeypatch.setattr("datetime.datetime", mydatetime)
-
-
 @pytest.mark.parametrize("user_loader_return", [{}, None])
 @pytest.mark.asyncio
 async def test_no_user_claims(app, user_loader_return):
@@ -157,15 +145,21 @@ async def test_never_expire_token(app):
 
 
 @pytest.mark.asyncio
-async def test_nbf_token_in_future(app, patch_datetime_now):
+async def test_nbf_token_in_future(app):
+    clock = ManualClock()
+    get_jwt_manager(app).set_clock(clock)
     with pytest.raises(ImmatureSignatureError):
         async with app.test_request_context("/protected"):
+            clock.advance(30)
             access_token = create_access_token("username")
+            clock.advance(-30)
             decode_token(access_token)
 
     async with app.test_request_context("/protected"):
         app.config["JWT_DECODE_LEEWAY"] = 30
+        clock.advance(30)
         access_token = create_access_token("username")
+        clock.advance(-30)
         decode_token(access_token)
 
 
@@ -353,3 +347,38 @@ async def test_jwt_headers(app):
         refresh_token = create_refresh_token("username", headers=jwt_header)
         assert get_unverified_jwt_headers(access_token)["foo"] == "bar"
         assert get_unverified_jwt_headers(refresh_token)["foo"] == "bar"
+
+
+@pytest.mark.asyncio
+async def test_decode_key_callback_called_once(app):
+    jwtM = get_jwt_manager(app)
+    calls = []
+
+    @jwtM.decode_key_loader
+    def get_decode_key(claims, headers):
+        calls.append((claims, headers))
+        return "change_me"
+
+    async with app.test_request_context("/protected"):
+        expired_token = create_access_token("username", expires_delta=timedelta(-1))
+        with pytest.raises(ExpiredSignatureError):
+            decode_token(expired_token)
+        assert len(calls) == 1
+
+        # Claims handed to the callback are not modified by the defaults
+        decoded = decode_token(expired_token, allow_expired=True)
+        claims, headers = calls[-1]
+        assert headers["alg"] == "HS256"
+        assert claims["identity"] == decoded["identity"] == "username"
+        assert config.user_claims_key not in claims
+        assert config.user_claims_key in decoded
+
+
+@pytest.mark.parametrize(
+    "token", ["foo.bar", "e30.e30.e30.e30", "Zm9v.e30.", "e30.Zm9v.", "e30.W10.", 42]
+)
+@pytest.mark.asyncio
+async def test_unparseable_tokens(app, token):
+    with pytest.raises(DecodeError):
+        async with app.test_request_context("/protected"):
+            decode_token(token)
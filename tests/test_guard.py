@@ -0,0 +1,161 @@
+import pytest
+from quart import Blueprint, Quart, jsonify
+
+from quart_jwt_extended import (
+    JWTManager,
+    create_access_token,
+    create_refresh_token,
+    get_jwt_identity,
+    jwt_exempt,
+    jwt_requirement,
+    protect,
+)
+from tests.utils import make_headers
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    JWTManager(app)
+    return app
+
+
+def _add_routes(app_or_blueprint):
+    @app_or_blueprint.route("/protected")
+    async def protected():
+        return jsonify(identity=get_jwt_identity())
+
+    @app_or_blueprint.route("/login")
+    async def login():
+        return jsonify(identity=get_jwt_identity())
+
+    @app_or_blueprint.route("/public")
+    @jwt_exempt
+    async def public():
+        return jsonify(identity=get_jwt_identity())
+
+    @app_or_blueprint.route("/fresh")
+    @jwt_requirement("fresh")
+    async def fresh():
+        return jsonify(identity=get_jwt_identity())
+
+    @app_or_blueprint.route("/optional")
+    @jwt_requirement("optional")
+    async def optional():
+        return jsonify(identity=get_jwt_identity())
+
+    @app_or_blueprint.route("/refresh")
+    @jwt_requirement("refresh")
+    async def refresh():
+        return jsonify(identity=get_jwt_identity())
+
+
+async def _tokens(app):
+    async with app.test_request_context("/protected"):
+        return (
+            create_access_token("username"),
+            create_access_token("username", fresh=True),
+            create_refresh_token("username"),
+        )
+
+
+async def _get(app, url, token=None):
+    test_client = app.test_client()
+    headers = make_headers(token) if token else None
+    response = await test_client.get(url, headers=headers)
+    return response.status_code, await response.get_json()
+
+
+@pytest.mark.asyncio
+async def test_protect_app(app):
+    _add_routes(app)
+    protect(app, exempt=["login"])
+    access_token, fresh_token, refresh_token = await _tokens(app)
+    missing = (401, {"msg": "Missing Authorization Header"})
+    identity = (200, {"identity": "username"})
+    anonymous = (200, {"identity": None})
+
+    assert await _get(app, "/protected") == missing
+    assert await _get(app, "/protected", access_token) == identity
+    assert await _get(app, "/protected", refresh_token) == (
+        422,
+        {"msg": "Only access tokens are allowed"},
+    )
+    assert await _get(app, "/login") == anonymous
+    assert await _get(app, "/public") == anonymous
+    assert await _get(app, "/fresh", access_token) == (
+        401,
+        {"msg": "Fresh token required"},
+    )
+    assert await _get(app, "/fresh", fresh_token) == identity
+    assert await _get(app, "/optional") == anonymous
+    assert await _get(app, "/optional", access_token) == identity
+    assert await _get(app, "/refresh", access_token) == (
+        422,
+        {"msg": "Only refresh tokens are allowed"},
+    )
+    assert await _get(app, "/refresh", refresh_token) == identity
+    assert (await _get(app, "/static/missing.css"))[0] == 404
+    assert (await _get(app, "/missing"))[0] == 404
+
+
+@pytest.mark.asyncio
+async def test_protect_blueprint(app):
+    blueprint = Blueprint("api", __name__)
+    _add_routes(blueprint)
+    protect(blueprint, requirement="optional", exempt=["api.login"])
+    app.register_blueprint(blueprint, url_prefix="/api")
+    _add_routes(app)
+    access_token, fresh_token, refresh_token = await _tokens(app)
+
+    assert await _get(app, "/api/protected") == (200, {"identity": None})
+    assert await _get(app, "/api/protected", access_token) == (
+        200,
+        {"identity": "username"},
+    )
+    assert await _get(app, "/api/login", access_token) == (200, {"identity": None})
+    assert (await _get(app, "/api/fresh", access_token))[0] == 401
+    # Endpoints outside of the blueprint are not protected
+    assert await _get(app, "/fresh", access_token) == (200, {"identity": None})
+
+
+@pytest.mark.asyncio
+async def test_endpoints_added_later_are_protected(app):
+    _add_routes(app)
+    protect(app)
+    assert (await _get(app, "/protected"))[0] == 401
+
+    @app.route("/later")
+    async def later():
+        return jsonify(identity=get_jwt_identity())
+
+    assert (await _get(app, "/later"))[0] == 401
+
+
+@pytest.mark.asyncio
+async def test_only_static_files_are_exempt(app, tmpdir):
+    tmpdir.join("site.css").write("body {}")
+    assets = Blueprint(
+        "assets", __name__, static_folder=str(tmpdir), static_url_path="/static"
+    )
+    app.register_blueprint(assets, url_prefix="/assets")
+    api = Blueprint("api", __name__)
+
+    # Named like the static endpoints, but not serving static files
+    @api.route("/static")
+    async def static():
+        return jsonify(identity=get_jwt_identity())
+
+    app.register_blueprint(api, url_prefix="/api")
+    protect(app)
+
+    assert (await _get(app, "/api/static"))[0] == 401
+    assert (await _get(app, "/assets/static/site.css"))[0] == 200
+
+
+def test_invalid_requirement(app):
+    with pytest.raises(ValueError):
+        protect(app, requirement="admin")
+    with pytest.raises(ValueError):
+        jwt_requirement("admin")
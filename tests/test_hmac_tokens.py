@@ -0,0 +1,48 @@
+import jwt
+import pytest
+from datetime import datetime, timedelta
+from jwt import InvalidSignatureError, InvalidTokenError
+from quart.json import JSONEncoder
+
+from quart_jwt_extended.tokens import _encode_jwt, decode_jwt
+
+
+@pytest.mark.parametrize("algorithm", ["HS256", "HS384", "HS512"])
+@pytest.mark.parametrize("secret", ["secret", b"secret"])
+@pytest.mark.parametrize("headers", [None, {"kid": "key-1"}, {"typ": None}])
+def test_tokens_match_pyjwt(algorithm, secret, headers):
+    token_data = {"identity": "username", "when": datetime(2020, 1, 1)}
+    token = _encode_jwt(
+        token_data, timedelta(minutes=5), secret, algorithm, JSONEncoder, headers
+    )
+    payload = jwt.decode(token, options={"verify_signature": False})
+    expected_data = {claim: payload[claim] for claim in ("iat", "nbf", "jti", "exp")}
+    expected_data.update(token_data)
+    expected = jwt.encode(
+        expected_data, secret, algorithm, json_encoder=JSONEncoder, headers=headers
+    )
+    assert token == expected
+
+
+@pytest.mark.parametrize("algorithm", ["HS256", "HS384", "HS512"])
+def test_verify_signature(algorithm):
+    token = _encode_jwt({"identity": "username"}, False, "secret", algorithm)
+    decoded = decode_jwt(token, "secret", [algorithm], "identity", "user_claims")
+    assert decoded["identity"] == "username"
+
+    with pytest.raises(InvalidSignatureError):
+        decode_jwt(token, "other-secret", [algorithm], "identity", "user_claims")
+
+    tampered = token[:-4] + ("AAAA" if not token.endswith("AAAA") else "BBBB")
+    with pytest.raises(InvalidSignatureError):
+        decode_jwt(tampered, "secret", [algorithm], "identity", "user_claims")
+
+
+def test_invalid_key_id():
+    with pytest.raises(InvalidTokenError):
+        _encode_jwt({}, False, "secret", "HS256", headers={"kid": 1})
+
+
+def test_alg_header_overrides_algorithm():
+    token = _encode_jwt({}, False, "secret", "HS256", headers={"alg": "HS512"})
+    assert jwt.get_unverified_header(token)["alg"] == "HS512"
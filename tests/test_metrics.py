@@ -0,0 +1,146 @@
+import pytest
+from jwt.utils import base64url_encode
+from quart import Quart, jsonify
+
+from quart_jwt_extended import (
+    JWTManager,
+    jwt_required,
+    create_access_token,
+    create_refresh_token,
+)
+from quart_jwt_extended.metrics import AuthMetrics, PrometheusMetrics, timed
+from quart_jwt_extended.utils import _timed_verify
+from tests.utils import get_jwt_manager, make_headers
+
+
+class RecordingMetrics(AuthMetrics):
+    enabled = True
+
+    def __init__(self):
+        self.latencies = []
+        self.counters = []
+
+    def observe(self, name, seconds, **labels):
+        assert seconds >= 0
+        self.latencies.append((name, labels))
+
+    def increment(self, name, **labels):
+        self.counters.append((name, labels))
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    app.config["JWT_BLACKLIST_ENABLED"] = True
+    app.config["JWT_TOKEN_LOCATION"] = ["query_string", "headers"]
+    jwt = JWTManager(app)
+
+    @jwt.token_in_blacklist_loader
+    def check_blacklisted(decoded_token):
+        return decoded_token["identity"] == "revoked"
+
+    @jwt.user_loader_callback_loader
+    def load_user(identity):
+        return identity
+
+    @app.route("/protected", methods=["GET"])
+    @jwt_required
+    async def protected():
+        return jsonify(foo="bar")
+
+    return app
+
+
+@pytest.fixture(scope="function")
+def metrics(app):
+    metrics = RecordingMetrics()
+    get_jwt_manager(app).set_metrics(metrics)
+    return metrics
+
+
+@pytest.mark.asyncio
+async def test_successful_request(app, metrics):
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+        create_refresh_token("username")
+    assert metrics.latencies == [
+        ("create_token", {"type": "access", "algorithm": "HS256"}),
+        ("create_token", {"type": "refresh", "algorithm": "HS256"}),
+    ]
+
+    metrics.latencies.clear()
+    test_client = app.test_client()
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 200
+    assert metrics.latencies == [
+        ("verify", {"algorithm": "HS256"}),
+        ("blacklist_check", {}),
+        ("user_load", {}),
+    ]
+    assert metrics.counters == [("blacklist_hits", {"revoked": "false"})]
+
+
+@pytest.mark.asyncio
+async def test_failed_requests(app, metrics):
+    async with app.test_request_context("/protected"):
+        revoked_token = create_access_token("revoked")
+
+    test_client = app.test_client()
+    response = await test_client.get("/protected", headers=make_headers(revoked_token))
+    assert response.status_code == 401
+    response = await test_client.get("/protected?jwt=foo.bar.baz")
+    assert response.status_code == 422
+    response = await test_client.get("/protected")
+    assert response.status_code == 401
+
+    assert metrics.counters == [
+        ("blacklist_hits", {"revoked": "true"}),
+        ("auth_errors", {"error": "RevokedTokenError", "location": "headers"}),
+        ("auth_errors", {"error": "DecodeError", "location": "query_string"}),
+        ("auth_errors", {"error": "NoAuthorizationError", "location": "none"}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_forged_algorithms_are_not_labels(app, metrics):
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+    metrics.latencies.clear()
+
+    test_client = app.test_client()
+    for i in range(3):
+        header = base64url_encode('{{"alg":"X{}","typ":"JWT"}}'.format(i).encode())
+        token = header.decode() + access_token[access_token.index(".") :]
+        response = await test_client.get("/protected", headers=make_headers(token))
+        assert response.status_code == 422
+
+    assert metrics.latencies == [("verify", {"algorithm": "invalid"})] * 3
+
+
+def test_disabled_metrics_are_not_timed():
+    metrics = AuthMetrics()
+    assert timed(metrics, "verify") is timed(metrics, "user_load")
+    # Not even the label of the algorithm is looked up, which needs the app
+    assert _timed_verify(metrics, "HS256") is timed(metrics, "verify")
+
+
+def test_prometheus_metrics():
+    prometheus_client = pytest.importorskip("prometheus_client")
+    registry = prometheus_client.CollectorRegistry()
+    metrics = PrometheusMetrics(registry=registry)
+
+    with timed(metrics, "verify", algorithm="HS256"):
+        pass
+    metrics.increment("auth_errors", error="DecodeError", location="headers")
+
+    assert (
+        registry.get_sample_value("jwt_verify_seconds_count", {"algorithm": "HS256"})
+        == 1
+    )
+    assert (
+        registry.get_sample_value(
+            "jwt_auth_errors_total", {"error": "DecodeError", "location": "headers"}
+        )
+        == 1
+    )
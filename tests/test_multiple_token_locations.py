@@ -3,10 +3,14 @@ from quart import Quart, jsonify
 
 from quart_jwt_extended import (
     JWTManager,
+    get_jwt_identity,
+    jwt_optional,
     jwt_required,
     create_access_token,
     set_access_cookies,
 )
+from quart_jwt_extended import view_decorators
+from quart_jwt_extended.exceptions import NoAuthorizationError
 
 
 @pytest.fixture(scope="function")
@@ -28,6 +32,11 @@ def app():
     async def access_protected():
         return jsonify(foo="bar")
 
+    @app.route("/optional", methods=["GET", "POST"])
+    @jwt_optional
+    async def optional():
+        return jsonify(identity=get_jwt_identity())
+
     return app
 
 
@@ -77,6 +86,64 @@ async def test_json_access(app):
     assert await response.get_json() == {"foo": "bar"}
 
 
+@pytest.mark.asyncio
+async def test_missing_locations_are_not_raised(app, monkeypatch):
+    # The reasons the earlier locations missed are only turned into an error
+    # when the token is in none of them
+    errors = []
+
+    def no_authorization_error(msg):
+        errors.append(msg)
+        return NoAuthorizationError(msg)
+
+    monkeypatch.setattr(view_decorators, "NoAuthorizationError", no_authorization_error)
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+
+    response = await test_client.post("/protected", json={"access_token": access_token})
+    assert response.status_code == 200
+    assert errors == []
+
+    response = await test_client.post("/protected", json=["access_token"])
+    assert response.status_code == 401
+    assert errors == [
+        "Missing JWT in headers, cookies, query_string or json (Missing "
+        'Authorization Header; Missing cookie "access_token_cookie"; Missing '
+        '"jwt" query paramater; Missing "access_token" key in json data.)'
+    ]
+
+
+@pytest.mark.asyncio
+async def test_optional_without_credentials(app, monkeypatch):
+    extracted = []
+    extract_token = view_decorators._extract_token
+
+    async def recording_extract_token(location, request_type):
+        extracted.append(location)
+        return await extract_token(location, request_type)
+
+    monkeypatch.setattr(view_decorators, "_extract_token", recording_extract_token)
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+
+    response = await test_client.post("/optional", form={"access_token": access_token})
+    assert await response.get_json() == {"identity": None}
+    response = await test_client.get("/optional?jwt=")
+    assert await response.get_json() == {"identity": None}
+    assert extracted == []
+
+    response = await test_client.post("/optional", json={"foo": "bar"})
+    assert await response.get_json() == {"identity": None}
+    assert extracted == ["headers", "cookies", "query_string", "json"]
+
+    del extracted[:]
+    response = await test_client.get("/optional?jwt={}".format(access_token))
+    assert await response.get_json() == {"identity": "username"}
+    assert extracted == ["headers", "cookies", "query_string"]
+
+
 @pytest.mark.parametrize(
     "options",
     [
@@ -0,0 +1,149 @@
+from datetime import timedelta
+
+import pytest
+from jwt import InvalidSignatureError
+from quart import Quart, jsonify
+
+from quart_jwt_extended import (
+    JWTManager,
+    jwt_required,
+    create_access_token,
+    decode_token,
+)
+from quart_jwt_extended.caching import TTLCache
+from tests.utils import get_jwt_manager, make_headers
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    app.config["JWT_NEGATIVE_CACHE_SIZE"] = 16
+    JWTManager(app)
+
+    @app.route("/protected", methods=["GET"])
+    @jwt_required
+    async def protected():
+        return jsonify(foo="bar")
+
+    return app
+
+
+@pytest.fixture(scope="function")
+def decode_key_calls(app):
+    calls = []
+    jwtM = get_jwt_manager(app)
+
+    @jwtM.decode_key_loader
+    def decode_key(claims, headers):
+        calls.append(claims)
+        return "foobarbaz"
+
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_bad_signature_is_remembered(app, decode_key_calls):
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+    bad_token = access_token[:-4] + "abcd"
+
+    test_client = app.test_client()
+    for _ in range(3):
+        response = await test_client.get("/protected", headers=make_headers(bad_token))
+        assert response.status_code == 422
+        assert await response.get_json() == {"msg": "Signature verification failed"}
+    assert len(decode_key_calls) == 1
+
+    async with app.test_request_context("/protected"):
+        with pytest.raises(InvalidSignatureError):
+            decode_token(bad_token)
+    assert len(decode_key_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_token_is_remembered(app, decode_key_calls):
+    jwtM = get_jwt_manager(app)
+    expired_tokens = []
+
+    @jwtM.expired_token_loader
+    def expired(token):
+        expired_tokens.append(token)
+        return jsonify(msg="expired"), 401
+
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username", expires_delta=timedelta(-1))
+
+    test_client = app.test_client()
+    for _ in range(2):
+        response = await test_client.get(
+            "/protected", headers=make_headers(access_token)
+        )
+        assert response.status_code == 401
+    assert len(decode_key_calls) == 1
+    assert expired_tokens[0] == expired_tokens[1]
+    assert expired_tokens[0]["identity"] == "username"
+
+    # Callers that allow expired tokens are not affected
+    async with app.test_request_context("/protected"):
+        assert decode_token(access_token, allow_expired=True)["identity"] == "username"
+
+
+@pytest.mark.asyncio
+async def test_revoked_token_is_remembered(app):
+    jwtM = get_jwt_manager(app)
+    app.config["JWT_BLACKLIST_ENABLED"] = True
+    blacklist_calls = []
+
+    @jwtM.token_in_blacklist_loader
+    def check_blacklisted(decoded_token):
+        blacklist_calls.append(decoded_token)
+        return True
+
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+
+    test_client = app.test_client()
+    for _ in range(2):
+        response = await test_client.get(
+            "/protected", headers=make_headers(access_token)
+        )
+        assert response.status_code == 401
+        assert await response.get_json() == {"msg": "Token has been revoked"}
+    assert len(blacklist_calls) == 1
+
+    # Revocation is not part of decoding a token
+    async with app.test_request_context("/protected"):
+        assert decode_token(access_token)["identity"] == "username"
+
+
+@pytest.mark.asyncio
+async def test_disabled_by_default():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    JWTManager(app)
+
+    async with app.test_request_context("/protected"):
+        assert get_jwt_manager(app)._get_negative_cache() is None
+
+
+def test_ttl_cache():
+    now = [0]
+    cache = TTLCache(maxsize=2, ttl=10, timer=lambda: now[0])
+    cache.set("foo", 1)
+    cache.set("bar", 2)
+    assert cache.get("foo") == 1
+
+    # bar is now the least recently used entry
+    cache.set("baz", 3)
+    assert "bar" not in cache
+    assert len(cache) == 2
+
+    now[0] = 10
+    assert cache.get("foo") is None
+    assert cache.pop("baz") is None
+
+    cache.set("foo", 1, ttl=100)
+    now[0] = 50
+    assert cache.pop("foo") == 1
+    assert len(cache) == 0
@@ -0,0 +1,172 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+from cryptography.hazmat.primitives.serialization import load_pem_public_key
+from quart import Quart, jsonify
+
+from quart_jwt_extended import JWTManager, jwt_required, create_access_token
+from quart_jwt_extended.offloading import LoopLagMonitor
+from tests.test_asymmetric_crypto import ED25519_PRIVATE, ED25519_PUBLIC, ED448_PUBLIC
+from tests.utils import get_jwt_manager, make_headers
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super(CountingExecutor, self).__init__(1)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super(CountingExecutor, self).submit(*args, **kwargs)
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    app.config["JWT_ALGORITHM"] = "EdDSA"
+    app.config["JWT_PRIVATE_KEY"] = ED25519_PRIVATE
+    app.config["JWT_PUBLIC_KEY"] = ED25519_PUBLIC
+    app.config["JWT_OFFLOAD_VERIFICATION"] = "thread"
+    JWTManager(app)
+
+    @app.route("/protected", methods=["GET"])
+    @jwt_required
+    async def protected():
+        return jsonify(foo="bar")
+
+    return app
+
+
+async def _lag(app, lag):
+    # Pretends the event loop has been lagging by this much
+    async with app.app_context():
+        offloader = get_jwt_manager(app)._get_verification_offloader()
+    offloader.monitor.interval = 60
+    offloader.monitor.start(asyncio.get_event_loop())
+    offloader.monitor.lag = lag
+    return offloader
+
+
+async def _get(app, token):
+    test_client = app.test_client()
+    response = await test_client.get("/protected", headers=make_headers(token))
+    return response.status_code, await response.get_json()
+
+
+@pytest.mark.asyncio
+async def test_offloaded_while_lagging(app):
+    executor = CountingExecutor()
+    get_jwt_manager(app).set_verification_executor(executor)
+    await _lag(app, 1.0)
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+        expired_token = create_access_token(
+            "username", expires_delta=timedelta(seconds=-60)
+        )
+
+    assert await _get(app, access_token) == (200, {"foo": "bar"})
+    assert executor.submitted == 1
+
+    assert await _get(app, expired_token) == (401, {"msg": "Token has expired"})
+    assert executor.submitted == 2
+
+    app.config["JWT_PUBLIC_KEY"] = ED448_PUBLIC
+    status_code, json_data = await _get(app, access_token)
+    assert (status_code, json_data) == (422, {"msg": "Signature verification failed"})
+    assert executor.submitted == 3
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_inline_below_threshold(app):
+    executor = CountingExecutor()
+    get_jwt_manager(app).set_verification_executor(executor)
+    await _lag(app, 0.001)
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+
+    assert await _get(app, access_token) == (200, {"foo": "bar"})
+    assert executor.submitted == 0
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hmac_never_offloaded(app):
+    app.config["JWT_ALGORITHM"] = "HS256"
+    executor = CountingExecutor()
+    get_jwt_manager(app).set_verification_executor(executor)
+    await _lag(app, 1.0)
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+
+    assert await _get(app, access_token) == (200, {"foo": "bar"})
+    assert executor.submitted == 0
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_pool(app):
+    app.config["JWT_OFFLOAD_VERIFICATION"] = "process"
+    app.config["JWT_OFFLOAD_MAX_WORKERS"] = 1
+    await app.startup()
+    offloader = await _lag(app, 1.0)
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+
+    assert await _get(app, access_token) == (200, {"foo": "bar"})
+    app.config["JWT_PUBLIC_KEY"] = ED448_PUBLIC
+    assert (await _get(app, access_token))[0] == 422
+
+    await app.shutdown()
+    assert get_jwt_manager(app)._verification_offloader is None
+    assert offloader.monitor.loop is None
+    with pytest.raises(RuntimeError):
+        offloader.executor.submit(time.time)
+
+
+@pytest.mark.asyncio
+async def test_process_pool_with_loaded_key(app):
+    app.config["JWT_OFFLOAD_VERIFICATION"] = "process"
+    app.config["JWT_OFFLOAD_MAX_WORKERS"] = 1
+    public_key = load_pem_public_key(ED25519_PUBLIC.encode())
+
+    @get_jwt_manager(app).decode_key_loader
+    def decode_key(claims, headers):
+        return public_key
+
+    await app.startup()
+    await _lag(app, 1.0)
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+
+    assert await _get(app, access_token) == (200, {"foo": "bar"})
+    await app.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_invalid_offload_setting(app):
+    app.config["JWT_OFFLOAD_VERIFICATION"] = "fiber"
+    async with app.app_context():
+        with pytest.raises(RuntimeError):
+            get_jwt_manager(app)._get_verification_offloader()
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor():
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start(asyncio.get_event_loop())
+    await asyncio.sleep(0.03)
+    assert monitor.lag < 0.02
+
+    # Block the event loop
+    time.sleep(0.05)
+    await asyncio.sleep(0.005)
+    assert monitor.lag >= 0.03
+
+    monitor.stop()
+    assert monitor.lag == 0.0
+    assert monitor.loop is None
@@ -0,0 +1,145 @@
+import pytest
+from quart import Quart, jsonify
+
+from quart_jwt_extended import JWTManager, jwt_required, create_access_token
+from quart_jwt_extended.profiling import get_auth_timings, server_timing_header
+from tests.utils import get_jwt_manager, make_headers
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    app.config["JWT_BLACKLIST_ENABLED"] = True
+    app.config["JWT_PROFILE_AUTH"] = True
+    jwt = JWTManager(app)
+
+    @jwt.token_in_blacklist_loader
+    def check_blacklisted(decoded_token):
+        return decoded_token["identity"] == "revoked"
+
+    @jwt.user_loader_callback_loader
+    def load_user(identity):
+        return identity
+
+    @app.route("/protected", methods=["GET"])
+    @jwt_required
+    async def protected():
+        return jsonify(stages=list(get_auth_timings()))
+
+    @app.route("/unprotected", methods=["GET"])
+    async def unprotected():
+        return jsonify(foo="bar")
+
+    return app
+
+
+def _stages(response):
+    header = response.headers["Server-Timing"]
+    stages = []
+    for metric in header.split(", "):
+        name, duration = metric.split(";")
+        assert float(duration[len("dur=") :]) >= 0
+        stages.append(name)
+    return stages
+
+
+@pytest.mark.asyncio
+async def test_profiled_request(app):
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+
+    test_client = app.test_client()
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 200
+    stages = [
+        "extract",
+        "parse",
+        "key_lookup",
+        "verify",
+        "blacklist",
+        "claims",
+        "user_load",
+    ]
+    assert (await response.get_json())["stages"] == stages
+    assert _stages(response) == ["jwt-" + s.replace("_", "-") for s in stages]
+
+
+@pytest.mark.asyncio
+async def test_profiled_failed_request(app):
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("revoked")
+
+    test_client = app.test_client()
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 401
+    assert _stages(response) == [
+        "jwt-extract",
+        "jwt-parse",
+        "jwt-key-lookup",
+        "jwt-verify",
+        "jwt-blacklist",
+    ]
+
+    response = await test_client.get("/protected")
+    assert response.status_code == 401
+    assert _stages(response) == ["jwt-extract"]
+
+
+@pytest.mark.asyncio
+async def test_unauthenticated_request_not_profiled(app):
+    test_client = app.test_client()
+    response = await test_client.get("/unprotected")
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_profiling_disabled(app):
+    app.config["JWT_PROFILE_AUTH"] = False
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+
+    test_client = app.test_client()
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 200
+    assert (await response.get_json())["stages"] == []
+    assert "Server-Timing" not in response.headers
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("is_async", [True, False])
+async def test_auth_profile_loader(app, is_async):
+    app.config["JWT_PROFILE_AUTH_HEADER"] = False
+    jwt = get_jwt_manager(app)
+    profiles = []
+
+    if is_async:
+
+        @jwt.auth_profile_loader
+        async def report(timings):
+            profiles.append(timings)
+
+    else:
+
+        @jwt.auth_profile_loader
+        def report(timings):
+            profiles.append(timings)
+
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+
+    test_client = app.test_client()
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+    assert len(profiles) == 1
+    assert list(profiles[0]) == (await response.get_json())["stages"]
+    assert all(seconds >= 0 for seconds in profiles[0].values())
+
+
+def test_server_timing_header():
+    timings = {"extract": 0.0000125, "key_lookup": 0.002}
+    assert server_timing_header(timings) == (
+        "jwt-extract;dur=0.013, jwt-key-lookup;dur=2.000"
+    )
@@ -0,0 +1,125 @@
+import asyncio
+import pytest
+from quart import Quart
+
+from quart_jwt_extended import JWTManager
+from quart_jwt_extended.config import config
+from quart_jwt_extended.revocation import MemoryRevocationStore
+from quart_jwt_extended.rotation import MemoryRefreshTokenFamilyStore
+from tests.utils import get_jwt_manager
+
+
+class RecordingStore(MemoryRevocationStore):
+    def __init__(self, timer):
+        super(RecordingStore, self).__init__(timer=timer)
+        self.limits = []
+
+    async def prune_expired(self, limit=None):
+        self.limits.append(limit)
+        return await super(RecordingStore, self).prune_expired(limit)
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    app.config["JWT_REVOCATION_PRUNE_INTERVAL"] = 0.01
+    app.config["JWT_REVOCATION_PRUNE_JITTER"] = 0
+    JWTManager(app)
+    return app
+
+
+async def _revoke_expired(store, count):
+    await store.revoke_many([("expired-{}".format(i), 500) for i in range(count)])
+    await store.revoke("valid", 2000)
+
+
+@pytest.mark.asyncio
+async def test_prune_in_batches(app):
+    app.config["JWT_REVOCATION_PRUNE_BATCH_SIZE"] = 2
+    jwt = get_jwt_manager(app)
+    store = RecordingStore(timer=lambda: 1000)
+    await _revoke_expired(store, 5)
+    jwt.set_revocation_store(store)
+    family_store = MemoryRefreshTokenFamilyStore(timer=lambda: 1000)
+    await family_store.use("family", 0, 500)
+    jwt.set_refresh_token_family_store(family_store)
+
+    async with app.app_context():
+        assert await jwt.prune_expired_revocations() == 6
+    assert store.limits == [2, 2, 2]
+    assert len(store) == 1
+    assert len(family_store) == 0
+
+
+@pytest.mark.asyncio
+async def test_nothing_to_prune(app):
+    async with app.app_context():
+        assert await get_jwt_manager(app).prune_expired_revocations() == 0
+
+
+@pytest.mark.asyncio
+async def test_prune_while_serving(app):
+    jwt = get_jwt_manager(app)
+    store = RecordingStore(timer=lambda: 1000)
+    await _revoke_expired(store, 3)
+    jwt.set_revocation_store(store)
+
+    await app.startup()
+    task = jwt._prune_tasks[app]
+    await asyncio.sleep(0.05)
+    assert len(store) == 1
+    assert len(store.limits) > 1
+
+    await app.shutdown()
+    assert task.cancelled()
+    assert jwt._prune_tasks == {}
+
+
+@pytest.mark.asyncio
+async def test_pruning_disabled(app):
+    app.config["JWT_REVOCATION_PRUNE_INTERVAL"] = None
+    get_jwt_manager(app).set_revocation_store(MemoryRevocationStore())
+    await app.startup()
+    assert get_jwt_manager(app)._prune_tasks == {}
+    await app.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_nothing_to_prune_while_serving(app):
+    await app.startup()
+    assert get_jwt_manager(app)._prune_tasks == {}
+    await app.shutdown()
+
+    # The refresh token family store is only created once it is first used
+    app.config["JWT_REFRESH_TOKEN_ROTATION"] = True
+    await app.startup()
+    assert app in get_jwt_manager(app)._prune_tasks
+    await app.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pruning_errors_are_logged(app, caplog):
+    class BrokenStore(MemoryRevocationStore):
+        async def prune_expired(self, limit=None):
+            raise ConnectionError("store is down")
+
+    jwt = get_jwt_manager(app)
+    jwt.set_revocation_store(BrokenStore())
+    await app.startup()
+    await asyncio.sleep(0.05)
+    task = jwt._prune_tasks[app]
+    assert not task.done()
+    await app.shutdown()
+    errors = [r for r in caplog.records if r.exc_info]
+    assert len(errors) > 1
+    assert all("store is down" in str(r.exc_info[1]) for r in errors)
+
+
+@pytest.mark.parametrize("jitter", [-0.1, 1.5])
+@pytest.mark.asyncio
+async def test_invalid_jitter(app, jitter):
+    app.config["JWT_REVOCATION_PRUNE_JITTER"] = jitter
+    async with app.app_context():
+        with pytest.raises(RuntimeError):
+            config.revocation_prune_jitter
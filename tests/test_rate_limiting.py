@@ -0,0 +1,169 @@
+import sys
+import uuid
+from datetime import timedelta
+
+import pytest
+from quart import Quart, jsonify
+
+from quart_jwt_extended import (
+    JWTManager,
+    jwt_required,
+    jwt_refresh_token_required,
+    create_access_token,
+    create_refresh_token,
+)
+from quart_jwt_extended.clock import ManualClock
+from quart_jwt_extended.rate_limiting import (
+    TokenBucketLimiter,
+    SharedMemoryTokenBucketLimiter,
+)
+from tests.utils import get_jwt_manager, make_headers
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    app.config["JWT_FAILED_AUTH_LIMIT"] = 3
+    JWTManager(app)
+
+    @app.route("/protected", methods=["GET"])
+    @jwt_required
+    async def protected():
+        return jsonify(foo="bar")
+
+    @app.route("/refresh", methods=["POST"])
+    @jwt_refresh_token_required
+    async def refresh():
+        return jsonify(foo="bar")
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_limited_after_failed_attempts(app):
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+    bad_token = access_token[:-4] + "abcd"
+
+    test_client = app.test_client()
+    for _ in range(3):
+        response = await test_client.get("/protected", headers=make_headers(bad_token))
+        assert response.status_code == 422
+
+    response = await test_client.get("/protected", headers=make_headers(bad_token))
+    assert response.status_code == 429
+    assert await response.get_json() == {
+        "msg": "Too many failed authentication attempts"
+    }
+
+    # Even a valid token is turned away until the bucket drains
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 429
+
+
+@pytest.mark.asyncio
+async def test_valid_tokens_are_not_counted(app):
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+
+    test_client = app.test_client()
+    for _ in range(5):
+        response = await test_client.get(
+            "/protected", headers=make_headers(access_token)
+        )
+        assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_expired_tokens_are_not_counted(app):
+    clock = ManualClock(1500000000)
+    get_jwt_manager(app).set_clock(clock)
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+        refresh_token = create_refresh_token("username")
+    clock.advance(timedelta(minutes=20))
+
+    test_client = app.test_client()
+    for _ in range(5):
+        response = await test_client.get(
+            "/protected", headers=make_headers(access_token)
+        )
+        assert response.status_code == 401
+        assert await response.get_json() == {"msg": "Token has expired"}
+
+    response = await test_client.post("/refresh", headers=make_headers(refresh_token))
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_custom_limit_key_and_callback(app):
+    jwtM = get_jwt_manager(app)
+    keys = []
+
+    @jwtM.failed_auth_limit_key_loader
+    def limit_key(encoded_token):
+        keys.append(encoded_token)
+        return encoded_token
+
+    @jwtM.failed_auth_rate_limited_loader
+    def rate_limited():
+        return jsonify(baz="boo"), 418
+
+    test_client = app.test_client()
+    for _ in range(3):
+        response = await test_client.get("/protected", headers=make_headers("a.b.c"))
+        assert response.status_code == 422
+
+    response = await test_client.get("/protected", headers=make_headers("a.b.c"))
+    assert response.status_code == 418
+    assert await response.get_json() == {"baz": "boo"}
+
+    # Other clients are unaffected
+    response = await test_client.get("/protected", headers=make_headers("d.e.f"))
+    assert response.status_code == 422
+    assert keys[-1] == "d.e.f"
+
+
+@pytest.mark.asyncio
+async def test_disabled_by_default():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    JWTManager(app)
+
+    async with app.test_request_context("/protected"):
+        assert get_jwt_manager(app)._get_failed_auth_limiter() is None
+
+
+def test_token_bucket_drains(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("time.monotonic", lambda: now[0])
+
+    limiter = TokenBucketLimiter(limit=2, period=10, max_clients=2)
+    limiter.record_failure("foo")
+    assert not limiter.is_limited("foo")
+    limiter.record_failure("foo")
+    assert limiter.is_limited("foo")
+
+    now[0] += 5
+    assert not limiter.is_limited("foo")
+
+    # Least recently failing clients are forgotten first
+    limiter.record_failure("bar")
+    limiter.record_failure("baz")
+    assert "foo" not in limiter._buckets
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="requires python 3.8")
+def test_shared_memory_limiter():
+    name = "jwt-test-{}".format(uuid.uuid4().hex[:8])
+    limiter = SharedMemoryTokenBucketLimiter(name, limit=2, period=60, slots=16)
+    other_worker = SharedMemoryTokenBucketLimiter(name, limit=2, period=60, slots=16)
+    try:
+        limiter.record_failure("foo")
+        other_worker.record_failure("foo")
+        assert limiter.is_limited("foo")
+        assert other_worker.is_limited("foo")
+    finally:
+        other_worker.close()
+        limiter.close()
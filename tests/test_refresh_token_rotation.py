@@ -0,0 +1,202 @@
+import pytest
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+from quart import Quart, jsonify
+
+from quart_jwt_extended import (
+    JWTManager,
+    jwt_refresh_token_required,
+    create_refresh_token,
+    decode_token,
+    get_jwt_identity,
+    get_raw_jwt,
+    revoke_refresh_token_family,
+)
+from quart_jwt_extended.rotation import MemoryRefreshTokenFamilyStore, REVOKED
+from tests.utils import get_jwt_manager, make_headers
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    app.config["JWT_REFRESH_TOKEN_ROTATION"] = True
+    JWTManager(app)
+
+    @app.route("/refresh", methods=["POST"])
+    @jwt_refresh_token_required
+    async def refresh():
+        return jsonify(refresh_token=create_refresh_token(get_jwt_identity()))
+
+    @app.route("/logout", methods=["DELETE"])
+    @jwt_refresh_token_required
+    async def logout():
+        await revoke_refresh_token_family(get_raw_jwt())
+        return jsonify(foo="bar")
+
+    return app
+
+
+async def _refresh(test_client, refresh_token):
+    response = await test_client.post("/refresh", headers=make_headers(refresh_token))
+    json_data = await response.get_json()
+    return response.status_code, json_data.get("refresh_token", json_data)
+
+
+@pytest.mark.asyncio
+async def test_rotation(app):
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        first_token = create_refresh_token("username")
+        first = decode_token(first_token)
+    assert first["gen"] == 0
+
+    status_code, second_token = await _refresh(test_client, first_token)
+    assert status_code == 200
+    async with app.test_request_context("/protected"):
+        second = decode_token(second_token)
+    assert second["fam"] == first["fam"]
+    assert second["gen"] == 1
+
+    status_code, third_token = await _refresh(test_client, second_token)
+    assert status_code == 200
+
+    # Refresh tokens of another login are in a different family
+    async with app.test_request_context("/protected"):
+        other_token = create_refresh_token("username")
+        assert decode_token(other_token)["fam"] != first["fam"]
+    assert (await _refresh(test_client, other_token))[0] == 200
+    assert len(get_jwt_manager(app)._get_refresh_token_family_store()) == 2
+
+
+@pytest.mark.asyncio
+async def test_reuse_revokes_family(app):
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        first_token = create_refresh_token("username")
+        other_token = create_refresh_token("username")
+
+    status_code, second_token = await _refresh(test_client, first_token)
+    assert status_code == 200
+
+    # The first token was stolen and is used again
+    status_code, json_data = await _refresh(test_client, first_token)
+    assert status_code == 401
+    assert json_data == {"msg": "Token has been revoked"}
+
+    # Which revokes the token its legitimate owner rotated to
+    status_code, json_data = await _refresh(test_client, second_token)
+    assert status_code == 401
+    assert json_data == {"msg": "Token has been revoked"}
+
+    # But not tokens of other families
+    assert (await _refresh(test_client, other_token))[0] == 200
+
+
+@pytest.mark.asyncio
+async def test_revoke_family(app):
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        first_token = create_refresh_token("username")
+
+    status_code, second_token = await _refresh(test_client, first_token)
+    status_code, third_token = await _refresh(test_client, second_token)
+    response = await test_client.delete("/logout", headers=make_headers(third_token))
+    assert response.status_code == 200
+
+    for refresh_token in (first_token, second_token, third_token):
+        status_code, json_data = await _refresh(test_client, refresh_token)
+        assert status_code == 401
+
+
+@pytest.mark.parametrize(
+    "refresh_expires", [timedelta(days=1), relativedelta(days=1), False]
+)
+@pytest.mark.asyncio
+async def test_family_expiry(app, refresh_expires):
+    app.config["JWT_REFRESH_TOKEN_EXPIRES"] = refresh_expires
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        refresh_token = create_refresh_token("username")
+        family = decode_token(refresh_token)["fam"]
+
+    status_code, refresh_token = await _refresh(test_client, refresh_token)
+    assert status_code == 200
+    store = get_jwt_manager(app)._get_refresh_token_family_store()
+    generation, expires_at = store._families[family]
+    assert generation == 1
+    if refresh_expires:
+        async with app.test_request_context("/protected"):
+            exp = decode_token(refresh_token)["exp"]
+        assert exp - 5 <= expires_at <= exp + 5
+    else:
+        assert expires_at is None
+
+
+@pytest.mark.asyncio
+async def test_tokens_without_family(app):
+    app.config["JWT_REFRESH_TOKEN_ROTATION"] = False
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        refresh_token = create_refresh_token("username")
+        assert "fam" not in decode_token(refresh_token)
+        await revoke_refresh_token_family(decode_token(refresh_token))
+
+    # Tokens created before rotation was enabled can still be used
+    app.config["JWT_REFRESH_TOKEN_ROTATION"] = True
+    for _ in range(2):
+        status_code, new_token = await _refresh(test_client, refresh_token)
+        assert status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_custom_store(app):
+    calls = []
+
+    class RecordingStore(MemoryRefreshTokenFamilyStore):
+        async def use(self, family, generation, expires_at):
+            calls.append(generation)
+            return await super(RecordingStore, self).use(family, generation, expires_at)
+
+    get_jwt_manager(app).set_refresh_token_family_store(RecordingStore())
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        refresh_token = create_refresh_token("username")
+
+    status_code, refresh_token = await _refresh(test_client, refresh_token)
+    status_code, refresh_token = await _refresh(test_client, refresh_token)
+    assert calls == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_memory_store():
+    now = 1000
+    store = MemoryRefreshTokenFamilyStore(timer=lambda: now)
+    assert await store.use("a", 0, 2000)
+    assert await store.use("a", 1, 1500)
+    assert await store.use("b", 0, None)
+    assert not await store.use("a", 1, 1500)
+    assert store._families["a"] == (REVOKED, 2000)
+    assert not await store.use("a", 2, 1500)
+
+    await store.revoke("c", 1200)
+    assert not await store.use("c", 0, 1200)
+    assert len(store) == 3
+
+    now = 1200
+    assert await store.prune_expired() == 1
+    now = 2000
+    assert await store.prune_expired() == 1
+    assert len(store) == 1
+    assert await store.use("a", 5, 3000)
+
+
+@pytest.mark.asyncio
+async def test_memory_store_prunes_as_it_grows():
+    now = 1000
+    store = MemoryRefreshTokenFamilyStore(timer=lambda: now)
+    for family in range(1023):
+        assert await store.use(family, 0, 1000)
+    assert len(store) == 1023
+    assert await store.use("last", 0, 2000)
+    assert len(store) == 1
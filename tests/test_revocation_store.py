@@ -0,0 +1,262 @@
+import asyncio
+import pytest
+from quart import Quart, jsonify
+
+from quart_jwt_extended import (
+    JWTManager,
+    jwt_required,
+    jwt_refresh_token_required,
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    get_raw_jwt,
+    revoke_token,
+)
+from quart_jwt_extended.revocation import (
+    MemoryRevocationStore,
+    RedisRevocationStore,
+    SQLiteRevocationStore,
+    _BatchedLookups,
+)
+from tests.utils import get_jwt_manager, make_headers
+
+
+class FakeRedis(object):
+    # Just enough of the redis.asyncio.Redis API for RedisRevocationStore
+
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+
+    async def get(self, key):
+        self.calls.append("get")
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        self.calls.append("mget")
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline(object):
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value, ex))
+
+    async def execute(self):
+        self.client.calls.append("pipeline")
+        for key, value, ex in self.commands:
+            self.client.data[key] = (value, ex)
+
+
+class RecordingStore(MemoryRevocationStore):
+    def __init__(self):
+        super(RecordingStore, self).__init__()
+        self.lookups = []
+
+    async def is_revoked_many(self, jtis):
+        self.lookups.append(list(jtis))
+        return await super(RecordingStore, self).is_revoked_many(jtis)
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    app.config["JWT_BLACKLIST_ENABLED"] = True
+    JWTManager(app)
+
+    @app.route("/protected", methods=["GET"])
+    @jwt_required
+    async def protected():
+        return jsonify(foo="bar")
+
+    @app.route("/refresh_protected", methods=["GET"])
+    @jwt_refresh_token_required
+    async def refresh_protected():
+        return jsonify(foo="bar")
+
+    @app.route("/logout", methods=["DELETE"])
+    @jwt_required
+    async def logout():
+        await revoke_token(get_raw_jwt())
+        return jsonify(foo="bar")
+
+    return app
+
+
+@pytest.mark.parametrize(
+    "store",
+    [
+        MemoryRevocationStore(),
+        SQLiteRevocationStore(":memory:"),
+        RedisRevocationStore(FakeRedis()),
+    ],
+)
+@pytest.mark.asyncio
+async def test_revoke_token(app, store):
+    get_jwt_manager(app).set_revocation_store(store)
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+        other_token = create_access_token("username")
+        refresh_token = create_refresh_token("username")
+
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 200
+    response = await test_client.delete("/logout", headers=make_headers(access_token))
+    assert response.status_code == 200
+
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 401
+    assert await response.get_json() == {"msg": "Token has been revoked"}
+
+    response = await test_client.get("/protected", headers=make_headers(other_token))
+    assert response.status_code == 200
+    url = "/refresh_protected"
+    response = await test_client.get(url, headers=make_headers(refresh_token))
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_are_batched(app):
+    store = RecordingStore()
+    get_jwt_manager(app).set_revocation_store(store)
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        tokens = [create_access_token("username") for _ in range(3)]
+        revoked_token = create_access_token("username")
+        await revoke_token(decode_token(revoked_token))
+
+    headers = [make_headers(token) for token in tokens + tokens[:1] + [revoked_token]]
+    responses = await asyncio.gather(
+        *[test_client.get("/protected", headers=h) for h in headers]
+    )
+    assert [r.status_code for r in responses] == [200, 200, 200, 200, 401]
+    assert len(store.lookups) == 1
+    assert len(store.lookups[0]) == 4
+
+
+@pytest.mark.asyncio
+async def test_batched_lookups_survive_cancelled_callers():
+    event = asyncio.Event()
+
+    class SlowStore(MemoryRevocationStore):
+        async def is_revoked_many(self, jtis):
+            await event.wait()
+            return await super(SlowStore, self).is_revoked_many(jtis)
+
+    lookups = _BatchedLookups(SlowStore())
+    first = asyncio.ensure_future(lookups.is_revoked("a"))
+    second = asyncio.ensure_future(lookups.is_revoked("a"))
+    await asyncio.sleep(0)
+    first.cancel()
+    event.set()
+    assert await second is False
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.asyncio
+async def test_lookup_errors_are_raised(app):
+    class BrokenStore(MemoryRevocationStore):
+        async def is_revoked_many(self, jtis):
+            raise ConnectionError("store is down")
+
+    get_jwt_manager(app).set_revocation_store(BrokenStore())
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+
+    test_client = app.test_client()
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 500
+
+
+@pytest.mark.asyncio
+async def test_async_blacklist_callback(app):
+    jwt = get_jwt_manager(app)
+
+    @jwt.token_in_blacklist_loader
+    async def check_if_token_in_blacklist(decoded_token):
+        await asyncio.sleep(0)
+        return decoded_token["type"] == "refresh"
+
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+        refresh_token = create_refresh_token("username")
+
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 200
+    url = "/refresh_protected"
+    response = await test_client.get(url, headers=make_headers(refresh_token))
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_revoke_token_without_store(app):
+    async with app.test_request_context("/protected"):
+        with pytest.raises(RuntimeError):
+            await revoke_token({"jti": "foo", "exp": None})
+
+
+@pytest.mark.asyncio
+async def test_memory_store():
+    now = 1000
+    store = MemoryRevocationStore(timer=lambda: now)
+    await store.revoke("a", 1500)
+    await store.revoke_many([("b", 2000), ("c", None)])
+    assert await store.is_revoked("a")
+    assert await store.is_revoked_many(["a", "d", "c"]) == [True, False, True]
+
+    now = 2000
+    assert await store.prune_expired(limit=1) == 1
+    assert await store.prune_expired() == 1
+    assert len(store) == 1
+    assert await store.is_revoked("c")
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store(tmpdir):
+    now = 1000
+    path = str(tmpdir.join("revoked.db"))
+    store = SQLiteRevocationStore(path, timer=lambda: now)
+    await store.revoke("a", 1500)
+    await store.revoke_many([("b", 2000), ("c", None), ("a", 1800)])
+    assert await store.is_revoked("a")
+    assert not await store.is_revoked("d")
+
+    jtis = ["jti-{}".format(i) for i in range(1200)] + ["b"]
+    assert await store.is_revoked_many(jtis) == [False] * 1200 + [True]
+
+    now = 2000
+    assert await store.prune_expired(limit=1) == 1
+    assert await store.prune_expired() == 1
+    assert await store.prune_expired() == 0
+    store.close()
+
+    # Revoked tokens are persisted
+    store = SQLiteRevocationStore(path, timer=lambda: now)
+    assert await store.is_revoked_many(["a", "b", "c"]) == [False, False, True]
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_store():
+    client = FakeRedis()
+    store = RedisRevocationStore(client, timer=lambda: 1000)
+    await store.revoke_many([("a", 1500), ("b", None), ("c", 999)])
+    assert client.data == {
+        "jwt:revoked:a": (1, 500),
+        "jwt:revoked:b": (1, None),
+        "jwt:revoked:c": (1, 1),
+    }
+    assert await store.is_revoked("a")
+    assert await store.is_revoked_many(["a", "d"]) == [True, False]
+    assert client.calls == ["pipeline", "get", "mget"]
+    assert await store.prune_expired() == 0
@@ -0,0 +1,193 @@
+from datetime import timedelta
+
+import pytest
+from quart import Quart, jsonify
+
+from quart_jwt_extended import (
+    JWTManager,
+    create_access_token,
+    decode_token,
+    get_jwt_identity,
+    get_unverified_jwt_headers,
+    jwt_optional,
+    jwt_required,
+    revoke_identity_tokens,
+    unset_jwt_cookies,
+)
+from quart_jwt_extended.clock import ManualClock
+from tests.utils import get_jwt_manager, make_headers
+
+RENEWED_HEADER = "X-Renewed-Access-Token"
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    app.config["JWT_TOKEN_LOCATION"] = ["headers", "cookies"]
+    app.config["JWT_COOKIE_CSRF_PROTECT"] = False
+    app.config["JWT_SLIDING_EXPIRATION_WINDOW"] = timedelta(minutes=5)
+    JWTManager(app)
+
+    @app.route("/protected", methods=["GET"])
+    @jwt_required
+    async def protected():
+        return jsonify(foo="bar")
+
+    @app.route("/protected", methods=["POST"])
+    @jwt_required
+    async def post_protected():
+        return jsonify(foo="bar")
+
+    @app.route("/optional", methods=["GET"])
+    @jwt_optional
+    async def optional():
+        return jsonify(identity=get_jwt_identity())
+
+    @app.route("/failing", methods=["GET"])
+    @jwt_required
+    async def failing():
+        return jsonify(foo="bar"), 400
+
+    @app.route("/logout", methods=["GET"])
+    @jwt_required
+    async def logout():
+        response = jsonify(foo="bar")
+        unset_jwt_cookies(response)
+        return response
+
+    @app.route("/revoke", methods=["GET"])
+    @jwt_required
+    async def revoke():
+        revoke_identity_tokens(get_jwt_identity())
+        return jsonify(foo="bar")
+
+    return app
+
+
+@pytest.fixture(scope="function")
+def clock(app):
+    clock = ManualClock(1500000000)
+    get_jwt_manager(app).set_clock(clock)
+    return clock
+
+
+async def _access_token(app, **kwargs):
+    async with app.test_request_context("/protected"):
+        return create_access_token("username", **kwargs)
+
+
+async def _decode(app, token):
+    async with app.test_request_context("/protected"):
+        return decode_token(token)
+
+
+@pytest.mark.asyncio
+async def test_renewed_in_header(app, clock):
+    access_token = await _access_token(
+        app, fresh=True, user_claims={"role": "admin"}, headers={"kid": "key-1"}
+    )
+    test_client = app.test_client()
+
+    clock.advance(timedelta(minutes=9))
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 200
+    assert RENEWED_HEADER not in response.headers
+
+    clock.advance(timedelta(minutes=2))
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 200
+    renewed_token = response.headers[RENEWED_HEADER]
+    decoded = await _decode(app, renewed_token)
+    assert decoded["identity"] == "username"
+    assert decoded["user_claims"] == {"role": "admin"}
+    assert decoded["fresh"] is False
+    assert decoded["exp"] == clock.now() + 15 * 60
+    assert get_unverified_jwt_headers(renewed_token)["kid"] == "key-1"
+
+    # Only renewed once
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 200
+    assert RENEWED_HEADER not in response.headers
+
+    response = await test_client.get("/optional", headers=make_headers(renewed_token))
+    assert await response.get_json() == {"identity": "username"}
+    assert RENEWED_HEADER not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_renewed_in_cookies(app, clock):
+    access_token = await _access_token(app)
+    test_client = app.test_client()
+    test_client.set_cookie("localhost", "access_token_cookie", access_token)
+
+    clock.advance(timedelta(minutes=12))
+    response = await test_client.get("/optional")
+    assert await response.get_json() == {"identity": "username"}
+    assert RENEWED_HEADER not in response.headers
+    cookies = response.headers.getlist("Set-Cookie")
+    assert len(cookies) == 1
+    renewed_token = cookies[0].split(";")[0].split("=", 1)[1]
+    assert (await _decode(app, renewed_token))["exp"] == clock.now() + 15 * 60
+
+
+@pytest.mark.asyncio
+async def test_renewed_cookie_keeps_csrf_value(app, clock):
+    app.config["JWT_COOKIE_CSRF_PROTECT"] = True
+    app.config["JWT_CSRF_IN_COOKIES"] = False
+    access_token = await _access_token(app)
+    csrf_value = (await _decode(app, access_token))["csrf"]
+    test_client = app.test_client()
+    test_client.set_cookie("localhost", "access_token_cookie", access_token)
+
+    clock.advance(timedelta(minutes=12))
+    response = await test_client.get("/protected")
+    cookies = response.headers.getlist("Set-Cookie")
+    assert len(cookies) == 1
+    renewed_token = cookies[0].split(";")[0].split("=", 1)[1]
+    assert renewed_token != access_token
+    assert (await _decode(app, renewed_token))["csrf"] == csrf_value
+
+    # The client keeps sending the csrf value it knows
+    test_client.set_cookie("localhost", "access_token_cookie", renewed_token)
+    response = await test_client.post(
+        "/protected", headers={"X-CSRF-TOKEN": csrf_value}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_not_renewed(app, clock):
+    test_client = app.test_client()
+    access_token = await _access_token(app)
+    clock.advance(timedelta(minutes=12))
+
+    # The response is an error
+    response = await test_client.get("/failing", headers=make_headers(access_token))
+    assert response.status_code == 400
+    assert RENEWED_HEADER not in response.headers
+
+    # The view logged the user out
+    test_client.set_cookie("localhost", "access_token_cookie", access_token)
+    response = await test_client.get("/logout")
+    cookies = response.headers.getlist("Set-Cookie")
+    assert [c.split(";")[0] for c in cookies] == [
+        "access_token_cookie=",
+        "refresh_token_cookie=",
+    ]
+
+    # The token was revoked by the view
+    response = await test_client.get("/revoke", headers=make_headers(access_token))
+    assert response.status_code == 200
+    assert RENEWED_HEADER not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_disabled_by_default(app, clock):
+    app.config["JWT_SLIDING_EXPIRATION_WINDOW"] = None
+    access_token = await _access_token(app)
+    clock.advance(timedelta(minutes=14))
+    test_client = app.test_client()
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 200
+    assert RENEWED_HEADER not in response.headers
@@ -0,0 +1,119 @@
+from contextlib import contextmanager
+
+import pytest
+from quart import Quart, jsonify
+
+from quart_jwt_extended import JWTManager, jwt_required, create_access_token
+from quart_jwt_extended.tracing import span
+from tests.utils import get_jwt_manager, make_headers
+
+
+class RecordingTracer(object):
+    def __init__(self):
+        self.spans = []
+
+    @contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        recorded = (name, dict(attributes))
+        self.spans.append(recorded)
+
+        class Span(object):
+            def set_attribute(self, key, value):
+                recorded[1][key] = value
+
+        yield Span()
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = Quart(__name__)
+    app.config["JWT_SECRET_KEY"] = "foobarbaz"
+    app.config["JWT_BLACKLIST_ENABLED"] = True
+    app.config["JWT_NEGATIVE_CACHE_SIZE"] = 16
+    jwt = JWTManager(app)
+
+    @jwt.token_in_blacklist_loader
+    def check_blacklisted(decoded_token):
+        return False
+
+    @jwt.user_loader_callback_loader
+    def load_user(identity):
+        return identity
+
+    @app.route("/protected", methods=["GET"])
+    @jwt_required
+    async def protected():
+        return jsonify(foo="bar")
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_spans(app):
+    tracer = RecordingTracer()
+    get_jwt_manager(app).set_tracer(tracer)
+
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username", headers={"kid": "foo"})
+    assert tracer.spans == [
+        ("jwt.sign", {"jwt.type": "access", "jwt.algorithm": "HS256"})
+    ]
+
+    tracer.spans.clear()
+    test_client = app.test_client()
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 200
+    assert tracer.spans == [
+        ("jwt.authenticate", {"jwt.request_type": "access"}),
+        ("jwt.extract", {"jwt.location": "headers"}),
+        ("jwt.negative_cache", {"jwt.cache": "miss"}),
+        ("jwt.decode_key", {"jwt.algorithm": "HS256", "jwt.kid": "foo"}),
+        ("jwt.verify", {"jwt.algorithm": "HS256", "jwt.kid": "foo"}),
+        ("jwt.blacklist_check", {"jwt.revoked": False}),
+        ("jwt.verify_claims", {}),
+        ("jwt.load_user", {}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_negative_cache_hit(app):
+    tracer = RecordingTracer()
+    get_jwt_manager(app).set_tracer(tracer)
+
+    test_client = app.test_client()
+    for _ in range(2):
+        response = await test_client.get("/protected", headers=make_headers("a.b.c"))
+        assert response.status_code == 422
+    assert ("jwt.negative_cache", {"jwt.cache": "hit"}) in tracer.spans
+
+
+def test_no_tracer():
+    with span(None, "jwt.verify", algorithm="HS256") as noop_span:
+        noop_span.set_attribute("jwt.kid", "foo")
+
+
+@pytest.mark.asyncio
+async def test_opentelemetry_tracer(app):
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    get_jwt_manager(app).set_tracer(provider.get_tracer(__name__))
+
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+    test_client = app.test_client()
+    response = await test_client.get("/protected", headers=make_headers(access_token))
+    assert response.status_code == 200
+
+    spans = {s.name: s for s in exporter.get_finished_spans()}
+    assert spans["jwt.verify"].attributes["jwt.algorithm"] == "HS256"
+    assert spans["jwt.verify"].parent.span_id == (
+        spans["jwt.authenticate"].context.span_id
+    )
@@ -7,6 +7,7 @@ from quart_jwt_extended import (
     current_user,
     get_current_user,
     create_access_token,
+    verify_jwt_in_request,
 )
 from tests.utils import get_jwt_manager, make_headers
 
@@ -27,6 +28,12 @@ def app():
     async def get_user2():
         return jsonify(foo=current_user["username"])
 
+    @app.route("/get_user3", methods=["GET"])
+    @jwt_required
+    async def get_user3():
+        await verify_jwt_in_request()
+        return jsonify(foo=current_user["username"])
+
     return app
 
 
@@ -86,3 +93,110 @@ async def test_custom_user_loader_errors(app, url):
     response = await test_client.get(url, headers=make_headers(access_token))
     assert response.status_code == 201
     assert await response.get_json() == {"foo": "bar"}
+
+
+@pytest.fixture(scope="function")
+def loaded_users(app):
+    loaded_users = []
+
+    @get_jwt_manager(app).user_loader_callback_loader
+    def user_load_callback(identity):
+        loaded_users.append(identity)
+        return {"username": identity}
+
+    return loaded_users
+
+
+@pytest.mark.asyncio
+async def test_user_loaded_once_per_request(app, loaded_users):
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+
+    response = await test_client.get("/get_user3", headers=make_headers(access_token))
+    assert response.status_code == 200
+    assert await response.get_json() == {"foo": "username"}
+    assert loaded_users == ["username"]
+
+    # Without JWT_USER_LOADER_CACHE_SIZE, users are not cached across requests
+    response = await test_client.get("/get_user1", headers=make_headers(access_token))
+    assert response.status_code == 200
+    assert loaded_users == ["username", "username"]
+
+
+@pytest.mark.asyncio
+async def test_user_cache(app, loaded_users):
+    app.config["JWT_USER_LOADER_CACHE_SIZE"] = 2
+    jwt = get_jwt_manager(app)
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        tokens = {name: create_access_token(name) for name in ("foo", "bar", "baz")}
+
+    for name in ("foo", "bar", "foo", "bar"):
+        response = await test_client.get(
+            "/get_user1", headers=make_headers(tokens[name])
+        )
+        assert await response.get_json() == {"foo": name}
+    assert loaded_users == ["foo", "bar"]
+
+    # The least recently used user is evicted once the cache is full
+    for name in ("baz", "bar", "foo"):
+        await test_client.get("/get_user1", headers=make_headers(tokens[name]))
+    assert loaded_users == ["foo", "bar", "baz", "foo"]
+
+    jwt.invalidate_cached_user("foo")
+    jwt.invalidate_cached_user("not cached")
+    await test_client.get("/get_user1", headers=make_headers(tokens["foo"]))
+    await test_client.get("/get_user1", headers=make_headers(tokens["bar"]))
+    assert loaded_users == ["foo", "bar", "baz", "foo", "foo"]
+
+    jwt.clear_cached_users()
+    await test_client.get("/get_user1", headers=make_headers(tokens["foo"]))
+    assert loaded_users == ["foo", "bar", "baz", "foo", "foo", "foo"]
+
+
+@pytest.mark.asyncio
+async def test_user_cache_expires(app, loaded_users):
+    app.config["JWT_USER_LOADER_CACHE_SIZE"] = 10
+    jwt = get_jwt_manager(app)
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+        jwt._get_user_cache().timer = lambda: now
+
+    now = 0
+    await test_client.get("/get_user1", headers=make_headers(access_token))
+    now = 59
+    await test_client.get("/get_user1", headers=make_headers(access_token))
+    assert loaded_users == ["username"]
+    now = 60
+    await test_client.get("/get_user1", headers=make_headers(access_token))
+    assert loaded_users == ["username", "username"]
+
+
+@pytest.mark.asyncio
+async def test_user_cache_skips_failures_and_unhashable_identities(app):
+    app.config["JWT_USER_LOADER_CACHE_SIZE"] = 10
+    jwt = get_jwt_manager(app)
+    users = {}
+
+    @jwt.user_loader_callback_loader
+    def user_load_callback(identity):
+        return users.get(str(identity))
+
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+        dict_token = create_access_token({"username": "username"})
+
+    response = await test_client.get("/get_user1", headers=make_headers(access_token))
+    assert response.status_code == 401
+
+    users["username"] = {"username": "username"}
+    users[str({"username": "username"})] = {"username": "dict"}
+    response = await test_client.get("/get_user1", headers=make_headers(access_token))
+    assert response.status_code == 200
+
+    response = await test_client.get("/get_user1", headers=make_headers(dict_token))
+    assert await response.get_json() == {"foo": "dict"}
+    assert len(jwt._get_user_cache()) == 1
@@ -13,7 +13,10 @@ from quart_jwt_extended import (
     create_access_token,
     create_refresh_token,
     get_jwt_identity,
+    get_current_user,
     decode_token,
+    verify_jwt_in_request,
+    verify_jwt_refresh_token_in_request,
 )
 from tests.utils import make_headers, encode_token, get_jwt_manager
 
@@ -387,3 +390,104 @@ async def test_different_token_algorightm(app):
     assert await response.get_json() == {
         "msg": "The specified alg value is not allowed"
     }
+
+
+@pytest.mark.asyncio
+async def test_stacked_decorators_verify_once(app):
+    jwt = get_jwt_manager(app)
+    checks = []
+
+    @jwt.token_in_blacklist_loader
+    def check_blacklisted(decoded_token):
+        checks.append("blacklist")
+        return False
+
+    @jwt.claims_verification_loader
+    def verify_claims(user_claims):
+        checks.append("claims")
+        return True
+
+    @app.route("/stacked", methods=["GET"])
+    @jwt_required
+    @fresh_jwt_required
+    async def stacked():
+        await verify_jwt_in_request()
+        return jsonify(foo="bar")
+
+    app.config["JWT_BLACKLIST_ENABLED"] = True
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+        fresh_access_token = create_access_token("username", fresh=True)
+
+    response = await test_client.get("/stacked", headers=make_headers(access_token))
+    assert response.status_code == 401
+    assert await response.get_json() == {"msg": "Fresh token required"}
+    assert checks == ["blacklist", "claims"]
+
+    checks.clear()
+    response = await test_client.get(
+        "/stacked", headers=make_headers(fresh_access_token)
+    )
+    assert response.status_code == 200
+    assert checks == ["blacklist", "claims"]
+
+    # Each request verifies its token again
+    checks.clear()
+    response = await test_client.get(
+        "/stacked", headers=make_headers(fresh_access_token)
+    )
+    assert response.status_code == 200
+    assert checks == ["blacklist", "claims"]
+
+
+@pytest.mark.asyncio
+async def test_stacked_decorators_with_different_token_types(app):
+    @app.route("/access_and_refresh", methods=["GET"])
+    @jwt_required
+    async def access_and_refresh():
+        await verify_jwt_refresh_token_in_request()
+        return jsonify(foo="bar")
+
+    test_client = app.test_client()
+    async with app.test_request_context("/protected"):
+        access_token = create_access_token("username")
+
+    response = await test_client.get(
+        "/access_and_refresh", headers=make_headers(access_token)
+    )
+    assert response.status_code == 422
+    assert await response.get_json() == {"msg": "Only refresh tokens are allowed"}
+
+
+@pytest.mark.asyncio
+async def test_requests_in_held_app_context_verify_their_own_token(app):
+    jwt = get_jwt_manager(app)
+
+    @jwt.user_loader_callback_loader
+    def load_user(identity):
+        return identity
+
+    @app.route("/identity", methods=["GET"])
+    @jwt_required
+    async def identity():
+        return jsonify(identity=get_jwt_identity(), user=get_current_user())
+
+    test_client = app.test_client()
+    async with app.app_context():
+        async with app.test_request_context("/protected"):
+            access_token = create_access_token("username")
+            other_token = create_access_token("other")
+
+        response = await test_client.get(
+            "/identity", headers=make_headers(access_token)
+        )
+        assert await response.get_json() == {"identity": "username", "user": "username"}
+
+        response = await test_client.get("/identity")
+        assert response.status_code == 401
+        response = await test_client.get("/identity", headers=make_headers("garbage"))
+        assert response.status_code == 422
+
+        response = await test_client.get("/identity", headers=make_headers(other_token))
+        assert await response.get_json() == {"identity": "other", "user": "other"}